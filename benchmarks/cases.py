@@ -0,0 +1,123 @@
+import os
+import shutil
+import tempfile
+
+import numpy as np
+
+from bond_analytics import calculate_convexity, calculate_duration
+from bond_analytics.alerts import SmartAlert
+from bond_analytics.portfolio import Portfolio
+from bond_analytics.risk import calculate_portfolio_risk
+from bond_analytics.scenarios import apply_scenario
+from knowledge_graph.event_correlation import EventCorrelationEngine
+from utils.synthetic import SECTORS, SyntheticMarket, generate_portfolio
+
+# Per-bond scalar calls are timed on at most this many bonds and reported per bond.
+SCALAR_SAMPLE = 2_000
+
+
+def make_book(n_bonds, seed=0):
+    """
+    Seeded synthetic book of `n_bonds` in Portfolio's schema (see utils.synthetic).
+    """
+    return generate_portfolio(n_bonds, seed=seed)
+
+
+class Case:
+    """
+    A benchmark: `setup(n)` builds its inputs once per size (untimed) and returns the
+    function that is timed; `teardown` cleans up what setup created. `items(n)` is how many
+    bonds (or ticks) one timed call processes, for throughput.
+    """
+
+    def __init__(self, name, setup, items=None, teardown=None):
+        self.name = name
+        self.setup = setup
+        self.items = items or (lambda n: n)
+        self.teardown = teardown
+
+
+def _duration_convexity(n):
+    market = SyntheticMarket(n)
+    book = market.portfolio()
+    return lambda: calculate_portfolio_risk(book, settlement=market.as_of)
+
+
+def _duration_convexity_scalar(n):
+    # Annual cash flows to each bond's maturity.
+    market = SyntheticMarket(min(n, SCALAR_SAMPLE))
+    book = market.portfolio()
+    years = np.maximum(np.ceil((book['maturity_date'] - market.as_of).dt.days / 365.25), 1).astype(int)
+    bonds = [{'bond': bond, 'yield': rate, 'cash_flows': [coupon] * (k - 1) + [100 + coupon]}
+             for bond, rate, coupon, k in zip(book['bond'], book['yield'], book['coupon_rate'], years)]
+
+    def run():
+        for bond in bonds:
+            calculate_duration(bond, bond['yield'])
+            calculate_convexity(bond)
+    return run
+
+
+def _portfolio_load(n):
+    directory = tempfile.mkdtemp(prefix='creditpulse-bench-')
+    path = os.path.join(directory, 'book.csv')
+    make_book(n).to_csv(path, index=False)
+
+    def run():
+        return Portfolio(path)
+    run.directory = directory
+    return run
+
+
+def _remove_book(run):
+    shutil.rmtree(run.directory, ignore_errors=True)
+
+
+def _portfolio_aggregate(n):
+    book = make_book(n)
+
+    def run():
+        portfolio = Portfolio.from_frame(book)
+        portfolio.aggregate_metrics()
+        portfolio.sector_exposure()
+        portfolio.concentration_risk()
+    return run
+
+
+def _engine_build(n):
+    book = make_book(n)
+    return lambda: EventCorrelationEngine(book)
+
+
+def _propagate_event(n):
+    engine = EventCorrelationEngine(make_book(n))
+    return lambda: [engine.propagate_event(sector) for sector in SECTORS]
+
+
+def _smart_alert(n):
+    # `n` ticks of spread history: a fresh alert computes its statistics, then 1000 checks reuse them.
+    history = 100 + np.cumsum(np.random.default_rng(0).normal(0, 1, n))
+    latest = np.linspace(history.min(), history.max(), 1_000)
+
+    def run():
+        alert = SmartAlert(history, 'B0000000', None)
+        for value in latest:
+            alert.is_abnormal_move(value)
+    return run
+
+
+def _apply_scenario(n):
+    book = make_book(n)
+    return lambda: apply_scenario(book, '2008 Crisis')
+
+
+CASES = {case.name: case for case in (
+    Case('duration_convexity', _duration_convexity),
+    Case('duration_convexity_scalar', _duration_convexity_scalar, items=lambda n: min(n, SCALAR_SAMPLE)),
+    Case('portfolio_load', _portfolio_load, teardown=_remove_book),
+    Case('portfolio_aggregate', _portfolio_aggregate),
+    Case('event_engine_build', _engine_build),
+    Case('propagate_event', _propagate_event),
+    Case('smart_alert', _smart_alert),
+    Case('apply_scenario', _apply_scenario),
+)}
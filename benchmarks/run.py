@@ -0,0 +1,192 @@
+import argparse
+import datetime
+import gc
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+from .cases import CASES
+
+DEFAULT_SIZES = (1_000, 10_000, 100_000, 1_000_000)
+QUICK_SIZES = (1_000, 10_000)
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'results')
+DEFAULT_TOLERANCE = 0.25
+# Differences below this many seconds are timer noise, never a regression.
+NOISE_FLOOR = 0.002
+
+
+def time_call(fn, min_time=0.2, max_repeats=7, min_repeats=1):
+    """
+    Call `fn` until `min_time` seconds have been spent (between `min_repeats` and
+    `max_repeats` calls, with one warm-up call when it is fast) and return the timings.
+    """
+    first = _timed(fn)
+    if first * max_repeats < min_time:
+        first = _timed(fn)
+    timings = [first]
+    while len(timings) < max_repeats and (len(timings) < min_repeats or sum(timings) < min_time):
+        timings.append(_timed(fn))
+    return timings
+
+
+def _timed(fn):
+    gc.collect()
+    start = time.perf_counter()
+    fn()
+    return time.perf_counter() - start
+
+
+def _git_commit():
+    try:
+        out = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                             cwd=os.path.dirname(os.path.abspath(__file__)))
+        return out.stdout.strip() or None
+    except OSError:
+        return None
+
+
+def environment():
+    return {
+        'timestamp': datetime.datetime.now(datetime.timezone.utc).isoformat(timespec='seconds'),
+        'commit': _git_commit(),
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'pandas': pd.__version__,
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+    }
+
+
+def run_benchmarks(cases=None, sizes=DEFAULT_SIZES, min_time=0.2, max_repeats=7, log=None):
+    """
+    Time each case at each size; returns {'environment', 'results'} with one result per
+    (case, size): min and median seconds, repeats and throughput in items per second.
+    """
+    names = list(CASES) if cases is None else list(cases)
+    unknown = [n for n in names if n not in CASES]
+    if unknown:
+        raise ValueError(f"Unknown benchmarks: {', '.join(unknown)}. Use any of {', '.join(CASES)}")
+    results = []
+    for name in names:
+        case = CASES[name]
+        for n in sizes:
+            fn = case.setup(n)
+            try:
+                timings = time_call(fn, min_time=min_time, max_repeats=max_repeats)
+            finally:
+                if case.teardown is not None:
+                    case.teardown(fn)
+            del fn
+            best = min(timings)
+            result = {
+                'case': name,
+                'n': n,
+                'items': case.items(n),
+                'seconds_min': best,
+                'seconds_median': float(np.median(timings)),
+                'repeats': len(timings),
+                'items_per_second': case.items(n) / best if best > 0 else None,
+            }
+            results.append(result)
+            if log is not None:
+                log(f"{name:<28}{n:>10,}{best * 1000:>12.2f} ms{result['repeats']:>4}x")
+    return {'environment': environment(), 'results': results}
+
+
+def save_results(report, path=None):
+    """
+    Write a report as JSON, by default to results/<timestamp>.json; returns the path.
+    """
+    if path is None:
+        os.makedirs(RESULTS_DIR, exist_ok=True)
+        stamp = report['environment']['timestamp'].replace(':', '').replace('+0000', 'Z')
+        path = os.path.join(RESULTS_DIR, f"{stamp}.json")
+    tmp = path + '.tmp'
+    with open(tmp, 'w') as f:
+        json.dump(report, f, indent=2)
+    os.replace(tmp, path)
+    return path
+
+
+def load_results(path):
+    with open(path) as f:
+        return json.load(f)
+
+
+def compare(current, baseline, tolerance=DEFAULT_TOLERANCE, noise_floor=NOISE_FLOOR):
+    """
+    Per (case, size) present in both reports, the ratio of best times, flagged as a
+    regression when it exceeds 1 + `tolerance` by more than `noise_floor` seconds.
+    The frame's `missing` attribute lists baseline (case, size) pairs the current run lacks.
+    """
+    base = {(r['case'], r['n']): r for r in baseline['results']}
+    rows = []
+    for r in current['results']:
+        b = base.pop((r['case'], r['n']), None)
+        if b is None:
+            continue
+        ratio = r['seconds_min'] / b['seconds_min'] if b['seconds_min'] > 0 else float('inf')
+        regression = ratio > 1 + tolerance and r['seconds_min'] - b['seconds_min'] > noise_floor
+        rows.append({'case': r['case'], 'n': r['n'], 'baseline_s': b['seconds_min'], 'current_s': r['seconds_min'],
+                     'ratio': ratio, 'regression': regression})
+    table = pd.DataFrame(rows, columns=['case', 'n', 'baseline_s', 'current_s', 'ratio', 'regression'])
+    table.attrs['missing'] = sorted(base)
+    return table
+
+
+def _sizes(text):
+    return tuple(int(float(s)) for s in text.split(',') if s.strip())
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="CreditPulse benchmarks")
+    parser.add_argument('--cases', default=None, help=f"comma-separated, from: {', '.join(CASES)}")
+    parser.add_argument('--sizes', type=_sizes, default=DEFAULT_SIZES, help="comma-separated book sizes")
+    parser.add_argument('--quick', action='store_true', help=f"only sizes {', '.join(map(str, QUICK_SIZES))}")
+    parser.add_argument('--min-time', type=float, default=0.2, help="seconds to spend per case and size")
+    parser.add_argument('--output', default=None, help="results JSON (default: benchmarks/results/<timestamp>.json)")
+    parser.add_argument('--baseline', default=None, help="results JSON to compare against")
+    parser.add_argument('--tolerance', type=float, default=DEFAULT_TOLERANCE,
+                        help="allowed slowdown as a fraction of the baseline time")
+    parser.add_argument('--save-baseline', action='store_true', help="also write the results to --baseline")
+    args = parser.parse_args(argv)
+
+    cases = args.cases.split(',') if args.cases else None
+    sizes = QUICK_SIZES if args.quick else args.sizes
+    if args.baseline and not args.save_baseline and not os.path.exists(args.baseline):
+        print(f"Error: baseline not found: {args.baseline} (use --save-baseline to create it)", file=sys.stderr)
+        return 2
+    try:
+        report = run_benchmarks(cases, sizes, min_time=args.min_time, log=print)
+    except ValueError as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 2
+    print(f"Results written to {save_results(report, args.output)}")
+
+    status = 0
+    if args.baseline and not args.save_baseline:
+        table = compare(report, load_results(args.baseline), args.tolerance)
+        print(table.to_string(index=False, float_format=lambda v: f"{v:.4g}"))
+        regressions = table[table['regression']]
+        if len(regressions):
+            print(f"{len(regressions)} regression(s) beyond {args.tolerance:.0%} of {args.baseline}")
+            status = 1
+        missing = table.attrs['missing']
+        if missing:
+            # Informational: --cases/--sizes may select a subset of the baseline on purpose.
+            print(f"{len(missing)} baseline result(s) not in this run: "
+                  + ', '.join(f"{case}@{n:,}" for case, n in missing))
+    if args.baseline and args.save_baseline:
+        save_results(report, args.baseline)
+        print(f"Baseline written to {args.baseline}")
+    return status
+
+
+if __name__ == '__main__':
+    sys.exit(main())
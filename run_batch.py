@@ -0,0 +1,17 @@
+#!/usr/bin/env python3
+"""
+CreditPulse Batch Runner
+Runs the portfolio analytics over many portfolio files without the dashboard, e.g.
+
+    python run_batch.py books/ -o results/ --steps aggregate,liquidity,scenarios -j 8
+"""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'src'))
+
+from bond_analytics.batch import main
+
+if __name__ == "__main__":
+    sys.exit(main())
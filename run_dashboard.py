@@ -7,21 +7,20 @@ It handles deployment scenarios and ensures proper module loading.
 
 import sys
 import os
+import json
+import argparse
+import importlib.util
 import subprocess
 
 def check_dependencies():
-    """Check if required dependencies are installed."""
+    """Check if required dependencies are installed (located, not imported)."""
     required_packages = [
         'streamlit', 'pandas', 'numpy', 'networkx', 
         'matplotlib', 'seaborn', 'requests'
     ]
     
-    missing_packages = []
-    for package in required_packages:
-        try:
-            __import__(package)
-        except ImportError:
-            missing_packages.append(package)
+    missing_packages = [package for package in required_packages
+                        if importlib.util.find_spec(package) is None]
     
     if missing_packages:
         print(f"Missing required packages: {', '.join(missing_packages)}")
@@ -40,8 +39,30 @@ def setup_path():
         # We're probably already in the src directory
         sys.path.insert(0, current_dir)
 
+def startup_report(budget=None):
+    """Cold-start the dashboard module in a fresh interpreter and report its import time."""
+    setup_path()
+    from utils.features import measure_startup
+    src_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'src')
+    try:
+        report = measure_startup('dashboard.app', path=[src_dir], budget=budget)
+    except ValueError as e:
+        print(e)
+        return False
+    print(json.dumps(report, indent=2))
+    return report.get('within_budget', True)
+
 def main():
     """Main entry point for the CreditPulse dashboard."""
+    parser = argparse.ArgumentParser(description="CreditPulse dashboard")
+    parser.add_argument('--startup-report', action='store_true',
+                        help="print the dashboard's cold-start time and feature report, then exit")
+    parser.add_argument('--budget', type=float, default=None,
+                        help="cold-start budget in seconds; --startup-report exits 1 when exceeded")
+    args = parser.parse_args()
+    if args.startup_report:
+        sys.exit(0 if startup_report(args.budget) else 1)
+
     print("🚀 Starting CreditPulse Dashboard...")
     
     # Check dependencies
@@ -0,0 +1,41 @@
+#!/usr/bin/env python3
+"""
+CreditPulse Analytics Service
+Serves the portfolio, scenario, alert and graph analytics over HTTP on localhost (requires
+uvicorn), e.g.
+
+    python run_service.py --port 8000 --workers 4 --data-dir ./portfolios
+"""
+
+import argparse
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'src'))
+
+from service import create_app, serve
+
+def main():
+    parser = argparse.ArgumentParser(description="CreditPulse analytics service")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8000)
+    parser.add_argument('--workers', type=int, default=None, help="worker processes (default: CPU count)")
+    parser.add_argument('--executor', choices=('process', 'thread'), default='process')
+    parser.add_argument('--graph-store', default=None, help="KnowledgeGraphStore directory for /graph/neighbors")
+    parser.add_argument('--data-dir', default=None,
+                        help="directory portfolio files may be read from by path (default: none)")
+    args = parser.parse_args()
+
+    store = None
+    if args.graph_store:
+        from knowledge_graph.store import KnowledgeGraphStore
+        store = KnowledgeGraphStore(args.graph_store)
+    try:
+        serve(create_app(workers=args.workers, executor=args.executor, store=store,
+                         data_dir=args.data_dir), host=args.host, port=args.port)
+    except ImportError as e:
+        print(e)
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
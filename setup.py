@@ -42,6 +42,8 @@ setup(
     entry_points={
         "console_scripts": [
             "creditpulse=dashboard.app:main",
+            "creditpulse-batch=bond_analytics.batch:main",
+            "creditpulse-synth=utils.synthetic:main",
         ],
     },
     include_package_data=True,
@@ -1,31 +1,38 @@
-def calculate_duration(bond_data, discount_rate):
-    """
-    Calculate Macaulay duration as a placeholder.
-    Expects bond_data to have a 'cash_flows' key with a list of numbers.
-    """
+from .curves import YieldCurve
+from .risk import risk_from_cash_flows
+
+
+def _scalar_risk(bond_data, discount_rate):
     cash_flows = bond_data.get("cash_flows", [5, 5, 105])  # Example: 2 coupons + principal
-    # Ensure all cash flows are floats
-    cash_flows = [float(cf) for cf in cash_flows]
+    cash_flows = [[float(cf) for cf in cash_flows]]
     discount_rate = float(discount_rate) / 100  # Convert percent to decimal if needed
+    return risk_from_cash_flows(cash_flows, discount_rate)
 
-    duration = sum([(t+1) * cf / ((1 + discount_rate) ** (t+1)) for t, cf in enumerate(cash_flows)]) / \
-               sum([cf / ((1 + discount_rate) ** (t+1)) for t, cf in enumerate(cash_flows)])
-    return round(duration, 2)
 
-def calculate_convexity(bond_data):
+def calculate_duration(bond_data, discount_rate):
     """
-    Calculate convexity as a placeholder.
+    Calculate Macaulay duration for a single bond.
     Expects bond_data to have a 'cash_flows' key with a list of numbers.
+    For whole portfolios use bond_analytics.risk.calculate_portfolio_risk.
     """
-    cash_flows = bond_data.get("cash_flows", [5, 5, 105])
-    cash_flows = [float(cf) for cf in cash_flows]
-    discount_rate = 0.05  # Example fixed rate
+    duration = _scalar_risk(bond_data, discount_rate)['macaulay_duration'][0]
+    return round(float(duration), 2)
 
-    convexity = sum([(t+1)*(t+2)*cf / ((1 + discount_rate) ** (t+3)) for t, cf in enumerate(cash_flows)]) / \
-                sum([cf / ((1 + discount_rate) ** (t+1)) for t, cf in enumerate(cash_flows)])
-    return round(convexity, 2)
+def calculate_convexity(bond_data, discount_rate=5.0):
+    """
+    Calculate convexity for a single bond at the given discount rate (percent).
+    Expects bond_data to have a 'cash_flows' key with a list of numbers.
+    """
+    convexity = _scalar_risk(bond_data, discount_rate)['convexity'][0]
+    return round(float(convexity), 2)
 
 def yield_curve_shift(yield_curve, shift_amount):
+    """
+    Parallel shift of a YieldCurve, or of a plain list of rates.
+    Use YieldCurve.twist/butterfly for non-parallel shocks.
+    """
+    if isinstance(yield_curve, YieldCurve):
+        return yield_curve.parallel(shift_amount)
     return [rate + shift_amount for rate in yield_curve]
 
 def credit_risk_signal(bond_rating, market_conditions):
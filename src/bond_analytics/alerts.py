@@ -1,26 +1,52 @@
+from datetime import datetime, timezone
+
 import numpy as np
+import pandas as pd
 import requests
 
+DETECTOR_METHODS = ('welford', 'ewma', 'rolling', 'mad')
+
 class SmartAlert:
     def __init__(self, spread_history, bond_id, n8n_webhook_url):
         self.spread_history = np.array(spread_history)
         self.bond_id = bond_id
         self.n8n_webhook_url = n8n_webhook_url
 
+    @classmethod
+    def from_store(cls, store, bond_id, n8n_webhook_url, start=None, end=None, field=None):
+        """
+        SmartAlert over a bond's history in a TimeSeriesStore; the history is a view of the
+        mapped store files rather than a copy.
+        """
+        _, values = store.range(bond_id, start=start, end=end, field=field)
+        return cls(values, bond_id, n8n_webhook_url)
+
     def is_abnormal_move(self, latest_spread, threshold=2.5):
-        mean = np.mean(self.spread_history)
-        std = np.std(self.spread_history)
+        # Computed per check: the history may be a store view that changes underneath us.
+        mean, std = np.mean(self.spread_history), np.std(self.spread_history)
         if std == 0:
             return False, 0
         z_score = abs((latest_spread - mean) / std)
         return z_score > threshold, z_score
 
-    def send_alert(self, message, channel="n8n"):
+    def send_alert(self, message, channel="n8n", dispatcher=None, event_id=None):
+        """
+        Post the alert to the n8n webhook. With a dispatcher (e.g.
+        n8n_automation.dispatcher.BackgroundDispatcher) the alert is queued instead and
+        delivered asynchronously with batching and retries; returns False for duplicates.
+        Pass an `event_id` to have resubmissions of the same event dropped as duplicates;
+        otherwise every call is a new alert, stamped with the time it was sent.
+        """
         payload = {
             "bond_id": self.bond_id,
             "message": message,
-            "channel": channel
+            "channel": channel,
+            "timestamp": datetime.now(timezone.utc).isoformat()
         }
+        if event_id is not None:
+            payload["event_id"] = event_id
+        if dispatcher is not None:
+            return dispatcher.submit(payload)
         try:
             response = requests.post(self.n8n_webhook_url, json=payload, timeout=5)
             return response.status_code == 200
@@ -28,6 +54,170 @@ class SmartAlert:
             # Optionally log error here
             return False
 
+class SpreadAnomalyDetector:
+    """
+    Streaming z-score detector for many bonds at once, with per-bond state in contiguous arrays.
+    Methods: 'welford' (running mean/std over all history), 'ewma' (exponentially weighted,
+    smoothing `alpha`), 'rolling' (mean/std over the last `window` ticks) and 'mad'
+    (median / median absolute deviation over the last `window` ticks). Each tick is scored
+    against the state before it is absorbed, like SmartAlert.is_abnormal_move.
+    """
+
+    def __init__(self, bond_ids, method='welford', threshold=2.5, alpha=0.06, window=30, min_periods=3):
+        if method not in DETECTOR_METHODS:
+            raise ValueError(f"Unsupported method: {method}. Use one of {', '.join(DETECTOR_METHODS)}")
+        self.method = method
+        self.threshold = threshold
+        self.alpha = alpha
+        self.window = window
+        self.min_periods = min_periods
+        self.bond_ids = np.array([], dtype=object)
+        self._index = {}
+        self.count = np.zeros(0, dtype=np.int64)
+        self.mean = np.zeros(0)
+        self.m2 = np.zeros(0)
+        self._buffer = np.zeros((0, window))
+        self.add_bonds(bond_ids)
+
+    def __len__(self):
+        return len(self.bond_ids)
+
+    def add_bonds(self, bond_ids):
+        new = [b for b in dict.fromkeys(bond_ids) if b not in self._index]
+        if not new:
+            return
+        start = len(self.bond_ids)
+        self._index.update((b, start + i) for i, b in enumerate(new))
+        k = len(new)
+        self.bond_ids = np.concatenate([self.bond_ids, np.array(new, dtype=object)])
+        self.count = np.concatenate([self.count, np.zeros(k, dtype=np.int64)])
+        self.mean = np.concatenate([self.mean, np.zeros(k)])
+        self.m2 = np.concatenate([self.m2, np.zeros(k)])
+        if self.method in ('rolling', 'mad'):
+            self._buffer = np.concatenate([self._buffer, np.full((k, self.window), np.nan)])
+
+    def positions(self, bond_ids):
+        return np.array([self._index[b] for b in bond_ids], dtype=np.int64)
+
+    def _z_scores(self, idx, values):
+        count = self.count[idx]
+        if self.method == 'mad':
+            window = self._buffer[idx]
+            center = np.nanmedian(window, axis=1) if len(idx) else np.zeros(0)
+            spread = np.nanmedian(np.abs(window - center[:, None]), axis=1) / 0.6745 if len(idx) else np.zeros(0)
+        elif self.method == 'rolling':
+            n = np.minimum(count, self.window).astype(np.float64)
+            center = self.mean[idx]
+            with np.errstate(invalid='ignore', divide='ignore'):
+                spread = np.sqrt(np.maximum(self.m2[idx] / n, 0.0))
+        elif self.method == 'ewma':
+            center = self.mean[idx]
+            spread = np.sqrt(self.m2[idx])
+        else:
+            center = self.mean[idx]
+            with np.errstate(invalid='ignore', divide='ignore'):
+                spread = np.sqrt(self.m2[idx] / count)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            z = np.abs(values - center) / spread
+        return np.where((spread > 0) & (count >= self.min_periods), z, 0.0)
+
+    def _absorb(self, idx, values):
+        count = self.count[idx] + 1
+        if self.method == 'ewma':
+            delta = values - self.mean[idx]
+            first = count == 1
+            self.mean[idx] = np.where(first, values, self.mean[idx] + self.alpha * delta)
+            self.m2[idx] = np.where(first, 0.0, (1 - self.alpha) * (self.m2[idx] + self.alpha * delta ** 2))
+        elif self.method == 'welford':
+            delta = values - self.mean[idx]
+            mean = self.mean[idx] + delta / count
+            self.m2[idx] += delta * (values - mean)
+            self.mean[idx] = mean
+        else:
+            # Windowed Welford: add the new tick and, once the window is full, drop the one
+            # it overwrites.
+            slot = (count - 1) % self.window
+            full = count > self.window
+            outgoing = np.nan_to_num(self._buffer[idx, slot])
+            n = np.minimum(count, self.window)
+            mean = self.mean[idx]
+            delta = values - np.where(full, outgoing, mean)
+            new_mean = mean + delta / n
+            self.m2[idx] += delta * (values - new_mean + np.where(full, outgoing - mean, 0.0))
+            self.mean[idx] = new_mean
+            self._buffer[idx, slot] = values
+            # Each time a bond's window wraps, recompute its state exactly so rounding error
+            # cannot build up over long streams.
+            rows = idx[slot == self.window - 1]
+            if len(rows):
+                window = self._buffer[rows]
+                self.mean[rows] = window.mean(axis=1)
+                self.m2[rows] = ((window - self.mean[rows][:, None]) ** 2).sum(axis=1)
+        self.count[idx] = count
+
+    def _rounds(self, bond_ids, values):
+        idx = self.positions(bond_ids)
+        values = np.asarray(values, dtype=np.float64)
+        keep = ~np.isnan(values)
+        idx, values = idx[keep], values[keep]
+        order = np.argsort(idx, kind='stable')
+        sorted_idx = idx[order]
+        # Repeated ticks for one bond are applied in arrival order, one round per repeat.
+        starts = np.r_[True, sorted_idx[1:] != sorted_idx[:-1]] if len(idx) else np.zeros(0, dtype=bool)
+        group_start = np.maximum.accumulate(np.where(starts, np.arange(len(idx)), 0))
+        rank = np.empty(len(idx), dtype=np.int64)
+        rank[order] = np.arange(len(idx)) - group_start
+        for r in range(int(rank.max()) + 1 if len(idx) else 0):
+            sel = rank == r
+            yield idx[sel], values[sel]
+
+    def seed(self, history):
+        """
+        Absorb historical spreads: a dict of bond -> sequence, or a (bonds x time) DataFrame.
+        """
+        if isinstance(history, dict):
+            history = pd.DataFrame({b: pd.Series(v, dtype=np.float64) for b, v in history.items()}).T
+        self.add_bonds(history.index)
+        idx = self.positions(history.index)
+        values = history.to_numpy(dtype=np.float64)
+        for t in range(values.shape[1]):
+            col = values[:, t]
+            keep = ~np.isnan(col)
+            self._absorb(idx[keep], col[keep])
+
+    def seed_from_store(self, store, bond_ids=None, lookback=None, field=None):
+        """
+        Seed from a TimeSeriesStore: the last `lookback` ticks (default: `window`) of each bond.
+        """
+        history = store.recent(self.bond_ids if bond_ids is None else bond_ids, n=lookback or self.window,
+                               field=field)
+        self.seed({b: v for b, v in history.items() if len(v)})
+
+    def score(self, bond_ids, values):
+        """
+        Absolute z-scores of new ticks against the current state, without absorbing them.
+        """
+        idx = self.positions(bond_ids)
+        return self._z_scores(idx, np.asarray(values, dtype=np.float64))
+
+    def update(self, bond_ids, values):
+        """
+        Score and absorb a batch of ticks (unknown bonds are added). Returns the bond IDs
+        whose tick breached the threshold and the matching z-scores.
+        """
+        self.add_bonds(bond_ids)
+        breached, scores = [], []
+        for idx, vals in self._rounds(bond_ids, values):
+            z = self._z_scores(idx, vals)
+            hit = z > self.threshold
+            breached.append(idx[hit])
+            scores.append(z[hit])
+            self._absorb(idx, vals)
+        if not breached:
+            return np.array([], dtype=object), np.zeros(0)
+        hits = np.concatenate(breached)
+        return self.bond_ids[hits], np.concatenate(scores)
+
 # Example usage:
 # alert = SmartAlert([100, 102, 98, 101, 99], "ACME2025", "https://n8n.example.com/webhook/alert")
 # abnormal, z = alert.is_abnormal_move(120)
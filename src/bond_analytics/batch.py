@@ -0,0 +1,289 @@
+import argparse
+import glob
+import json
+import os
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+import pandas as pd
+
+from .liquidity import calculate_liquidity_metrics
+from .loader import EXTENSION_FORMATS, PYARROW_AVAILABLE
+from .portfolio import Portfolio
+from .risk import calculate_portfolio_risk
+from .scenarios import apply_scenario, run_scenarios, scenario_summary
+
+OUTPUT_FORMATS = ('parquet', 'csv')
+
+
+def _table(result):
+    # Portfolio methods report failures as {"Error": ...} instead of raising.
+    if isinstance(result, dict) and 'Error' in result:
+        raise ValueError(result['Error'])
+    if isinstance(result, pd.Series):
+        return result.to_frame()
+    if isinstance(result, dict):
+        return pd.DataFrame([result])
+    return result
+
+
+def _aggregate(portfolio, options):
+    return _table(portfolio.aggregate_metrics())
+
+
+def _sector_exposure(portfolio, options):
+    return _table(portfolio.sector_exposure())
+
+
+def _concentration(portfolio, options):
+    return _table(portfolio.concentration_risk())
+
+
+def _risk(portfolio, options):
+    return calculate_portfolio_risk(portfolio.df, discount_rate=options.get('discount_rate'))
+
+
+def _liquidity(portfolio, options):
+    return calculate_liquidity_metrics(portfolio.df)
+
+
+def _scenario(portfolio, options):
+    return apply_scenario(portfolio.df, options.get('scenario', '2008 Crisis'))
+
+
+def _scenarios(portfolio, options):
+    pnl = run_scenarios(portfolio.df, mode=options.get('scenario_mode', 'approx'))
+    return scenario_summary(pnl).rename_axis('scenario')
+
+
+def _var(portfolio, options):
+    summary = portfolio.simulated_var(n_paths=options.get('var_paths', 20_000), n_workers=1)
+    return _table(summary)
+
+
+# Pipeline steps: name -> function(portfolio, options) returning one DataFrame per file;
+# a meaningful index (sector, scenario, bond) becomes a column in the output.
+ANALYTICS = {
+    'aggregate': _aggregate,
+    'sector_exposure': _sector_exposure,
+    'concentration': _concentration,
+    'risk': _risk,
+    'liquidity': _liquidity,
+    'scenario': _scenario,
+    'scenarios': _scenarios,
+    'var': _var,
+}
+
+DEFAULT_PIPELINE = ('aggregate', 'sector_exposure', 'concentration', 'liquidity', 'scenarios')
+
+
+def collect_inputs(inputs):
+    """
+    Portfolio files named by `inputs`: files, directories (searched recursively for the
+    formats the loader reads) and glob patterns. Sorted and de-duplicated.
+    """
+    if isinstance(inputs, (str, os.PathLike)):
+        inputs = [inputs]
+    files = []
+    for item in inputs:
+        item = os.fspath(item)
+        if os.path.isdir(item):
+            for root, _, names in os.walk(item):
+                files.extend(os.path.join(root, n) for n in names if os.path.splitext(n)[1].lower() in EXTENSION_FORMATS)
+        elif os.path.isfile(item):
+            files.append(item)
+        else:
+            matches = [m for m in glob.glob(item, recursive=True) if os.path.isfile(m)]
+            if not matches:
+                raise ValueError(f"No portfolio files match: {item}")
+            files.extend(matches)
+    return sorted(set(os.path.abspath(f) for f in files))
+
+
+def _source_names(files):
+    # File stems, suffixed where two inputs share one, used to name per-file outputs.
+    names, seen = {}, {}
+    for path in files:
+        stem = os.path.splitext(os.path.basename(path))[0]
+        count = seen.get(stem, 0)
+        seen[stem] = count + 1
+        names[path] = stem if count == 0 else f"{stem}_{count}"
+    return names
+
+
+def write_table(df, path, fmt):
+    """
+    Write a DataFrame as Parquet or CSV through a temporary file, so partial outputs never
+    appear under the final name.
+    """
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = path + '.tmp'
+    if fmt == 'parquet':
+        df.to_parquet(tmp, index=False)
+    else:
+        df.to_csv(tmp, index=False)
+    os.replace(tmp, path)
+
+
+def run_file(path, source, output_dir, pipeline=DEFAULT_PIPELINE, fmt='parquet', options=None):
+    """
+    Load one portfolio and run each pipeline step, writing `<output_dir>/<step>/<source>.<fmt>`.
+    A failing step is recorded and the rest still run. Returns one timing record per step,
+    after a 'load' record.
+    """
+    options = options or {}
+    records = []
+    start = time.perf_counter()
+    try:
+        portfolio = Portfolio(path)
+    except Exception as e:
+        return [{'source': source, 'path': path, 'step': 'load', 'status': 'error',
+                 'seconds': time.perf_counter() - start, 'rows': 0, 'error': str(e)}]
+    records.append({'source': source, 'path': path, 'step': 'load', 'status': 'ok',
+                    'seconds': time.perf_counter() - start, 'rows': len(portfolio.df), 'error': None})
+    for step in pipeline:
+        start = time.perf_counter()
+        try:
+            table = ANALYTICS[step](portfolio, options)
+            if not isinstance(table.index, pd.RangeIndex) or table.index.name is not None:
+                table = table.reset_index()
+            table.insert(0, 'source', source)
+            write_table(table, os.path.join(output_dir, step, f"{source}.{fmt}"), fmt)
+            record = {'status': 'ok', 'rows': len(table), 'error': None}
+        except Exception as e:
+            record = {'status': 'error', 'rows': 0, 'error': f"{type(e).__name__}: {e}"}
+        records.append({'source': source, 'path': path, 'step': step,
+                        'seconds': time.perf_counter() - start, **record})
+    return records
+
+
+def _run_task(task):
+    return run_file(*task)
+
+
+def run_batch(inputs, output_dir, pipeline=DEFAULT_PIPELINE, fmt=None, workers=None, options=None,
+              time_budget=None):
+    """
+    Run `pipeline` over every portfolio in `inputs` on a pool of `workers` processes
+    (in-process when 1). Files are submitted largest first to even out the pool. Each step's
+    results go to `<output_dir>/<step>/<source>.<fmt>`; per-file, per-step timings to
+    `<output_dir>/timings.<fmt>` and totals to `<output_dir>/summary.json`. With a
+    `time_budget` in seconds, files not yet started when it runs out are skipped and
+    reported as such. Returns the timings DataFrame.
+    """
+    unknown = [step for step in pipeline if step not in ANALYTICS]
+    if unknown:
+        raise ValueError(f"Unknown analytics: {', '.join(unknown)}. Use any of {', '.join(ANALYTICS)}")
+    fmt = fmt or ('parquet' if PYARROW_AVAILABLE else 'csv')
+    if fmt not in OUTPUT_FORMATS:
+        raise ValueError(f"Unsupported output format: {fmt}. Use one of {', '.join(OUTPUT_FORMATS)}")
+    if fmt == 'parquet' and not PYARROW_AVAILABLE:
+        raise ValueError("Parquet output requires pyarrow")
+    files = sorted(collect_inputs(inputs), key=os.path.getsize, reverse=True)
+    names = _source_names(sorted(files))
+    tasks = [(path, names[path], output_dir, tuple(pipeline), fmt, options) for path in files]
+    workers = workers or os.cpu_count() or 1
+    os.makedirs(output_dir, exist_ok=True)
+
+    start = time.perf_counter()
+    records = []
+    skipped = []
+    if workers == 1 or len(tasks) <= 1:
+        for task in tasks:
+            if time_budget is not None and time.perf_counter() - start > time_budget:
+                skipped.append(task)
+                continue
+            records.extend(_run_task(task))
+    else:
+        results = {}
+        with ProcessPoolExecutor(max_workers=min(workers, len(tasks))) as pool:
+            futures = {pool.submit(_run_task, task): i for i, task in enumerate(tasks)}
+            pending = set(futures)
+            while pending:
+                remaining = None if time_budget is None else time_budget - (time.perf_counter() - start)
+                if remaining is not None and remaining <= 0:
+                    # Out of time: cancel every file not yet started in one pass, so idle
+                    # workers cannot pick them up, then wait only for the running ones.
+                    cancelled = {future for future in pending if future.cancel()}
+                    skipped.extend(tasks[futures[future]] for future in sorted(cancelled, key=futures.get))
+                    done, pending = wait(pending - cancelled).done, set()
+                else:
+                    done, pending = wait(pending, timeout=remaining, return_when=FIRST_COMPLETED)
+                for future in done:
+                    task = tasks[futures[future]]
+                    try:
+                        results[futures[future]] = future.result()
+                    except Exception as e:
+                        results[futures[future]] = [{'source': task[1], 'path': task[0], 'step': 'load',
+                                                     'status': 'error', 'seconds': 0.0, 'rows': 0,
+                                                     'error': f"{type(e).__name__}: {e}"}]
+        for i in sorted(results):
+            records.extend(results[i])
+    for path, source, *_ in skipped:
+        records.append({'source': source, 'path': path, 'step': 'load', 'status': 'skipped',
+                        'seconds': 0.0, 'rows': 0, 'error': 'time budget exhausted'})
+    elapsed = time.perf_counter() - start
+
+    timings = pd.DataFrame(records, columns=['source', 'path', 'step', 'status', 'seconds', 'rows', 'error'])
+    write_table(timings, os.path.join(output_dir, f"timings.{fmt}"), fmt)
+    per_file = timings.groupby('source')['seconds'].sum()
+    failed = timings.loc[timings['status'] == 'error', 'source'].unique()
+    summary = {
+        'files': len(files),
+        'completed': int(len(files) - len(skipped)),
+        'skipped': len(skipped),
+        'files_with_errors': len(failed),
+        'wall_seconds': round(elapsed, 3),
+        'cpu_seconds': round(float(timings['seconds'].sum()), 3),
+        'slowest_file': per_file.idxmax() if len(per_file) else None,
+        'slowest_file_seconds': round(float(per_file.max()), 3) if len(per_file) else None,
+        'workers': workers,
+        'pipeline': list(pipeline),
+        'format': fmt,
+    }
+    with open(os.path.join(output_dir, 'summary.json'), 'w') as f:
+        json.dump(summary, f, indent=2)
+    return timings
+
+
+def main(argv=None):
+    """
+    Command-line entry point: run_batch over files, directories or globs.
+    """
+    parser = argparse.ArgumentParser(description="Run CreditPulse analytics over many portfolio files.")
+    parser.add_argument('inputs', nargs='+', help="portfolio files, directories or glob patterns")
+    parser.add_argument('-o', '--output', required=True, help="output directory")
+    parser.add_argument('--steps', default=','.join(DEFAULT_PIPELINE),
+                        help=f"comma-separated analytics to run, from: {', '.join(ANALYTICS)}")
+    parser.add_argument('--format', choices=OUTPUT_FORMATS, default=None,
+                        help="output format (default: parquet when pyarrow is installed, else csv)")
+    parser.add_argument('-j', '--workers', type=int, default=None, help="worker processes (default: CPU count)")
+    parser.add_argument('--time-budget', type=float, default=None,
+                        help="seconds after which files not yet started are skipped")
+    parser.add_argument('--scenario', default='2008 Crisis', help="scenario for the 'scenario' step")
+    parser.add_argument('--scenario-mode', default='approx', help="repricing mode for the 'scenarios' step")
+    parser.add_argument('--var-paths', type=int, default=20_000, help="Monte Carlo paths for the 'var' step")
+    parser.add_argument('--discount-rate', type=float, default=None,
+                        help="flat discount rate in percent for the 'risk' step (default: each bond's yield)")
+    args = parser.parse_args(argv)
+
+    options = {'scenario': args.scenario, 'scenario_mode': args.scenario_mode, 'var_paths': args.var_paths,
+               'discount_rate': args.discount_rate}
+    steps = [s.strip() for s in args.steps.split(',') if s.strip()]
+    try:
+        timings = run_batch(args.inputs, args.output, steps, fmt=args.format, workers=args.workers,
+                            options=options, time_budget=args.time_budget)
+    except ValueError as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 2
+    with open(os.path.join(args.output, 'summary.json')) as f:
+        summary = json.load(f)
+    print(timings.pivot_table(index='source', columns='step', values='seconds', aggfunc='sum').round(3)
+          .to_string())
+    print(json.dumps(summary, indent=2))
+    return 1 if summary['files_with_errors'] or summary['skipped'] else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,307 @@
+import hashlib
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+DAY_COUNTS = ('30/360', 'ACT/360', 'ACT/365')
+STUB_TYPES = ('short', 'long')
+# Coupons per year when neither the caller nor a `coupon_frequency` column says otherwise.
+DEFAULT_FREQUENCY = 2
+
+
+def array_key(arr):
+    """
+    Stable content key for a NumPy array (dtype, shape and bytes).
+    """
+    arr = np.ascontiguousarray(arr)
+    digest = hashlib.blake2b(arr.view(np.uint8).ravel(), digest_size=16).hexdigest()
+    return (arr.dtype.str, arr.shape, digest)
+
+
+def discount_factors(rates, times, frequency=1):
+    """
+    Discount factors (1 + r/f) ** (-f * t) for decimal rates of shape (n,) and times of shape (n, m).
+    """
+    rates = np.asarray(rates, dtype=np.float64).reshape(-1, 1)
+    frequency = np.asarray(frequency, dtype=np.float64).reshape(-1, 1)
+    growth = 1.0 + rates / frequency
+    return np.power(growth, -frequency * np.asarray(times, dtype=np.float64))
+
+
+class DiscountFactorCache:
+    """
+    Memoized discount-factor tables keyed by (curve, date grid), bounded by total bytes (LRU).
+    """
+
+    def __init__(self, max_bytes=256 * 1024 ** 2):
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._tables = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    def get(self, curve_key, grid_key, builder):
+        """
+        Return the cached table for (curve_key, grid_key), calling builder() on a miss.
+        Returned arrays are read-only and shared between callers.
+        """
+        key = (curve_key, grid_key)
+        with self._lock:
+            table = self._tables.get(key)
+            if table is not None:
+                self._tables.move_to_end(key)
+                self.hits += 1
+                return table
+            self.misses += 1
+        table = np.asarray(builder())
+        table.setflags(write=False)
+        with self._lock:
+            if key not in self._tables:
+                self._tables[key] = table
+                self._bytes += table.nbytes
+            while self._bytes > self.max_bytes and len(self._tables) > 1:
+                _, evicted = self._tables.popitem(last=False)
+                self._bytes -= evicted.nbytes
+        return table
+
+    def flat(self, rates, times, frequency=1, grid_key=None):
+        """
+        Discount factors for per-bond flat yields (decimal) over a time grid.
+        """
+        rates = np.asarray(rates, dtype=np.float64)
+        frequency = np.asarray(frequency, dtype=np.float64)
+        curve_key = ('flat', array_key(rates), array_key(frequency))
+        if grid_key is None:
+            grid_key = array_key(times)
+        return self.get(curve_key, grid_key, lambda: discount_factors(rates, times, frequency))
+
+    def clear(self):
+        with self._lock:
+            self._tables.clear()
+            self._bytes = 0
+            self.hits = 0
+            self.misses = 0
+
+    def __len__(self):
+        return len(self._tables)
+
+
+DEFAULT_DISCOUNT_CACHE = DiscountFactorCache()
+
+
+def _date_parts(dates):
+    months = dates.astype('datetime64[M]')
+    years = dates.astype('datetime64[Y]').astype(np.int64) + 1970
+    month = months.astype(np.int64) % 12 + 1
+    day = (dates - months.astype('datetime64[D]')).astype(np.int64) + 1
+    return years, month, day
+
+
+def year_fraction(start, end, day_count='30/360'):
+    """
+    Vectorized year fraction between datetime64[D] arrays under the given day count.
+    """
+    start = np.asarray(start, dtype='datetime64[D]')
+    end = np.asarray(end, dtype='datetime64[D]')
+    convention = day_count.upper()
+    if convention == 'ACT/365':
+        return (end - start).astype(np.float64) / 365.0
+    if convention == 'ACT/360':
+        return (end - start).astype(np.float64) / 360.0
+    if convention == '30/360':
+        y1, m1, d1 = _date_parts(start)
+        y2, m2, d2 = _date_parts(end)
+        d1 = np.minimum(d1, 30)
+        d2 = np.where((d2 == 31) & (d1 == 30), 30, d2)
+        return (360 * (y2 - y1) + 30 * (m2 - m1) + (d2 - d1)) / 360.0
+    raise ValueError(f"Unsupported day count: {day_count}. Use one of {', '.join(DAY_COUNTS)}")
+
+
+def _month_length(month_index):
+    month_start = month_index.astype('datetime64[M]').astype('datetime64[D]')
+    next_start = (month_index + 1).astype('datetime64[M]').astype('datetime64[D]')
+    return (next_start - month_start).astype(np.int64)
+
+
+def _coupon_dates(month_index, maturity_day, month_end=False):
+    """
+    Coupon dates for integer month indices (months since 1970-01), rolling the maturity day
+    back to the month end where the month is shorter. Where `month_end` is set every date
+    falls on the last day of its month.
+    """
+    month_start = month_index.astype('datetime64[M]').astype('datetime64[D]')
+    month_len = _month_length(month_index)
+    day = np.where(month_end, month_len, np.minimum(maturity_day, month_len))
+    return month_start + (day - 1).astype('timedelta64[D]')
+
+
+class CashFlowSchedule:
+    """
+    Remaining cash flows for a set of bonds as padded (n_bonds, width) arrays.
+    Row i holds counts[i] flows in ascending time order; padding has amount 0 and time 0.
+    """
+
+    def __init__(self, bonds, dates, times, amounts, counts, frequency, day_count, settlement):
+        self.bonds = bonds
+        self.dates = dates
+        self.times = times
+        self.amounts = amounts
+        self.counts = counts
+        self.frequency = frequency
+        self.day_count = day_count
+        self.settlement = settlement
+        self._grid_key = None
+
+    def __len__(self):
+        return len(self.counts)
+
+    @property
+    def width(self):
+        return self.amounts.shape[1]
+
+    @property
+    def grid_key(self):
+        """
+        Content key of the date grid, computed once per schedule.
+        """
+        if self._grid_key is None:
+            self._grid_key = (array_key(self.times), array_key(self.frequency))
+        return self._grid_key
+
+    def discount_factors(self, rates, cache=DEFAULT_DISCOUNT_CACHE):
+        """
+        Discount factors for decimal per-bond yields, compounded at each bond's coupon frequency.
+        """
+        if cache is None:
+            return discount_factors(rates, self.times, self.frequency)
+        return cache.flat(rates, self.times, self.frequency, grid_key=self.grid_key)
+
+    def to_ragged(self):
+        """
+        Ragged view as (offsets, times, amounts): bond i's flows are [offsets[i]:offsets[i+1]].
+        """
+        mask = np.arange(self.width) < self.counts[:, None]
+        offsets = np.concatenate([[0], np.cumsum(self.counts)])
+        return offsets, self.times[mask], self.amounts[mask]
+
+    def to_frame(self):
+        """
+        Long-format DataFrame with one row per cash flow.
+        """
+        mask = np.arange(self.width) < self.counts[:, None]
+        return pd.DataFrame({
+            'bond': np.repeat(np.asarray(self.bonds), self.counts),
+            'date': self.dates[mask],
+            'time': self.times[mask],
+            'amount': self.amounts[mask],
+        })
+
+
+def generate_schedules(df, settlement=None, frequency=DEFAULT_FREQUENCY, day_count='30/360', stub='short',
+                       end_of_month=True, coupon_column='coupon_rate', face_column='face_value'):
+    """
+    Generate remaining coupon schedules for every bond in a portfolio DataFrame.
+    Uses `maturity_date`, `face_value` (default 100) and `coupon_rate` in percent, falling back
+    to `yield` (priced as a par bond) when no coupon column is present. A `coupon_frequency`
+    column overrides `frequency` per bond. Coupon dates roll back from maturity; with
+    `end_of_month`, a bond maturing on the last day of a month pays on month ends (Jun 30 ->
+    Dec 31). When an `issue_date` falls inside the first period the stub coupon is prorated
+    ('short') or merged into the next coupon ('long').
+    """
+    if 'maturity_date' not in df.columns:
+        raise ValueError("Missing required column: maturity_date")
+    if stub not in STUB_TYPES:
+        raise ValueError(f"Unsupported stub type: {stub}. Use one of {', '.join(STUB_TYPES)}")
+    if day_count.upper() not in DAY_COUNTS:
+        raise ValueError(f"Unsupported day count: {day_count}. Use one of {', '.join(DAY_COUNTS)}")
+
+    n = len(df)
+    if settlement is None:
+        settlement = pd.Timestamp.today().normalize()
+    settle = np.datetime64(pd.Timestamp(settlement).date(), 'D')
+
+    maturity = pd.to_datetime(df['maturity_date'], errors='coerce').to_numpy().astype('datetime64[D]')
+    if 'issue_date' in df.columns:
+        issue = pd.to_datetime(df['issue_date'], errors='coerce').to_numpy().astype('datetime64[D]')
+    else:
+        issue = np.full(n, np.datetime64('NaT'), dtype='datetime64[D]')
+    if face_column in df.columns:
+        face = pd.to_numeric(df[face_column], errors='coerce').fillna(100.0).to_numpy(np.float64)
+    else:
+        face = np.full(n, 100.0)
+    if coupon_column in df.columns:
+        coupon = pd.to_numeric(df[coupon_column], errors='coerce').to_numpy(np.float64)
+    elif 'yield' in df.columns:
+        coupon = pd.to_numeric(df['yield'], errors='coerce').to_numpy(np.float64)
+    else:
+        raise ValueError(f"Missing coupon column: {coupon_column}")
+    coupon = np.nan_to_num(coupon)
+    if 'coupon_frequency' in df.columns:
+        freq = pd.to_numeric(df['coupon_frequency'], errors='coerce').fillna(frequency).to_numpy(np.int64)
+    else:
+        freq = np.full(n, frequency, dtype=np.int64)
+    if np.any((freq <= 0) | (12 % freq != 0)):
+        raise ValueError("Coupon frequency must divide 12 (1, 2, 3, 4, 6 or 12)")
+    step = 12 // freq
+
+    alive = ~np.isnat(maturity) & (maturity > settle)
+    safe_maturity = np.where(alive, maturity, settle + 1)
+    mat_month = safe_maturity.astype('datetime64[M]').astype(np.int64)
+    settle_month = settle.astype('datetime64[M]').astype(np.int64)
+    _, _, mat_day = _date_parts(safe_maturity)
+    periods = np.where(alive, (mat_month - settle_month) // step + 2, 0)
+    width = int(periods.max()) if n else 0
+
+    k = np.arange(width + 1)
+    month_index = mat_month[:, None] - k[None, :] * step[:, None]
+    month_end = end_of_month & (mat_day == _month_length(mat_month))
+    dates = _coupon_dates(month_index, mat_day[:, None], month_end[:, None])
+    starts = dates[:, 1:]
+    dates = dates[:, :-1]
+
+    has_issue = ~np.isnat(issue)
+    issue_fill = np.where(has_issue, issue, np.datetime64('1900-01-01'))
+    after_issue = dates > issue_fill[:, None]
+    valid = alive[:, None] & (k[None, :-1] < periods[:, None]) & (dates > settle) & after_issue
+
+    # The earliest coupon after issue accrues from the issue date, not the regular start.
+    accrual = np.ones(dates.shape)
+    first_k = after_issue.sum(axis=1) - 1
+    rows = np.flatnonzero(has_issue & alive & (first_k >= 0))
+    if len(rows):
+        fk = first_k[rows]
+        regular = year_fraction(starts[rows, fk], dates[rows, fk], day_count)
+        stub_len = year_fraction(issue[rows], dates[rows, fk], day_count)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            fraction = np.where(regular > 0, stub_len / regular, 1.0)
+        is_stub = (issue[rows] > starts[rows, fk]) & (fraction < 1.0 - 1e-9)
+        rows, fk, fraction = rows[is_stub], fk[is_stub], fraction[is_stub]
+        if stub == 'long':
+            merge = fk >= 1
+            accrual[rows[merge], fk[merge] - 1] += fraction[merge]
+            valid[rows[merge], fk[merge]] = False
+            accrual[rows[~merge], fk[~merge]] = fraction[~merge]
+        else:
+            accrual[rows, fk] = fraction
+
+    amounts = (face * coupon / 100.0 / freq)[:, None] * accrual
+    amounts[:, 0] += face
+
+    counts = valid.sum(axis=1)
+    out_width = int(counts.max()) if n else 0
+    out_dates = np.full((n, out_width), np.datetime64('NaT'), dtype='datetime64[D]')
+    out_amounts = np.zeros((n, out_width))
+    # Valid entries form a prefix in k, so ascending position is count - 1 - rank.
+    rank = np.cumsum(valid, axis=1) - 1
+    r, c = np.nonzero(valid)
+    pos = counts[r] - 1 - rank[r, c]
+    out_dates[r, pos] = dates[r, c]
+    out_amounts[r, pos] = amounts[r, c]
+    out_times = np.zeros((n, out_width))
+    out_times[r, pos] = year_fraction(np.full(len(r), settle), dates[r, c], day_count)
+
+    bonds = df['bond'].to_numpy() if 'bond' in df.columns else df.index.to_numpy()
+    return CashFlowSchedule(bonds, out_dates, out_times, out_amounts, counts, freq, day_count, settle)
@@ -0,0 +1,182 @@
+import numpy as np
+import pandas as pd
+
+from .cashflows import DEFAULT_DISCOUNT_CACHE, array_key
+
+INTERPOLATION_METHODS = ('linear', 'cubic', 'log_df')
+DEFAULT_KEY_TENORS = (0.25, 0.5, 1, 2, 3, 5, 7, 10, 20, 30)
+
+
+def _natural_cubic_second_derivatives(x, y):
+    """
+    Second derivatives of the natural cubic spline through (x, y).
+    """
+    n = len(x)
+    m = np.zeros(n)
+    if n < 3:
+        return m
+    h = np.diff(x)
+    a = np.zeros((n - 2, n - 2))
+    idx = np.arange(n - 2)
+    a[idx, idx] = 2 * (h[:-1] + h[1:])
+    a[idx[1:], idx[:-1]] = h[1:-1]
+    a[idx[:-1], idx[1:]] = h[1:-1]
+    rhs = 6 * (np.diff(y[1:]) / h[1:] - np.diff(y[:-1]) / h[:-1])
+    m[1:-1] = np.linalg.solve(a, rhs)
+    return m
+
+
+class YieldCurve:
+    """
+    Zero-coupon curve on a tenor grid (years) with continuously compounded decimal rates.
+    Rates are interpolated linearly, with a natural cubic spline, or linearly in
+    log discount factor ('log_df', i.e. piecewise-flat forwards); extrapolation is flat.
+    """
+
+    def __init__(self, tenors, rates, method='linear', name=None):
+        tenors = np.asarray(tenors, dtype=np.float64)
+        rates = np.asarray(rates, dtype=np.float64)
+        if tenors.ndim != 1 or tenors.shape != rates.shape or len(tenors) == 0:
+            raise ValueError("tenors and rates must be non-empty 1-D arrays of equal length")
+        if method not in INTERPOLATION_METHODS:
+            raise ValueError(f"Unsupported interpolation: {method}. Use one of {', '.join(INTERPOLATION_METHODS)}")
+        order = np.argsort(tenors)
+        self.tenors = tenors[order]
+        self.rates = rates[order]
+        if np.any(self.tenors <= 0) or np.any(np.diff(self.tenors) == 0):
+            raise ValueError("tenors must be positive and unique")
+        self.method = method
+        self.name = name
+        self._spline = _natural_cubic_second_derivatives(self.tenors, self.rates) if method == 'cubic' else None
+
+    def __repr__(self):
+        return f"YieldCurve(name={self.name!r}, method={self.method!r}, tenors={self.tenors.tolist()})"
+
+    @property
+    def key(self):
+        """
+        Content key used to share discount-factor tables between calls.
+        """
+        return ('curve', self.method, array_key(self.tenors), array_key(self.rates))
+
+    def zero_rates(self, times):
+        """
+        Interpolated zero rates for an array of times in years.
+        """
+        times = np.asarray(times, dtype=np.float64)
+        x, y = self.tenors, self.rates
+        t = np.clip(times, x[0], x[-1])
+        if self.method == 'linear' or len(x) == 1:
+            return np.interp(t, x, y)
+        if self.method == 'log_df':
+            log_df = np.interp(t, np.concatenate([[0.0], x]), np.concatenate([[0.0], -y * x]))
+            with np.errstate(invalid='ignore', divide='ignore'):
+                inner = -log_df / t
+            return np.where(times <= x[0], y[0], np.where(times >= x[-1], y[-1], inner))
+        j = np.clip(np.searchsorted(x, t, side='right') - 1, 0, len(x) - 2)
+        h = x[j + 1] - x[j]
+        a = (x[j + 1] - t) / h
+        b = (t - x[j]) / h
+        m = self._spline
+        return (a * y[j] + b * y[j + 1]
+                + ((a ** 3 - a) * m[j] + (b ** 3 - b) * m[j + 1]) * h ** 2 / 6.0)
+
+    def discount_factors(self, times, spreads=None, cache=DEFAULT_DISCOUNT_CACHE, grid_key=None):
+        """
+        exp(-(z(t) + s) * t) over a time grid, with optional per-row decimal spreads.
+        """
+        times = np.asarray(times, dtype=np.float64)
+
+        def build():
+            rates = self.zero_rates(times)
+            if spreads is not None:
+                s = np.asarray(spreads, dtype=np.float64)
+                rates = rates + (s[:, None] if times.ndim == 2 and s.ndim == 1 else s)
+            return np.exp(-rates * times)
+
+        if cache is None:
+            return build()
+        curve_key = self.key if spreads is None else self.key + (array_key(np.asarray(spreads, dtype=np.float64)),)
+        return cache.get(curve_key, grid_key or array_key(times), build)
+
+    def shifted(self, shifts, name=None):
+        """
+        New curve with per-tenor decimal shifts added to the rates.
+        """
+        return YieldCurve(self.tenors, self.rates + np.broadcast_to(shifts, self.rates.shape),
+                          method=self.method, name=name or self.name)
+
+    def parallel(self, shift):
+        """
+        Parallel shift of every tenor by `shift` (decimal, 0.01 = 100bp).
+        """
+        return self.shifted(shift)
+
+    def twist(self, short_shift, long_shift):
+        """
+        Steepening/flattening: shifts move linearly from `short_shift` at the first tenor
+        to `long_shift` at the last.
+        """
+        x = self.tenors
+        span = x[-1] - x[0]
+        weight = (x - x[0]) / span if span > 0 else np.zeros_like(x)
+        return self.shifted(short_shift + (long_shift - short_shift) * weight)
+
+    def butterfly(self, wing_shift, belly_shift, belly=None):
+        """
+        Wings move by `wing_shift` and the belly tenor by `belly_shift`, linear in between.
+        The belly defaults to the tenor closest to the mid-point of the grid.
+        """
+        x = self.tenors
+        if belly is None:
+            belly = x[np.argmin(np.abs(x - (x[0] + x[-1]) / 2))]
+        shifts = np.interp(x, [x[0], belly, x[-1]], [wing_shift, belly_shift, wing_shift])
+        return self.shifted(shifts)
+
+    def price(self, schedule, spreads=None, cache=DEFAULT_DISCOUNT_CACHE):
+        """
+        Present value of every bond in a CashFlowSchedule off this curve plus optional spreads.
+        """
+        factors = self.discount_factors(schedule.times, spreads=spreads, cache=cache,
+                                        grid_key=schedule.grid_key)
+        return (schedule.amounts * factors).sum(axis=1)
+
+
+def tenor_label(tenor):
+    return f"{tenor:g}Y"
+
+
+def key_rate_durations(schedule, curve, key_tenors=DEFAULT_KEY_TENORS, spreads=None,
+                       cache=DEFAULT_DISCOUNT_CACHE):
+    """
+    Key-rate durations for every bond in a CashFlowSchedule as a (bonds x key tenors) DataFrame.
+    Each key rate is bumped with a triangular weight between its neighbouring key tenors
+    (flat beyond the ends), so the rows sum to the bond's effective duration. All bonds
+    and tenors are computed in one vectorized pass with no repricing loop.
+    """
+    keys = np.asarray(sorted(key_tenors), dtype=np.float64)
+    times = schedule.times
+    factors = curve.discount_factors(times, spreads=spreads, cache=cache, grid_key=schedule.grid_key)
+    pv = schedule.amounts * factors
+    price = pv.sum(axis=1)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        exposure = pv * times / price[:, None]
+    exposure = np.nan_to_num(exposure)
+
+    n_bonds, n_keys = len(price), len(keys)
+    t = np.clip(times, keys[0], keys[-1])
+    if n_keys == 1:
+        lower = upper = np.zeros(t.shape, dtype=np.intp)
+        w_upper = np.zeros(t.shape)
+    else:
+        upper = np.clip(np.searchsorted(keys, t, side='left'), 1, n_keys - 1)
+        lower = upper - 1
+        w_upper = (t - keys[lower]) / (keys[upper] - keys[lower])
+    rows = np.arange(n_bonds)[:, None] * n_keys
+    size = n_bonds * n_keys
+    krd = (np.bincount((rows + lower).ravel(), weights=(exposure * (1.0 - w_upper)).ravel(), minlength=size)
+           + np.bincount((rows + upper).ravel(), weights=(exposure * w_upper).ravel(), minlength=size))
+    krd = krd.reshape(n_bonds, n_keys)
+    krd[~(price > 0)] = np.nan
+    return pd.DataFrame(krd, index=pd.Index(schedule.bonds, name='bond'),
+                        columns=[tenor_label(k) for k in keys])
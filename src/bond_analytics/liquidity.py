@@ -1,10 +1,262 @@
 import numpy as np
+import pandas as pd
 
-def calculate_liquidity_metrics(df):
-    # Simulate or use real bid-ask and volume data
-    if 'bid_ask_spread' not in df.columns:
-        df['bid_ask_spread'] = np.random.uniform(0.1, 2.0, size=len(df))
-    if 'trading_volume' not in df.columns:
-        df['trading_volume'] = np.random.randint(1000, 100000, size=len(df))
-    liquidity_metrics = df[['bond', 'bid_ask_spread', 'trading_volume']]
-    return liquidity_metrics
\ No newline at end of file
+LIQUIDITY_MEASURES = ('amihud', 'roll_spread', 'turnover', 'days_since_last_trade', 'quoted_spread_bps')
+
+# Direction in which each measure signals illiquidity, for the composite score.
+ILLIQUIDITY_SIGN = {'amihud': 1, 'roll_spread': 1, 'turnover': -1, 'days_since_last_trade': 1,
+                    'quoted_spread_bps': 1}
+
+_TRADE_SUMS = ('dollar_volume', 'volume', 'trades', 'roll_sx', 'roll_sy', 'roll_sxy', 'roll_n')
+_QUOTE_SUMS = ('spread_sum', 'quotes')
+
+
+def _segments(codes, days):
+    # Rows are sorted by (code, day); returns the segment id of each row and each segment's last row.
+    new = np.ones(len(codes), dtype=bool)
+    new[1:] = (codes[1:] != codes[:-1]) | (days[1:] != days[:-1])
+    seg = np.cumsum(new) - 1
+    last = np.r_[np.flatnonzero(new)[1:] - 1, len(codes) - 1] if len(codes) else np.zeros(0, dtype=np.int64)
+    return seg, last
+
+
+class LiquidityEngine:
+    """
+    Per-bond liquidity measures from trade and quote records.
+    Trades (bond, time, price per 100 par, quantity in par) and quotes (bond, time, bid, ask)
+    are reduced on arrival to one row of sufficient statistics per bond and day (close,
+    dollar volume, volume, trade count, Roll autocovariance sums, quoted-spread sums), so
+    daily updates only touch the new records and any window is summarised from the daily
+    table with segment reductions. The last price, price change and trade time per bond are
+    carried between updates; trades at or before a bond's last added trade are rejected.
+    """
+
+    def __init__(self, outstanding=None):
+        self.bonds = pd.Index([], dtype=object)
+        self.outstanding = None if outstanding is None else pd.Series(outstanding, dtype=np.float64)
+        self._last_price = np.zeros(0)
+        self._last_change = np.zeros(0)
+        self._last_time = np.zeros(0, dtype='datetime64[ns]')
+        self._trade_chunks = []
+        self._quote_chunks = []
+        self._trade_days = None
+        self._quote_days = None
+
+    def _codes(self, bonds):
+        bonds = pd.Index(pd.Series(bonds, dtype=object).astype(str))
+        new = bonds.unique().difference(self.bonds, sort=False)
+        if len(new):
+            self.bonds = self.bonds.append(pd.Index(new, dtype=object))
+            grow = len(new)
+            self._last_price = np.r_[self._last_price, np.full(grow, np.nan)]
+            self._last_change = np.r_[self._last_change, np.full(grow, np.nan)]
+            self._last_time = np.r_[self._last_time, np.full(grow, np.datetime64('NaT'), dtype='datetime64[ns]')]
+        return self.bonds.get_indexer(bonds)
+
+    @staticmethod
+    def _columns(df, time_column, required):
+        time_column = time_column if time_column in df.columns else 'date'
+        bond_column = 'bond' if 'bond' in df.columns else 'bond_id'
+        missing = [c for c in (bond_column, time_column) + required if c not in df.columns]
+        if missing:
+            raise ValueError(f"Missing required columns: {', '.join(missing)}")
+        frame = pd.DataFrame({
+            'bond': df[bond_column].to_numpy(),
+            'time': pd.to_datetime(df[time_column]).to_numpy().astype('datetime64[ns]'),
+            **{c: pd.to_numeric(df[c], errors='coerce').to_numpy(dtype=np.float64) for c in required},
+        })
+        return frame.dropna()
+
+    def add_trades(self, trades, time_column='time'):
+        """
+        Absorb trade records (bond or bond_id, time or date, price, quantity). Returns the
+        number of trades added.
+        """
+        frame = self._columns(trades, time_column, ('price', 'quantity'))
+        frame = frame[frame['price'] > 0]
+        if frame.empty:
+            return 0
+        codes = self._codes(frame['bond'])
+        times = frame['time'].to_numpy()
+        order = np.lexsort((times, codes))
+        codes, times = codes[order], times[order]
+        price = frame['price'].to_numpy()[order]
+        quantity = frame['quantity'].to_numpy()[order]
+        first = np.r_[True, codes[1:] != codes[:-1]]
+        last_of_bond = np.r_[first[1:], True]
+        early = times[first] <= self._last_time[codes[first]]
+        if early.any():
+            late = ', '.join(map(str, self.bonds[codes[first][early]][:5]))
+            raise ValueError(f"Trades at or before the last added trade for: {late}")
+
+        # Trade-to-trade price changes, continuing each bond's series from earlier updates.
+        previous = np.r_[np.nan, price[:-1]]
+        previous[first] = self._last_price[codes[first]]
+        change = price - previous
+        lagged = np.r_[np.nan, change[:-1]]
+        lagged[first] = self._last_change[codes[first]]
+        pair = ~(np.isnan(change) | np.isnan(lagged))
+        x, y = np.where(pair, change, 0.0), np.where(pair, lagged, 0.0)
+
+        days = times.astype('datetime64[D]')
+        seg, last = _segments(codes, days)
+        n_seg = len(last)
+        chunk = {'code': codes[last], 'day': days[last], 'close': price[last]}
+        for name, weights in (('dollar_volume', price * quantity / 100.0), ('volume', quantity),
+                              ('trades', None), ('roll_sx', x), ('roll_sy', y), ('roll_sxy', x * y),
+                              ('roll_n', pair.astype(np.float64))):
+            chunk[name] = np.bincount(seg, weights=weights, minlength=n_seg).astype(np.float64)
+        self._trade_chunks.append(chunk)
+        self._trade_days = None
+
+        ends = codes[last_of_bond]
+        self._last_price[ends] = price[last_of_bond]
+        self._last_change[ends] = change[last_of_bond]
+        self._last_time[ends] = times[last_of_bond]
+        return len(frame)
+
+    def add_quotes(self, quotes, time_column='time'):
+        """
+        Absorb quote records (bond or bond_id, time or date, bid, ask); crossed or one-sided
+        quotes are ignored. Returns the number of quotes added.
+        """
+        frame = self._columns(quotes, time_column, ('bid', 'ask'))
+        frame = frame[(frame['ask'] >= frame['bid']) & (frame['bid'] > 0)]
+        if frame.empty:
+            return 0
+        codes = self._codes(frame['bond'])
+        days = frame['time'].to_numpy().astype('datetime64[D]')
+        order = np.lexsort((days, codes))
+        codes, days = codes[order], days[order]
+        bid, ask = frame['bid'].to_numpy()[order], frame['ask'].to_numpy()[order]
+        relative = (ask - bid) / ((ask + bid) / 2.0) * 1e4
+        seg, last = _segments(codes, days)
+        self._quote_chunks.append({
+            'code': codes[last], 'day': days[last],
+            'spread_sum': np.bincount(seg, weights=relative, minlength=len(last)),
+            'quotes': np.bincount(seg, minlength=len(last)).astype(np.float64),
+        })
+        self._quote_days = None
+        return len(frame)
+
+    @staticmethod
+    def _compact(chunks, sums, last_columns=()):
+        # One row per (bond, day): sums add up, `last_columns` keep the latest chunk's value.
+        names = ('code', 'day') + tuple(last_columns) + tuple(sums)
+        if not chunks:
+            table = {'code': np.zeros(0, dtype=np.int64), 'day': np.zeros(0, dtype='datetime64[D]')}
+            table.update({n: np.zeros(0) for n in names[2:]})
+            return table
+        table = {n: np.concatenate([c[n] for c in chunks]) for n in names}
+        order = np.lexsort((np.arange(len(table['code'])), table['day'], table['code']))
+        table = {n: v[order] for n, v in table.items()}
+        seg, last = _segments(table['code'], table['day'])
+        if len(last) < len(seg):
+            merged = {n: table[n][last] for n in ('code', 'day') + tuple(last_columns)}
+            merged.update({n: np.bincount(seg, weights=table[n], minlength=len(last)) for n in sums})
+            table = merged
+        chunks[:] = [table]
+        return table
+
+    def trade_days(self):
+        if self._trade_days is None:
+            self._trade_days = self._compact(self._trade_chunks, _TRADE_SUMS, ('close',))
+        return self._trade_days
+
+    def quote_days(self):
+        if self._quote_days is None:
+            self._quote_days = self._compact(self._quote_chunks, _QUOTE_SUMS)
+        return self._quote_days
+
+    def metrics(self, as_of=None, window=None, outstanding=None):
+        """
+        Liquidity measures per bond over the `window` days up to `as_of` (all history and the
+        latest day by default):
+        - amihud: mean of |daily log return| / dollar volume, per $1mm traded
+        - roll_spread: 2 * sqrt(-cov(dP_t, dP_t-1)) over trade-to-trade price changes
+          (0 when the autocovariance is positive, NaN with fewer than 2 pairs)
+        - turnover: par volume / amount outstanding (`outstanding` by bond)
+        - days_since_last_trade: days from the last trade on or before `as_of`
+        - quoted_spread_bps: mean (ask - bid) / mid
+        - liquidity_score: 0-100, the complement of the mean cross-sectional percentile of
+          the illiquidity measures available for the bond (higher is more liquid)
+        """
+        trades, quotes = self.trade_days(), self.quote_days()
+        n = len(self.bonds)
+        if as_of is None:
+            latest = np.concatenate([trades['day'], quotes['day']])
+            as_of = latest.max() if len(latest) else np.datetime64('today', 'D')
+        as_of = np.datetime64(pd.Timestamp(as_of).date(), 'D')
+        start = as_of - np.timedelta64(int(window), 'D') if window is not None else None
+
+        code, day = trades['code'], trades['day']
+        upto = day <= as_of
+        inside = upto & (day > start) if start is not None else upto
+        sums = {name: np.bincount(code[inside], weights=trades[name][inside], minlength=n) for name in _TRADE_SUMS}
+
+        # Daily log returns between consecutive trading days of the same bond.
+        same = np.r_[False, code[1:] == code[:-1]]
+        prev_close = np.r_[np.nan, trades['close'][:-1]]
+        with np.errstate(divide='ignore', invalid='ignore'):
+            ratio = np.abs(np.log(trades['close'] / prev_close)) / trades['dollar_volume'] * 1e6
+            valid = inside & same & (trades['dollar_volume'] > 0)
+            amihud_sum = np.bincount(code[valid], weights=ratio[valid], minlength=n)
+            amihud_n = np.bincount(code[valid], minlength=n)
+            amihud = np.where(amihud_n > 0, amihud_sum / amihud_n, np.nan)
+
+            pairs = sums['roll_n']
+            cov = (sums['roll_sxy'] - sums['roll_sx'] * sums['roll_sy'] / pairs) / (pairs - 1)
+            roll = np.where(pairs >= 2, 2.0 * np.sqrt(np.maximum(-cov, 0.0)), np.nan)
+
+            # Latest trading day per bond; NaT's integer value is the minimum, so it never wins.
+            last = np.full(n, np.datetime64('NaT', 'D').astype(np.int64), dtype=np.int64)
+            np.maximum.at(last, code[upto], day[upto].astype('datetime64[D]').astype(np.int64))
+            last_day = last.astype('datetime64[D]')
+            days_since = (as_of - last_day).astype(np.float64)
+
+            qcode, qday = quotes['code'], quotes['day']
+            qin = (qday <= as_of) & (qday > start) if start is not None else qday <= as_of
+            q_n = np.bincount(qcode[qin], weights=quotes['quotes'][qin], minlength=n)
+            quoted = np.bincount(qcode[qin], weights=quotes['spread_sum'][qin], minlength=n) / q_n
+
+        result = pd.DataFrame({
+            'trades': sums['trades'].astype(np.int64),
+            'volume': sums['volume'],
+            'dollar_volume': sums['dollar_volume'],
+            'amihud': amihud,
+            'roll_spread': roll,
+            'turnover': np.nan,
+            'days_since_last_trade': np.where(np.isnat(last_day), np.nan, days_since),
+            'quoted_spread_bps': quoted,
+        }, index=pd.Index(self.bonds, name='bond'))
+        outstanding = self.outstanding if outstanding is None else pd.Series(outstanding, dtype=np.float64)
+        if outstanding is not None:
+            amount = outstanding.set_axis(outstanding.index.astype(str)).reindex(result.index).to_numpy()
+            with np.errstate(divide='ignore', invalid='ignore'):
+                result['turnover'] = np.where(amount > 0, result['volume'].to_numpy() / amount, np.nan)
+        ranks = pd.DataFrame({m: (result[m] * ILLIQUIDITY_SIGN[m]).rank(pct=True) for m in LIQUIDITY_MEASURES})
+        result['liquidity_score'] = 100.0 * (1.0 - ranks.mean(axis=1, skipna=True))
+        return result
+
+
+def calculate_liquidity_metrics(df, engine=None, as_of=None, window=None):
+    """
+    Liquidity indicators for the bonds of a portfolio frame, as a new frame (the input is not
+    modified). bid_ask_spread and trading_volume come from the frame when present; with a
+    LiquidityEngine its measures are joined by bond (turnover from the frame's
+    amount_outstanding when it has one). Missing values stay NaN.
+    """
+    result = pd.DataFrame({'bond': df['bond'].to_numpy()})
+    for col in ('bid_ask_spread', 'trading_volume'):
+        result[col] = df[col].to_numpy() if col in df.columns else np.nan
+    if engine is not None:
+        outstanding = None
+        if 'amount_outstanding' in df.columns:
+            outstanding = pd.Series(df['amount_outstanding'].to_numpy(dtype=np.float64),
+                                    index=df['bond'].astype(str).to_numpy())
+            outstanding = outstanding[~outstanding.index.duplicated()]
+        measures = engine.metrics(as_of=as_of, window=window, outstanding=outstanding)
+        measures = measures.reindex(result['bond'].astype(str).to_numpy())
+        for col in measures.columns:
+            result[col] = measures[col].to_numpy()
+    return result
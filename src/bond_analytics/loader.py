@@ -0,0 +1,202 @@
+import hashlib
+import os
+
+import pandas as pd
+
+try:
+    import pyarrow  # noqa: F401
+    import pyarrow.parquet as pq
+    PYARROW_AVAILABLE = True
+except ImportError:
+    PYARROW_AVAILABLE = False
+
+class SchemaError(ValueError):
+    """
+    A portfolio file that was read but does not fit the schema (or needs a missing reader),
+    as opposed to a file that could not be parsed.
+    """
+
+
+REQUIRED_COLUMNS = ['bond', 'sector', 'duration', 'convexity', 'var', 'expectedshortfall']
+
+# Declared dtypes for known portfolio columns; unknown columns keep pandas' inference.
+# Risk and money columns stay float64 so aggregates are exact; quotes fit in float32.
+PORTFOLIO_SCHEMA = {
+    'sector': 'category',
+    'issuer': 'category',
+    'rating': 'category',
+    'duration': 'float64',
+    'convexity': 'float64',
+    'var': 'float64',
+    'expectedshortfall': 'float64',
+    'yield': 'float32',
+    'spread': 'float32',
+    'coupon_rate': 'float32',
+    'bid_ask_spread': 'float32',
+    'face_value': 'float64',
+    'market_value': 'float64',
+    'trading_volume': 'float64',
+    'maturity_date': 'datetime64[ns]',
+    'issue_date': 'datetime64[ns]',
+}
+
+DEFAULT_CHUNKSIZE = 250_000
+
+# File extension -> reader format.
+EXTENSION_FORMATS = {
+    '.csv': 'csv', '.txt': 'csv',
+    '.parquet': 'parquet', '.pq': 'parquet',
+    '.arrow': 'feather', '.feather': 'feather', '.ipc': 'feather',
+    '.xlsx': 'excel', '.xlsm': 'excel', '.xls': 'excel',
+}
+
+
+def cache_dir():
+    """
+    Directory for converted columnar copies of uploads (CREDITPULSE_CACHE_DIR or ~/.cache/creditpulse).
+    """
+    path = os.environ.get('CREDITPULSE_CACHE_DIR') or os.path.join(os.path.expanduser('~'), '.cache', 'creditpulse')
+    os.makedirs(path, exist_ok=True)
+    return path
+
+
+def detect_format(file_path):
+    """
+    File format from the extension, falling back to magic bytes for extensionless uploads.
+    """
+    ext = os.path.splitext(str(file_path))[1].lower()
+    if ext in EXTENSION_FORMATS:
+        return EXTENSION_FORMATS[ext]
+    with open(file_path, 'rb') as f:
+        head = f.read(8)
+    if head.startswith(b'PAR1'):
+        return 'parquet'
+    if head.startswith(b'ARROW1'):
+        return 'feather'
+    if head.startswith(b'PK') or head.startswith(b'\xd0\xcf\x11\xe0'):
+        return 'excel'
+    return 'csv'
+
+
+def file_digest(file_path, block_size=1 << 20):
+    digest = hashlib.sha256()
+    with open(file_path, 'rb') as f:
+        for block in iter(lambda: f.read(block_size), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def normalize_columns(df):
+    df.columns = [str(col).strip().lower() for col in df.columns]
+    return df
+
+
+def validate_columns(df, required=REQUIRED_COLUMNS, where=None):
+    missing = [col for col in required if col not in df.columns]
+    if missing:
+        suffix = f" ({where})" if where else ""
+        raise SchemaError(f"Missing required columns: {', '.join(missing)}{suffix}")
+
+
+def apply_schema(df, schema=PORTFOLIO_SCHEMA):
+    """
+    Cast known columns to their declared dtypes in place of pandas' object/float64 defaults.
+    """
+    for col, dtype in schema.items():
+        if col not in df.columns or str(df[col].dtype) == dtype:
+            continue
+        if dtype == 'category':
+            df[col] = df[col].astype('category')
+        elif dtype.startswith('datetime'):
+            df[col] = pd.to_datetime(df[col], errors='coerce')
+        else:
+            df[col] = pd.to_numeric(df[col], errors='coerce').astype(dtype)
+    return df
+
+
+def concat_chunks(chunks):
+    """
+    Concatenate schema'd chunks, unioning categorical columns so they stay categorical.
+    """
+    chunks = list(chunks)
+    if not chunks:
+        raise SchemaError("File contains no rows")
+    if len(chunks) == 1:
+        return chunks[0].reset_index(drop=True)
+    categorical = [col for col in chunks[0].columns if isinstance(chunks[0][col].dtype, pd.CategoricalDtype)]
+    for col in categorical:
+        unified = pd.api.types.union_categoricals([c[col] for c in chunks], ignore_order=True).categories
+        for c in chunks:
+            c[col] = c[col].cat.set_categories(unified)
+    return pd.concat(chunks, ignore_index=True)
+
+
+def excel_to_columnar(file_path, schema=PORTFOLIO_SCHEMA):
+    """
+    Convert an Excel upload once to a columnar file cached by content hash and return its path.
+    Parquet is used when pyarrow is installed, otherwise a pickle.
+    """
+    ext = '.parquet' if PYARROW_AVAILABLE else '.pkl'
+    target = os.path.join(cache_dir(), f"{file_digest(file_path)}{ext}")
+    if os.path.exists(target):
+        return target
+    df = apply_schema(normalize_columns(pd.read_excel(file_path)), schema)
+    tmp = f"{target}.{os.getpid()}.tmp"
+    if PYARROW_AVAILABLE:
+        df.to_parquet(tmp, index=False)
+    else:
+        df.to_pickle(tmp)
+    os.replace(tmp, target)
+    return target
+
+
+def iter_portfolio_chunks(file_path, chunksize=DEFAULT_CHUNKSIZE, schema=PORTFOLIO_SCHEMA,
+                          required=REQUIRED_COLUMNS):
+    """
+    Yield typed DataFrame chunks of a portfolio file, validating required columns per chunk.
+    CSV is streamed with pandas' chunked reader and Parquet by row group batches; Excel is
+    read through its cached columnar copy.
+    """
+    fmt = detect_format(file_path)
+    if fmt == 'excel':
+        file_path = excel_to_columnar(file_path, schema)
+        if file_path.endswith('.pkl'):
+            df = pd.read_pickle(file_path)
+            for start in range(0, max(len(df), 1), chunksize):
+                chunk = df.iloc[start:start + chunksize]
+                validate_columns(chunk, required, f"rows {start}-{start + len(chunk)}")
+                yield chunk
+            return
+        fmt = 'parquet'
+
+    if fmt == 'csv':
+        reader = pd.read_csv(file_path, chunksize=chunksize)
+    elif fmt == 'parquet':
+        if not PYARROW_AVAILABLE:
+            raise SchemaError("Reading Parquet requires pyarrow: pip install pyarrow")
+        reader = (batch.to_pandas() for batch in pq.ParquetFile(file_path).iter_batches(batch_size=chunksize))
+    else:
+        if not PYARROW_AVAILABLE:
+            raise SchemaError("Reading Arrow files requires pyarrow: pip install pyarrow")
+        df = pd.read_feather(file_path)
+        reader = (df.iloc[start:start + chunksize] for start in range(0, max(len(df), 1), chunksize))
+
+    start = 0
+    for chunk in reader:
+        chunk = normalize_columns(chunk)
+        validate_columns(chunk, required, f"rows {start}-{start + len(chunk)}")
+        yield apply_schema(chunk, schema)
+        start += len(chunk)
+    if start == 0 and fmt == 'csv':
+        # Header-only file: still validate and return an empty, typed frame.
+        chunk = normalize_columns(pd.read_csv(file_path, nrows=0))
+        validate_columns(chunk, required)
+        yield apply_schema(chunk, schema)
+
+
+def load_portfolio_frame(file_path, chunksize=DEFAULT_CHUNKSIZE, schema=PORTFOLIO_SCHEMA,
+                         required=REQUIRED_COLUMNS):
+    """
+    Load a CSV, Excel, Parquet or Arrow portfolio into one typed DataFrame, chunk by chunk.
+    """
+    return concat_chunks(iter_portfolio_chunks(file_path, chunksize, schema, required))
@@ -1,20 +1,190 @@
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
 import requests
 import pandas as pd
+from requests.adapters import HTTPAdapter
+
+from .loader import cache_dir
+
+FRED_URL = "https://api.stlouisfed.org/fred/series/observations"
+
+# Series commonly linked to credit spreads.
+FRED_SERIES = {
+    "DGS2": "2-Year Treasury Constant Maturity Rate",
+    "DGS10": "10-Year Treasury Constant Maturity Rate",
+    "DFF": "Federal Funds Rate",
+    "BAMLH0A0HYM2": "ICE BofA US High Yield Index Option-Adjusted Spread",
+}
+
+# Daily FRED series update at most once a day; re-check a few times a day.
+DEFAULT_TTL = 6 * 3600
+
 
 class MacroAPI:
-    def fetch_fred(self, series_id, api_key):
-        url = f"https://api.stlouisfed.org/fred/series/observations"
+    """
+    FRED client with a local store per series.
+    Each series is cached as <cache>/fred/<SERIES>.csv plus a .json metadata file. Within
+    `ttl` seconds (per-series overrides in `ttls`) the cache is served as-is; after that only
+    observations from the last cached date onwards are requested and merged in. In
+    `offline` mode, or when a refresh fails, cached data is served. `session` is any object
+    with requests' `get(url, params=..., timeout=...)`, so recorded fixtures can stand in for
+    the network; `clock` returns the current time in seconds.
+    """
+
+    def __init__(self, cache_path=None, ttl=DEFAULT_TTL, ttls=None, offline=False, session=None,
+                 clock=time.time, max_workers=8, timeout=10):
+        self.cache_path = cache_path or os.path.join(cache_dir(), 'fred')
+        self.ttl = ttl
+        self.ttls = dict(ttls or {})
+        self.offline = offline
+        self.clock = clock
+        self.max_workers = max_workers
+        self.timeout = timeout
+        if session is None:
+            session = requests.Session()
+            session.mount('https://', HTTPAdapter(pool_maxsize=max_workers))
+        self.session = session
+        self._locks = {}
+        self._locks_guard = threading.Lock()
+
+    def _lock(self, series_id):
+        with self._locks_guard:
+            return self._locks.setdefault(series_id, threading.Lock())
+
+    def _paths(self, series_id):
+        base = os.path.join(self.cache_path, series_id.upper())
+        return f"{base}.csv", f"{base}.json"
+
+    def read_cache(self, series_id):
+        """
+        Cached observations and metadata for a series, or (None, {}) when nothing is stored.
+        """
+        data_path, meta_path = self._paths(series_id)
+        if not (os.path.exists(data_path) and os.path.exists(meta_path)):
+            return None, {}
+        with open(meta_path) as f:
+            meta = json.load(f)
+        df = pd.read_csv(data_path, parse_dates=['date'])
+        return df[['date', 'value']], meta
+
+    def _write_cache(self, series_id, df, meta):
+        data_path, meta_path = self._paths(series_id)
+        os.makedirs(self.cache_path, exist_ok=True)
+        suffix = f".{os.getpid()}.{threading.get_ident()}.tmp"
+        df.to_csv(data_path + suffix, index=False, date_format='%Y-%m-%d')
+        with open(meta_path + suffix, 'w') as f:
+            json.dump(meta, f)
+        os.replace(data_path + suffix, data_path)
+        os.replace(meta_path + suffix, meta_path)
+
+    def _request(self, series_id, api_key, observation_start=None):
         params = {"series_id": series_id, "api_key": api_key, "file_type": "json"}
-        r = requests.get(url, params=params)
+        if observation_start is not None:
+            params["observation_start"] = observation_start
+        r = self.session.get(FRED_URL, params=params, timeout=self.timeout)
+        r.raise_for_status()
         data = r.json()
-        df = pd.DataFrame(data['observations'])
+        df = pd.DataFrame(data.get('observations', []), columns=['date', 'value'])
+        df['date'] = pd.to_datetime(df['date'])
         df['value'] = pd.to_numeric(df['value'], errors='coerce')
         return df[['date', 'value']]
 
+    def is_fresh(self, series_id, meta):
+        ttl = self.ttls.get(series_id, self.ttl)
+        return bool(meta) and self.clock() - meta.get('fetched_at', 0) < ttl
+
+    def fetch_fred(self, series_id, api_key=None, refresh=False):
+        """
+        Observations (date, value) for a FRED series, from cache when fresh and otherwise
+        refreshed incrementally. `refresh=True` ignores the TTL.
+        """
+        with self._lock(series_id):
+            cached, meta = self.read_cache(series_id)
+            if self.offline or (cached is not None and not refresh and self.is_fresh(series_id, meta)):
+                if cached is None:
+                    raise ValueError(f"No cached data for {series_id} (offline mode)")
+                return cached
+            if not api_key:
+                if cached is None:
+                    raise ValueError(f"A FRED API key is required to fetch {series_id}")
+                return cached
+
+            start = meta.get('last_date') if cached is not None else None
+            try:
+                fresh = self._request(series_id, api_key, observation_start=start)
+            except (requests.RequestException, ValueError):
+                if cached is None:
+                    raise
+                return cached
+            if cached is not None and not cached.empty:
+                # The last cached date is requested again so revisions to it are picked up.
+                df = pd.concat([cached, fresh], ignore_index=True)
+                df = df.drop_duplicates('date', keep='last').sort_values('date', ignore_index=True)
+            else:
+                df = fresh.sort_values('date', ignore_index=True)
+            meta = {
+                'series_id': series_id,
+                'fetched_at': self.clock(),
+                'last_date': df['date'].max().strftime('%Y-%m-%d') if len(df) else None,
+                'rows': len(df),
+            }
+            self._write_cache(series_id, df, meta)
+            return df
+
+    def fetch_many(self, series_ids=None, api_key=None, refresh=False, max_workers=None):
+        """
+        Fetch several series concurrently; returns ({series_id: DataFrame}, {series_id: error
+        message}) so one failing series does not discard the others.
+        """
+        series_ids = list(series_ids or FRED_SERIES)
+        workers = min(max_workers or self.max_workers, max(len(series_ids), 1))
+        results, errors = {}, {}
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            futures = {s: pool.submit(self.fetch_fred, s, api_key, refresh) for s in series_ids}
+            for series_id, future in futures.items():
+                try:
+                    results[series_id] = future.result()
+                except Exception as e:
+                    errors[series_id] = str(e)
+        return results, errors
+
+    def fetch_panel(self, series_ids=None, api_key=None, refresh=False):
+        """
+        Wide DataFrame of several series indexed by date, one column per series that could be
+        fetched; the others are listed with their errors in the frame's `errors` attribute.
+        Raises ValueError only when no series could be fetched.
+        """
+        frames, errors = self.fetch_many(series_ids, api_key, refresh)
+        if errors and not frames:
+            detail = '; '.join(f"{s}: {e}" for s, e in errors.items())
+            raise ValueError(f"Could not fetch FRED series: {detail}")
+        panel = pd.DataFrame({s: df.set_index('date')['value'] for s, df in frames.items()}).sort_index()
+        panel.attrs['errors'] = errors
+        return panel
+
     # Add similar methods for World Bank, IMF as needed
 
-    def link_macro_to_bonds(self, macro_df, bond_df, macro_col='value', bond_col='spread'):
-        # Example: correlate macro variable with bond spreads
+    def link_macro_to_bonds(self, macro_df, bond_df, macro_col='value', bond_col='spread', date_col='date',
+                            tolerance=None):
+        """
+        Attach a macro series to bond rows. Rows with a `date_col` get the latest macro value
+        published on or before their date (as-of join); otherwise the latest value is used.
+        For betas/correlations across the book see bond_analytics.macro_linkage.
+        """
         merged = bond_df.copy()
-        merged[macro_col] = macro_df[macro_col].iloc[-1]  # Use latest macro value
-        return merged
\ No newline at end of file
+        if date_col not in merged.columns or date_col not in macro_df.columns:
+            merged[macro_col] = macro_df[macro_col].iloc[-1]  # Use latest macro value
+            return merged
+        macro = macro_df[[date_col, macro_col]].copy()
+        macro[date_col] = pd.to_datetime(macro[date_col])
+        macro = macro.dropna().sort_values(date_col)
+        left = pd.DataFrame({date_col: pd.to_datetime(merged[date_col]).to_numpy(), '_row': np.arange(len(merged))})
+        joined = pd.merge_asof(left.sort_values(date_col), macro, on=date_col, direction='backward',
+                               tolerance=tolerance)
+        merged[macro_col] = joined.sort_values('_row')[macro_col].to_numpy()
+        return merged
@@ -0,0 +1,195 @@
+import warnings
+
+import numpy as np
+import pandas as pd
+
+EXPOSURE_STATS = ('beta', 'corr')
+
+
+def spread_panel(df, date_column='date', bond_column='bond', value_column='spread'):
+    """
+    Wide (dates x bonds) spread panel from long per-bond observations; the last
+    observation wins when a bond has several on one date.
+    """
+    missing = [c for c in (date_column, bond_column, value_column) if c not in df.columns]
+    if missing:
+        raise ValueError(f"Missing required columns: {', '.join(missing)}")
+    data = df[[date_column, bond_column, value_column]].copy()
+    data[date_column] = pd.to_datetime(data[date_column])
+    data[value_column] = pd.to_numeric(data[value_column], errors='coerce')
+    data = data.drop_duplicates([date_column, bond_column], keep='last')
+    return data.pivot(index=date_column, columns=bond_column, values=value_column).sort_index()
+
+
+def align_macro(macro, dates, tolerance=None):
+    """
+    As-of join of a (dates x series) macro panel onto `dates`: each date takes the latest
+    observation of every series published on or before it, at most `tolerance` old
+    (e.g. pd.Timedelta('7D')).
+    """
+    panel = macro.sort_index().ffill()
+    panel.index = pd.to_datetime(panel.index)
+    left = pd.DataFrame({'date': pd.to_datetime(pd.Index(dates))})
+    right = panel.rename_axis('date').reset_index()
+    merged = pd.merge_asof(left.sort_values('date'), right, on='date', direction='backward',
+                           tolerance=tolerance)
+    merged.index = left.sort_values('date').index
+    return merged.sort_index().set_index('date')[list(panel.columns)]
+
+
+def _prepare(spreads, macro, changes, tolerance):
+    spreads = spreads.sort_index()
+    spreads.index = pd.to_datetime(spreads.index)
+    factors = align_macro(macro, spreads.index, tolerance)
+    y = spreads.to_numpy(dtype=np.float64)
+    x = factors.to_numpy(dtype=np.float64)
+    dates = spreads.index
+    if changes:
+        y, x, dates = np.diff(y, axis=0), np.diff(x, axis=0), dates[1:]
+    # Centering keeps the running sums well conditioned.
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore', RuntimeWarning)
+        y = y - np.nan_to_num(np.nanmean(y, axis=0))
+        x = x - np.nan_to_num(np.nanmean(x, axis=0))
+    return y, x, dates, spreads.columns, factors.columns
+
+
+def _moments_to_stats(n, sx, sy, sxy, sxx, syy, min_periods, beta=None, corr=None):
+    # Inputs broadcast against each other; one-sided moments may have a length-1 axis, so
+    # everything except the cross moment stays small. `sxy` is overwritten, and results are
+    # written into `beta` / `corr` when given.
+    with np.errstate(invalid='ignore', divide='ignore'):
+        inv_n = 1.0 / n
+        mx, my = sx * inv_n, sy * inv_n
+        var_x = sxx * inv_n - mx ** 2
+        var_y = syy * inv_n - my ** 2
+        cov = np.multiply(sxy, inv_n, out=sxy)
+        cov -= mx * my
+        valid_x = (n >= min_periods) & (var_x > 0)
+        # Reciprocals are taken on the small one-sided arrays; the full arrays only multiply.
+        beta = np.multiply(cov, 1.0 / var_x, out=beta, casting='same_kind')
+        np.copyto(beta, np.nan, where=~valid_x)
+        cov *= 1.0 / np.sqrt(var_x)
+        corr = np.multiply(cov, 1.0 / np.sqrt(var_y), out=corr, casting='same_kind')
+        np.clip(corr, -1.0, 1.0, out=corr)
+        np.copyto(corr, np.nan, where=~(valid_x & (var_y > 0)))
+    return beta, corr
+
+
+def factor_exposures(spreads, macro, window=None, changes=True, min_periods=20, tolerance=None):
+    """
+    Factor-exposure matrices of every bond to every macro series over the last `window`
+    dates (all history when None). `spreads` is a (dates x bonds) panel (see spread_panel or
+    TimeSeriesStore.panel), `macro` a (dates x series) panel such as MacroAPI.fetch_panel.
+    Betas and correlations are computed on daily changes by default, using the observations
+    where both the bond and the series are present, with a handful of matrix products
+    instead of pairwise loops.
+    Returns {'beta', 'corr', 'n_obs'} DataFrames of shape (bonds x series).
+    """
+    y, x, dates, bonds, series = _prepare(spreads, macro, changes, tolerance)
+    if window is not None:
+        y, x = y[-window:], x[-window:]
+    my, mx = ~np.isnan(y), ~np.isnan(x)
+    yz, xz = np.where(my, y, 0.0), np.where(mx, x, 0.0)
+    my, mx = my.astype(np.float64), mx.astype(np.float64)
+    n = my.T @ mx
+    beta, corr = _moments_to_stats(n, my.T @ xz, yz.T @ mx, yz.T @ xz, my.T @ xz ** 2,
+                                   (yz ** 2).T @ mx, min_periods)
+    index = pd.Index(bonds, name='bond')
+    columns = pd.Index(series, name='series')
+    return {
+        'beta': pd.DataFrame(beta, index=index, columns=columns),
+        'corr': pd.DataFrame(corr, index=index, columns=columns),
+        'n_obs': pd.DataFrame(n.astype(np.int64), index=index, columns=columns),
+    }
+
+
+class RollingExposures:
+    """
+    Rolling betas and correlations as (dates x bonds x series) float32 arrays.
+    """
+
+    def __init__(self, dates, bonds, series, beta, corr):
+        self.dates = dates
+        self.bonds = bonds
+        self.series = series
+        self.beta = beta
+        self.corr = corr
+
+    def _stat(self, stat):
+        if stat not in EXPOSURE_STATS:
+            raise ValueError(f"Unsupported stat: {stat}. Use one of {', '.join(EXPOSURE_STATS)}")
+        return getattr(self, stat)
+
+    def at(self, date=None, stat='beta'):
+        """
+        (bonds x series) exposure matrix as of `date` (latest when None).
+        """
+        i = len(self.dates) - 1 if date is None else self.dates.get_indexer([pd.Timestamp(date)], method='pad')[0]
+        if i < 0:
+            raise ValueError(f"No rolling exposure on or before {date}")
+        return pd.DataFrame(self._stat(stat)[i], index=pd.Index(self.bonds, name='bond'),
+                            columns=pd.Index(self.series, name='series'))
+
+    def history(self, bond, stat='beta'):
+        """
+        (dates x series) exposure history of one bond.
+        """
+        j = self.bonds.get_loc(bond)
+        return pd.DataFrame(self._stat(stat)[:, j, :], index=self.dates,
+                            columns=pd.Index(self.series, name='series'))
+
+
+def rolling_exposures(spreads, macro, window=60, changes=True, min_periods=None, tolerance=None,
+                      chunk_size=64):
+    """
+    Rolling `window`-date betas and correlations of every bond to every macro series.
+    Running sums of the pairwise moments are accumulated with cumulative sums over time and
+    differenced `window` rows apart, `chunk_size` bonds at a time to bound memory.
+    """
+    if min_periods is None:
+        min_periods = max(2, window // 2)
+    y, x, dates, bonds, series = _prepare(spreads, macro, changes, tolerance)
+    n_dates, n_bonds, n_series = y.shape[0], y.shape[1], x.shape[1]
+    beta = np.empty((n_dates, n_bonds, n_series), dtype=np.float32)
+    corr = np.empty((n_dates, n_bonds, n_series), dtype=np.float32)
+    mx = ~np.isnan(x)
+    x_full = bool(mx.all())
+    xz = np.where(mx, x, 0.0)
+    mx = mx.astype(np.float64)
+
+    def windowed(values, scratch=False):
+        # Running sums differenced `window` rows apart, in place from the end backwards.
+        # `scratch` marks a temporary that can hold the result.
+        total = np.cumsum(values, axis=0, out=values if scratch else None)
+        for end in range(len(total), window, -window):
+            start = max(window, end - window)
+            total[start:end] -= total[start - window:end - window]
+        return total
+
+    # Moments that only involve one side collapse to (dates x bonds) or (dates x series)
+    # sums when the other side has no gaps; only the cross moment is always pairwise.
+    wx, wxx = windowed(xz)[:, None, :], windowed(xz ** 2, scratch=True)[:, None, :]
+    wmx = windowed(mx)[:, None, :]
+    for start in range(0, n_bonds, chunk_size):
+        block = y[:, start:start + chunk_size]
+        my = ~np.isnan(block)
+        y_full = bool(my.all())
+        yz = np.where(my, block, 0.0)
+        my = my.astype(np.float64)
+        if x_full:
+            n = windowed(my[:, :1] if y_full else my)[:, :, None]
+            sy, syy = windowed(yz)[:, :, None], windowed(yz ** 2, scratch=True)[:, :, None]
+        else:
+            n = wmx if y_full else windowed(my[:, :, None] * mx[:, None, :], scratch=True)
+            sy = windowed(yz[:, :, None] * mx[:, None, :], scratch=True)
+            syy = windowed((yz ** 2)[:, :, None] * mx[:, None, :], scratch=True)
+        if y_full:
+            sx, sxx = wx, wxx
+        else:
+            sx = windowed(my[:, :, None] * xz[:, None, :], scratch=True)
+            sxx = windowed(my[:, :, None] * (xz ** 2)[:, None, :], scratch=True)
+        sxy = windowed(yz[:, :, None] * xz[:, None, :], scratch=True)
+        _moments_to_stats(n, sx, sy, sxy, sxx, syy, min_periods,
+                          beta[:, start:start + chunk_size], corr[:, start:start + chunk_size])
+    return RollingExposures(dates, bonds, series, beta, corr)
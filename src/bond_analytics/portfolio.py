@@ -1,34 +1,204 @@
+import numpy as np
 import pandas as pd
 
-REQUIRED_COLUMNS = ['bond', 'sector', 'duration', 'convexity', 'var', 'expectedshortfall']
+from .loader import DEFAULT_CHUNKSIZE, REQUIRED_COLUMNS, SchemaError, apply_schema, load_portfolio_frame
+from .montecarlo import monte_carlo_var
+
+TOTAL_COLUMNS = ['duration', 'convexity', 'var', 'expectedshortfall']
+SECTOR_COLUMNS = ['duration', 'var']
+
+
+def _normalize_frame(df):
+    df = df.copy()
+    # Normalize column names
+    df.columns = [str(col).strip().lower() for col in df.columns]
+
+    # Check for required columns
+    missing = [col for col in REQUIRED_COLUMNS if col not in df.columns]
+    if missing:
+        raise ValueError(f"Missing required columns: {', '.join(missing)}")
+    return df
+
+
+def _common_dtype(left, right):
+    try:
+        return np.result_type(left.dtype, right.dtype)
+    except TypeError:
+        return object
+
+
+def row_hashes(df):
+    """
+    One uint64 content hash per row (column order independent), indexed by bond.
+    """
+    columns = sorted(df.columns)
+    hashes = pd.util.hash_pandas_object(df[columns], index=False)
+    return pd.Series(hashes.to_numpy(), index=df['bond'].to_numpy())
+
 
 class Portfolio:
-    def __init__(self, file_path):
+    def __init__(self, file_path, chunksize=DEFAULT_CHUNKSIZE):
         try:
-            if file_path.endswith('.csv'):
-                df = pd.read_csv(file_path)
-            else:
-                df = pd.read_excel(file_path)
+            df = load_portfolio_frame(file_path, chunksize=chunksize)
+        except SchemaError:
+            raise
         except Exception as e:
+            # Parser errors (pandas.errors.ParserError is a ValueError) included.
             raise ValueError(f"Error reading file: {e}")
 
-        # Normalize column names
-        df.columns = [col.strip().lower() for col in df.columns]
+        self._set_frame(_normalize_frame(df))
+
+    @classmethod
+    def from_frame(cls, df):
+        portfolio = cls.__new__(cls)
+        portfolio._set_frame(apply_schema(_normalize_frame(df)))
+        return portfolio
+
+    def _set_frame(self, df):
+        self.df = df.reset_index(drop=True)
+        self._next_label = len(self.df)
+        self._labels = None
+        self._hashes = None
+        self._hash_columns = None
+        self.refresh()
+
+    def refresh(self):
+        """
+        Recompute the running aggregates from scratch with a full reduction.
+        """
+        self._totals = pd.Series(0.0, index=TOTAL_COLUMNS)
+        self._sectors = {}
+        self._accumulate(self.df, 1)
 
-        # Check for required columns
-        missing = [col for col in REQUIRED_COLUMNS if col not in df.columns]
-        if missing:
-            raise ValueError(f"Missing required columns: {', '.join(missing)}")
+    def _accumulate(self, rows, sign):
+        if rows.empty:
+            return
+        values = rows[TOTAL_COLUMNS].apply(pd.to_numeric, errors='coerce').astype(np.float64)
+        self._totals += sign * values.sum()
+        grouped = values[SECTOR_COLUMNS].assign(count=1.0).groupby(rows['sector'], sort=False, observed=True).sum()
+        for sector, (duration, var, count) in zip(grouped.index, grouped.to_numpy()):
+            state = self._sectors.setdefault(sector, np.zeros(3))
+            state += sign * np.array([count, duration, var])
+            if state[0] <= 0:
+                del self._sectors[sector]
 
-        self.df = df
+    def _label_index(self):
+        if self._labels is None:
+            if self.df['bond'].duplicated().any():
+                raise ValueError("Incremental updates require unique bond identifiers")
+            self._labels = dict(zip(self.df['bond'], self.df.index))
+        return self._labels
+
+    def _align_categories(self, rows):
+        for col in rows.columns.intersection(self.df.columns):
+            dtype = self.df[col].dtype
+            if not isinstance(dtype, pd.CategoricalDtype):
+                continue
+            unseen = pd.Index(rows[col].dropna().unique()).difference(dtype.categories)
+            if len(unseen):
+                self.df[col] = self.df[col].cat.add_categories(unseen)
+            rows[col] = rows[col].astype(self.df[col].dtype)
+        return rows
+
+    def apply_delta(self, rows=None, removed=None):
+        """
+        Add or modify positions (`rows`, keyed by `bond`) and drop `removed` bond ids.
+        Running aggregates are updated from the changed rows only.
+        Returns counts of added, modified and removed positions.
+        """
+        labels = self._label_index()
+        summary = {'added': 0, 'modified': 0, 'removed': 0}
+        if removed is not None:
+            drop = [labels[b] for b in dict.fromkeys(removed) if b in labels]
+            if drop:
+                self._accumulate(self.df.loc[drop], -1)
+                if self._hashes is not None:
+                    self._hashes = self._hashes.drop(self.df.loc[drop, 'bond'].to_numpy())
+                for b in self.df.loc[drop, 'bond']:
+                    del labels[b]
+                self.df = self.df.drop(index=drop)
+                summary['removed'] = len(drop)
+
+        if rows is not None:
+            rows = pd.DataFrame(rows)
+            rows = apply_schema(_normalize_frame(rows).drop_duplicates('bond', keep='last'))
+            rows = self._align_categories(rows)
+            for col in rows.columns.difference(self.df.columns):
+                self.df[col] = np.nan
+            known = np.array([b in labels for b in rows['bond']], dtype=bool)
+
+            existing = rows[known]
+            if not existing.empty:
+                target = [labels[b] for b in existing['bond']]
+                self._accumulate(self.df.loc[target], -1)
+                for col in existing.columns:
+                    current = self.df.loc[target, col].to_numpy()
+                    incoming = existing[col].to_numpy()
+                    if (pd.isna(current) & pd.isna(incoming) | (current == incoming)).all():
+                        continue
+                    if self.df[col].dtype != existing[col].dtype:
+                        self.df[col] = self.df[col].astype(_common_dtype(self.df[col], existing[col]))
+                    self.df.loc[target, col] = existing[col].to_numpy()
+                self._accumulate(self.df.loc[target], 1)
+                summary['modified'] = len(target)
+
+            added = rows[~known]
+            if not added.empty:
+                new_labels = range(self._next_label, self._next_label + len(added))
+                self._next_label += len(added)
+                added = added.set_axis(list(new_labels))
+                self.df = pd.concat([self.df, added], axis=0)
+                labels.update(zip(added['bond'], added.index))
+                self._accumulate(added, 1)
+                summary['added'] = len(added)
+
+            if self._hashes is not None:
+                changed = self.df.loc[[labels[b] for b in rows['bond']]]
+                fresh = row_hashes(changed.reindex(columns=self._hash_columns))
+                self._hashes = pd.concat([self._hashes.drop(fresh.index, errors='ignore'), fresh])
+        return summary
+
+    def diff(self, other):
+        """
+        Compare this book with another upload of it by row hashing.
+        Returns (rows that are new or changed, bond ids that disappeared).
+        """
+        other = _normalize_frame(other)
+        for col in other.columns.intersection(self.df.columns):
+            # Categoricals hash by value, so they compare equal to plain strings as-is.
+            if other[col].dtype != self.df[col].dtype and not isinstance(self.df[col].dtype, pd.CategoricalDtype):
+                try:
+                    other[col] = other[col].astype(self.df[col].dtype)
+                except (TypeError, ValueError):
+                    pass
+        if self._hashes is None or list(self._hash_columns) != sorted(other.columns):
+            self._hash_columns = sorted(other.columns)
+            aligned = self.df.reindex(columns=other.columns)
+            self._hashes = row_hashes(aligned)
+        new_hashes = row_hashes(other)
+        old = self._hashes.reindex(new_hashes.index)
+        changed = other[(old.to_numpy() != new_hashes.to_numpy())]
+        removed = self._hashes.index.difference(new_hashes.index)
+        return changed, list(removed)
+
+    def sync(self, source):
+        """
+        Bring the book in line with a re-upload (path or DataFrame), recomputing only moved rows.
+        """
+        if isinstance(source, pd.DataFrame):
+            other = source
+        else:
+            other = Portfolio(source).df
+        changed, removed = self.diff(other)
+        return self.apply_delta(changed, removed)
 
     def aggregate_metrics(self):
         try:
             metrics = {
-                'Total Duration': self.df['duration'].sum(),
-                'Total Convexity': self.df['convexity'].sum(),
-                'Portfolio VaR': self.df['var'].sum(),
-                'Portfolio Expected Shortfall': self.df['expectedshortfall'].sum()
+                'Total Duration': self._totals['duration'],
+                'Total Convexity': self._totals['convexity'],
+                'Portfolio VaR': self._totals['var'],
+                'Portfolio Expected Shortfall': self._totals['expectedshortfall']
             }
             return metrics
         except Exception as e:
@@ -36,18 +206,33 @@ class Portfolio:
 
     def sector_exposure(self):
         try:
-            exposure = self.df.groupby('sector').agg({
-                'bond': 'count',
-                'duration': 'sum',
-                'var': 'sum'
-            }).rename(columns={'bond': 'Bond Count'})
+            sectors = sorted(self._sectors)
+            values = np.array([self._sectors[s] for s in sectors]).reshape(-1, 3)
+            exposure = pd.DataFrame({
+                'Bond Count': values[:, 0].round().astype(int),
+                'duration': values[:, 1],
+                'var': values[:, 2],
+            }, index=pd.Index(sectors, name='sector'))
             return exposure
         except Exception as e:
             return {"Error": f"Could not calculate sector exposure: {e}"}
 
     def concentration_risk(self):
         try:
-            sector_counts = self.df['sector'].value_counts(normalize=True)
+            counts = pd.Series({s: state[0] for s, state in self._sectors.items()}, dtype=np.float64)
+            sector_counts = (counts / counts.sum()).sort_values(ascending=False, kind='stable')
+            sector_counts.index.name = 'sector'
+            sector_counts.name = 'proportion'
             return sector_counts
         except Exception as e:
-            return {"Error": f"Could not calculate concentration risk: {e}"}
\ No newline at end of file
+            return {"Error": f"Could not calculate concentration risk: {e}"}
+
+    def simulated_var(self, **kwargs):
+        """
+        Diversified VaR / Expected Shortfall from correlated rate and spread simulation.
+        Keyword arguments are passed to bond_analytics.montecarlo.monte_carlo_var.
+        """
+        try:
+            return monte_carlo_var(self.df, **kwargs).summary
+        except Exception as e:
+            return {"Error": f"Could not simulate VaR: {e}"}
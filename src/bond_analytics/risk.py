@@ -0,0 +1,119 @@
+import numpy as np
+import pandas as pd
+
+from .cashflows import DEFAULT_DISCOUNT_CACHE, DEFAULT_FREQUENCY, discount_factors, generate_schedules
+
+RISK_COLUMNS = ['price', 'macaulay_duration', 'modified_duration', 'convexity', 'dv01']
+
+
+def cash_flow_matrix(cash_flows):
+    """
+    Pack a sequence of per-bond cash-flow lists into a zero-padded 2-D array.
+    Row i holds bond i's cash flows for periods 1..n; shorter rows are padded with 0.
+    """
+    if isinstance(cash_flows, np.ndarray) and cash_flows.ndim == 2:
+        return cash_flows.astype(np.float64, copy=False)
+    rows = [np.asarray(cf, dtype=np.float64).ravel() for cf in cash_flows]
+    width = max((len(r) for r in rows), default=0)
+    matrix = np.zeros((len(rows), width), dtype=np.float64)
+    for i, r in enumerate(rows):
+        matrix[i, :len(r)] = r
+    return matrix
+
+
+def risk_from_cash_flows(cash_flows, rates, times=None, frequency=1, factors=None):
+    """
+    Price, Macaulay/modified duration, convexity and DV01 for every row of a cash-flow matrix.
+    `rates` are decimal yields per bond (shape (n,) or scalar); `times` are year fractions
+    with the same shape as `cash_flows` and default to periods 1..m. `frequency` is the
+    compounding frequency (scalar or per bond). Discount factors are computed once, or taken
+    from `factors` when already cached, and shared by every metric. Bonds with no remaining
+    value get NaN.
+    """
+    cash_flows = cash_flow_matrix(cash_flows)
+    n_bonds, n_periods = cash_flows.shape
+    rates = np.broadcast_to(np.asarray(rates, dtype=np.float64), (n_bonds,))
+    if times is None:
+        times = np.broadcast_to(np.arange(1, n_periods + 1, dtype=np.float64) / frequency,
+                                cash_flows.shape)
+    else:
+        times = np.nan_to_num(np.asarray(times, dtype=np.float64))
+
+    if factors is None:
+        factors = discount_factors(rates, times, frequency)
+    frequency = np.broadcast_to(np.asarray(frequency, dtype=np.float64), (n_bonds,))
+
+    pv = cash_flows * factors
+    price = pv.sum(axis=1)
+    growth = 1.0 + rates / frequency
+    with np.errstate(invalid='ignore', divide='ignore'):
+        macaulay = (pv * times).sum(axis=1) / price
+        modified = macaulay / growth
+        convexity = (pv * times * (times + 1.0 / frequency[:, None])).sum(axis=1) / (price * growth ** 2)
+    valid = price > 0
+    macaulay = np.where(valid, macaulay, np.nan)
+    modified = np.where(valid, modified, np.nan)
+    convexity = np.where(valid, convexity, np.nan)
+    dv01 = modified * price * 1e-4
+    return {
+        'price': price,
+        'macaulay_duration': macaulay,
+        'modified_duration': modified,
+        'convexity': convexity,
+        'dv01': dv01,
+    }
+
+
+def schedule_risk(schedule, rates, cache=DEFAULT_DISCOUNT_CACHE):
+    """
+    Risk metrics for a CashFlowSchedule at decimal per-bond yields, reusing cached discount factors.
+    """
+    factors = schedule.discount_factors(rates, cache=cache)
+    return risk_from_cash_flows(schedule.amounts, rates, times=schedule.times,
+                                frequency=schedule.frequency, factors=factors)
+
+
+def calculate_portfolio_risk(portfolio, discount_rate=None, rate_column='yield',
+                             cash_flow_column='cash_flows', frequency=None, settlement=None,
+                             day_count='30/360', cache=DEFAULT_DISCOUNT_CACHE):
+    """
+    Vectorized duration/convexity/DV01 for a whole portfolio in one NumPy pass.
+    `portfolio` is a DataFrame, a CashFlowSchedule or a 2-D cash-flow matrix. A DataFrame
+    with a `cash_flows` column (lists of per-period flows) is used as-is; otherwise coupon
+    schedules are generated from `maturity_date`/`face_value`/`coupon_rate` at `frequency`
+    coupons per year (default DEFAULT_FREQUENCY, as in `generate_schedules`); cash-flow
+    lists and matrices are annual periods unless `frequency` says otherwise. Rates are in
+    percent, like `calculate_duration`: pass a scalar or per-bond `discount_rate`, otherwise
+    `rate_column` of the DataFrame is used. Returns a DataFrame with one row per bond and
+    RISK_COLUMNS.
+    """
+    schedule = None
+    if isinstance(portfolio, pd.DataFrame):
+        if discount_rate is None:
+            if rate_column not in portfolio.columns:
+                raise ValueError(f"Missing discount rate column: {rate_column}")
+            discount_rate = portfolio[rate_column].to_numpy(dtype=np.float64)
+        index = portfolio['bond'] if 'bond' in portfolio.columns else portfolio.index
+        if cash_flow_column in portfolio.columns:
+            cash_flows = cash_flow_matrix(portfolio[cash_flow_column].tolist())
+        elif 'maturity_date' in portfolio.columns:
+            schedule = generate_schedules(portfolio, settlement=settlement,
+                                          frequency=frequency or DEFAULT_FREQUENCY, day_count=day_count)
+        else:
+            raise ValueError(f"Missing required column: {cash_flow_column} or maturity_date")
+    elif hasattr(portfolio, 'amounts') and hasattr(portfolio, 'times'):
+        schedule = portfolio
+        index = pd.Index(schedule.bonds, name='bond')
+    else:
+        cash_flows = cash_flow_matrix(portfolio)
+        index = None
+    if discount_rate is None:
+        raise ValueError("discount_rate is required when passing cash flows without a yield column")
+
+    n_bonds = len(schedule) if schedule is not None else len(cash_flows)
+    rates = np.broadcast_to(np.asarray(discount_rate, dtype=np.float64) / 100, (n_bonds,))
+    if schedule is not None:
+        metrics = schedule_risk(schedule, rates, cache=cache)
+    else:
+        metrics = risk_from_cash_flows(cash_flows, rates, frequency=frequency or 1)
+    return pd.DataFrame(metrics, index=index, columns=RISK_COLUMNS)
@@ -1,16 +1,177 @@
+import numpy as np
 import pandas as pd
 
+from .cashflows import DEFAULT_FREQUENCY, generate_schedules
+
 PREBUILT_SCENARIOS = {
     "2008 Crisis": {"spread_shock": 0.03, "rate_shock": 0.01},
     "COVID-2020": {"spread_shock": 0.02, "rate_shock": -0.005},
     "RBI Rate Hike 200bps": {"spread_shock": 0.01, "rate_shock": 0.02}
 }
 
+USER_SCENARIOS = {}
+
+SCENARIO_MODES = ('approx', 'full')
+
+
+def register_scenario(name, spread_shock=0.0, rate_shock=0.0, sector_spread_shocks=None, overwrite=False):
+    """
+    Register a user-defined scenario next to the prebuilt ones.
+    Shocks are decimal yield changes (0.01 = 100bp); `sector_spread_shocks` maps a sector
+    to an extra spread shock applied on top of `spread_shock` for bonds in that sector.
+    """
+    if name in PREBUILT_SCENARIOS:
+        raise ValueError(f"Cannot override prebuilt scenario: {name}")
+    if name in USER_SCENARIOS and not overwrite:
+        raise ValueError(f"Scenario already registered: {name}")
+    shock = {"spread_shock": float(spread_shock), "rate_shock": float(rate_shock)}
+    if sector_spread_shocks:
+        shock["sector_spread_shocks"] = {k: float(v) for k, v in sector_spread_shocks.items()}
+    USER_SCENARIOS[name] = shock
+    return shock
+
+
+def unregister_scenario(name):
+    USER_SCENARIOS.pop(name, None)
+
+
+def list_scenarios():
+    """
+    All scenarios by name, prebuilt first.
+    """
+    return {**PREBUILT_SCENARIOS, **USER_SCENARIOS}
+
+
+def get_scenario(scenario):
+    if isinstance(scenario, dict):
+        return scenario
+    return list_scenarios().get(scenario, {})
+
+
 def apply_scenario(bond_df, scenario):
-    shock = PREBUILT_SCENARIOS.get(scenario, {})
+    shock = get_scenario(scenario)
     df = bond_df.copy()
     if 'spread_shock' in shock:
         df['stressed_spread'] = df['spread'] + shock['spread_shock']
     if 'rate_shock' in shock:
         df['stressed_rate'] = df.get('rate', 0) + shock['rate_shock']
-    return df
\ No newline at end of file
+    return df
+
+
+def scenario_shocks(bond_df, scenarios=None):
+    """
+    Scenario names and the (scenarios x bonds) matrix of total yield changes (decimal).
+    Returns an (S, 1) column when no scenario has sector-specific shocks, so callers can broadcast.
+    """
+    if scenarios is None:
+        scenarios = list_scenarios()
+    elif not isinstance(scenarios, dict):
+        catalog = list_scenarios()
+        missing = [s for s in scenarios if s not in catalog]
+        if missing:
+            raise ValueError(f"Unknown scenarios: {', '.join(missing)}")
+        scenarios = {s: catalog[s] for s in scenarios}
+    names = list(scenarios)
+    base = np.array([scenarios[s].get('rate_shock', 0.0) + scenarios[s].get('spread_shock', 0.0)
+                     for s in names], dtype=np.float64)[:, None]
+    sector_shocks = [scenarios[s].get('sector_spread_shocks') or {} for s in names]
+    if not any(sector_shocks):
+        return names, base
+    if 'sector' not in bond_df.columns:
+        raise ValueError("Missing required column for sector shocks: sector")
+    codes, sectors = pd.factorize(bond_df['sector'])
+    if len(sectors) == 0:
+        return names, base
+    table = np.array([[shocks.get(sector, 0.0) for sector in sectors] for shocks in sector_shocks],
+                     dtype=np.float64).reshape(len(names), len(sectors))
+    extra = np.where(codes >= 0, table[:, np.maximum(codes, 0)], 0.0)
+    return names, base + extra
+
+
+def position_notional(bond_df, model_price=None):
+    """
+    Position sizes for P&L: `market_value` when present, else `model_price`, else 1 per bond.
+    """
+    if 'market_value' in bond_df.columns:
+        return pd.to_numeric(bond_df['market_value'], errors='coerce').to_numpy(np.float64)
+    if model_price is not None:
+        return model_price
+    return np.ones(len(bond_df))
+
+
+def _approx_returns(bond_df, dy):
+    duration = pd.to_numeric(bond_df['duration'], errors='coerce').to_numpy(np.float64)
+    convexity = pd.to_numeric(bond_df['convexity'], errors='coerce').to_numpy(np.float64)
+    return -duration * dy + 0.5 * convexity * dy ** 2
+
+
+def repriced_returns(schedule, base_yield, dy, max_cells):
+    """
+    Full-repricing returns of every bond in a CashFlowSchedule for (scenarios x bonds) yield
+    moves `dy` (decimal), computed in chunks of at most `max_cells` cash flows. Returns the
+    returns and the base prices at `base_yield`.
+    """
+    n_scenarios = dy.shape[0]
+    n_bonds, width = schedule.amounts.shape
+    freq = schedule.frequency.astype(np.float64)[:, None]
+    exponent = -freq * schedule.times
+    base_price = (schedule.amounts * schedule.discount_factors(base_yield)).sum(axis=1)
+    returns = np.empty((n_scenarios, n_bonds))
+    step = max(1, int(max_cells // max(n_bonds * width, 1)))
+    for start in range(0, n_scenarios, step):
+        chunk = np.broadcast_to(dy[start:start + step], (min(step, n_scenarios - start), n_bonds))
+        growth = np.log1p((base_yield + chunk) / freq[:, 0])
+        factors = np.exp(growth[:, :, None] * exponent[None, :, :])
+        price = np.einsum('bm,sbm->sb', schedule.amounts, factors)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            returns[start:start + step] = price / base_price - 1.0
+    return returns, base_price
+
+
+def run_scenarios(bond_df, scenarios=None, mode='approx', settlement=None, frequency=DEFAULT_FREQUENCY,
+                  day_count='30/360', max_cells=20_000_000):
+    """
+    Reprice every bond under many scenarios at once and return a (scenarios x bonds) P&L DataFrame.
+    'approx' uses the book's `duration` (modified) and `convexity` columns:
+    dP/P = -D*dy + C*dy^2/2. 'full' regenerates coupon schedules from `maturity_date`,
+    `coupon_rate`/`face_value` and reprices at `yield` + shock, in scenario chunks of at most
+    `max_cells` discount factors. P&L is scaled by `market_value` when present; otherwise
+    approx mode reports returns and full mode reports P&L on the model price.
+    """
+    if mode not in SCENARIO_MODES:
+        raise ValueError(f"Unsupported mode: {mode}. Use one of {', '.join(SCENARIO_MODES)}")
+    names, dy = scenario_shocks(bond_df, scenarios)
+    bonds = bond_df['bond'] if 'bond' in bond_df.columns else bond_df.index
+
+    if mode == 'approx':
+        missing = [c for c in ('duration', 'convexity') if c not in bond_df.columns]
+        if missing:
+            raise ValueError(f"Missing required columns: {', '.join(missing)}")
+        returns = _approx_returns(bond_df, dy)
+        notional = position_notional(bond_df)
+    else:
+        if 'yield' not in bond_df.columns:
+            raise ValueError("Missing required column: yield")
+        schedule = generate_schedules(bond_df, settlement=settlement, frequency=frequency,
+                                      day_count=day_count)
+        base_yield = pd.to_numeric(bond_df['yield'], errors='coerce').to_numpy(np.float64) / 100
+        returns, base_price = repriced_returns(schedule, base_yield, dy, max_cells)
+        notional = position_notional(bond_df, base_price)
+
+    pnl = np.broadcast_to(returns, (len(names), len(bond_df))) * notional
+    return pd.DataFrame(pnl, index=pd.Index(names, name='scenario'), columns=pd.Index(bonds, name='bond'))
+
+
+def scenario_summary(pnl):
+    """
+    Total, worst-bond and best-bond P&L per scenario from a run_scenarios matrix.
+    """
+    if pnl.shape[1] == 0:
+        return pd.DataFrame({'total_pnl': 0.0}, index=pnl.index)
+    values = np.nan_to_num(pnl.to_numpy())
+    return pd.DataFrame({
+        'total_pnl': values.sum(axis=1),
+        'worst_bond': pnl.columns.to_numpy()[values.argmin(axis=1)],
+        'worst_pnl': values.min(axis=1),
+        'best_pnl': values.max(axis=1),
+    }, index=pnl.index)
@@ -0,0 +1,361 @@
+import json
+import os
+import shutil
+import threading
+
+import numpy as np
+import pandas as pd
+
+from .loader import cache_dir
+
+DEFAULT_FIELDS = ('spread',)
+MANIFEST_FILE = 'manifest.json'
+BONDS_FILE = 'bonds.json'
+
+
+def _to_ns(values):
+    return pd.to_datetime(values).to_numpy().astype('datetime64[ns]').astype(np.int64)
+
+
+def _timestamp_ns(value):
+    return pd.Timestamp(value).as_unit('ns').value
+
+
+def _atomic_json(path, data):
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, 'w') as f:
+        json.dump(data, f)
+    os.replace(tmp, path)
+
+
+class TimeSeriesStore:
+    """
+    Append-only, columnar store of per-bond tick history (spreads, prices, ...).
+    Ticks are appended to a raw columnar tail (codes, int64 nanosecond timestamps, one
+    float64 file per field) and `compact()` folds the tail into an immutable segment sorted
+    by (bond, time) with a bond -> offset index (CSR `indptr`). Segments are .npy files
+    opened memory-mapped and merged as they accumulate, so range queries are two binary
+    searches inside a bond's slice and, when a bond's history sits in one segment, return
+    zero-copy views of the mapped files. Tail chunks are kept sorted by bond, so they are
+    searched the same way, and `recent`/`panel` read all requested bonds in one vectorized
+    pass over every segment and chunk. Ticks must not be older than a bond's last stored
+    tick, which keeps every bond's history in time order across segments.
+    """
+
+    def __init__(self, path=None, fields=DEFAULT_FIELDS, compact_every=1_000_000):
+        self.path = path or os.path.join(cache_dir(), 'timeseries')
+        os.makedirs(self.path, exist_ok=True)
+        self.compact_every = compact_every
+        self._lock = threading.RLock()
+        manifest_path = os.path.join(self.path, MANIFEST_FILE)
+        if os.path.exists(manifest_path):
+            with open(manifest_path) as f:
+                manifest = json.load(f)
+        else:
+            manifest = {'fields': list(fields), 'segments': [], 'generation': 0}
+            _atomic_json(manifest_path, manifest)
+        self.fields = tuple(manifest['fields'])
+        self.generation = manifest['generation']
+        self.bonds = pd.Index([], dtype=object)
+        bonds_path = os.path.join(self.path, BONDS_FILE)
+        if os.path.exists(bonds_path):
+            with open(bonds_path) as f:
+                self.bonds = pd.Index(json.load(f), dtype=object)
+        self._code_of = {b: i for i, b in enumerate(self.bonds)}
+        self.segments = [self._open_segment(name) for name in manifest['segments']]
+        self._load_tail()
+
+    # -- files -------------------------------------------------------------------
+
+    def _tail_path(self, column, generation=None):
+        generation = self.generation if generation is None else generation
+        return os.path.join(self.path, f"tail_{generation:06d}.{column}.bin")
+
+    def _columns(self):
+        return ('codes', 'times') + self.fields
+
+    def _open_segment(self, name):
+        directory = os.path.join(self.path, name)
+        arrays = {'name': name}
+        for column in ('indptr', 'times') + self.fields:
+            try:
+                arrays[column] = np.load(os.path.join(directory, f"{column}.npy"), mmap_mode='r')
+            except ValueError:
+                # Empty arrays cannot be mapped.
+                arrays[column] = np.load(os.path.join(directory, f"{column}.npy"))
+        return arrays
+
+    def _load_tail(self):
+        dtypes = {'codes': np.int64, 'times': np.int64}
+        tail = {}
+        for column in self._columns():
+            path = self._tail_path(column)
+            tail[column] = np.fromfile(path, dtype=dtypes.get(column, np.float64)) if os.path.exists(path) else \
+                np.zeros(0, dtype=dtypes.get(column, np.float64))
+        # A torn append leaves some columns longer; rows count once every column has them.
+        n = min(len(v) for v in tail.values())
+        tail = {k: v[:n] for k, v in tail.items()}
+        # Chunks are kept sorted by bond (time order within a bond is file order), so reads
+        # binary-search a bond's slice instead of scanning the tail.
+        order = np.argsort(tail['codes'], kind='stable')
+        self._tail = [{k: v[order] for k, v in tail.items()}] if n else []
+        self._tail_rows = n
+        self._last_time = np.full(len(self.bonds), np.iinfo(np.int64).min, dtype=np.int64)
+        for segment in self.segments:
+            ends = segment['indptr'][1:]
+            has = np.flatnonzero(np.diff(segment['indptr']) > 0)
+            self._last_time[has] = np.maximum(self._last_time[has], segment['times'][ends[has] - 1])
+        for chunk in self._tail:
+            np.maximum.at(self._last_time, chunk['codes'], chunk['times'])
+        # Cut every column back to whole rows, also when none survived, so stale bytes of a
+        # torn first append cannot misalign later appends.
+        for column in self._columns():
+            path = self._tail_path(column)
+            if os.path.exists(path):
+                with open(path, 'r+b') as f:
+                    f.truncate(n * 8)
+
+    def _codes(self, bonds):
+        bonds = pd.Index(pd.Series(bonds, dtype=object).astype(str))
+        new = bonds.unique().difference(self.bonds, sort=False)
+        if len(new):
+            self._code_of.update((b, len(self.bonds) + i) for i, b in enumerate(new))
+            self.bonds = self.bonds.append(pd.Index(new, dtype=object))
+            self._last_time = np.r_[self._last_time, np.full(len(new), np.iinfo(np.int64).min, dtype=np.int64)]
+            _atomic_json(os.path.join(self.path, BONDS_FILE), list(self.bonds))
+        return self.bonds.get_indexer(bonds).astype(np.int64)
+
+    # -- writes ------------------------------------------------------------------
+
+    def append(self, ticks, time_column='time'):
+        """
+        Bulk-append a long frame of ticks (bond or bond_id, time or date, one column per
+        field; missing fields are NaN), e.g. a whole day for every bond. Returns the number
+        of ticks written.
+        """
+        time_column = time_column if time_column in ticks.columns else 'date'
+        bond_column = 'bond' if 'bond' in ticks.columns else 'bond_id'
+        missing = [c for c in (bond_column, time_column) if c not in ticks.columns]
+        if missing:
+            raise ValueError(f"Missing required columns: {', '.join(missing)}")
+        if not len(ticks):
+            return 0
+        values = {f: pd.to_numeric(ticks[f], errors='coerce').to_numpy(dtype=np.float64) if f in ticks.columns
+                  else np.full(len(ticks), np.nan) for f in self.fields}
+        return self._append(ticks[bond_column], _to_ns(ticks[time_column]), values)
+
+    def append_snapshot(self, timestamp, values, field=None):
+        """
+        Append one tick per bond at the same timestamp: `values` maps bond -> value
+        (dict or Series) for `field` (default: the first field).
+        """
+        values = pd.Series(values, dtype=np.float64)
+        field = field or self.fields[0]
+        if field not in self.fields:
+            raise ValueError(f"Unknown field: {field}. Store fields are {', '.join(self.fields)}")
+        columns = {f: values.to_numpy() if f == field else np.full(len(values), np.nan) for f in self.fields}
+        return self._append(values.index, np.full(len(values), _timestamp_ns(timestamp)), columns)
+
+    def _append(self, bonds, times, values):
+        with self._lock:
+            codes = self._codes(bonds)
+            order = np.lexsort((times, codes))
+            codes, times = codes[order], times[order]
+            first = np.r_[True, codes[1:] != codes[:-1]]
+            early = times[first] < self._last_time[codes[first]]
+            if early.any():
+                names = ', '.join(map(str, self.bonds[codes[first][early]][:5]))
+                raise ValueError(f"Ticks older than the last stored tick for: {names}")
+            chunk = {'codes': codes, 'times': times, **{f: values[f][order] for f in self.fields}}
+            # Fields first and codes last, so a torn append is cut back to whole rows on load.
+            for column in self.fields + ('times', 'codes'):
+                with open(self._tail_path(column), 'ab') as f:
+                    f.write(np.ascontiguousarray(chunk[column]).tobytes())
+            self._tail.append(chunk)
+            self._tail_rows += len(codes)
+            last = np.r_[first[1:], True]
+            self._last_time[codes[last]] = times[last]
+            if self.compact_every and self._tail_rows >= self.compact_every:
+                self.compact()
+            return len(codes)
+
+    def _write_segment(self, codes, times, values):
+        name = f"segment_{self.generation + 1:06d}_{os.getpid()}"
+        tmp = os.path.join(self.path, name + '.tmp')
+        os.makedirs(tmp, exist_ok=True)
+        indptr = np.zeros(len(self.bonds) + 1, dtype=np.int64)
+        np.cumsum(np.bincount(codes, minlength=len(self.bonds)), out=indptr[1:])
+        np.save(os.path.join(tmp, 'indptr.npy'), indptr)
+        np.save(os.path.join(tmp, 'times.npy'), times)
+        for f in self.fields:
+            np.save(os.path.join(tmp, f"{f}.npy"), values[f])
+        os.replace(tmp, os.path.join(self.path, name))
+        return name
+
+    @staticmethod
+    def _segment_codes(segment):
+        return np.repeat(np.arange(len(segment['indptr']) - 1), np.diff(segment['indptr']))
+
+    def compact(self, full=False):
+        """
+        Fold the tail into a new segment and merge segments while the previous one is no
+        larger than twice the newest (`full=True` merges everything into one segment).
+        """
+        with self._lock:
+            parts = []
+            if self._tail:
+                tail = {k: np.concatenate([c[k] for c in self._tail]) for k in self._columns()}
+                order = np.lexsort((tail['times'], tail['codes']))
+                parts.append({k: v[order] for k, v in tail.items()})
+            segments = list(self.segments)
+            size = len(parts[0]['codes']) if parts else 0
+            merged = []
+            while segments and (full or len(segments[-1]['times']) <= 2 * max(size, 1)):
+                segment = segments.pop()
+                merged.insert(0, segment)
+                size += len(segment['times'])
+            if not parts and len(merged) < 2:
+                return
+            pieces = [{'codes': self._segment_codes(s), 'times': np.asarray(s['times']),
+                       **{f: np.asarray(s[f]) for f in self.fields}} for s in merged] + parts
+            codes = np.concatenate([p['codes'] for p in pieces])
+            # Older pieces come first and each bond's ticks are in time order within a piece,
+            # so a stable sort by bond keeps every history in time order.
+            order = np.argsort(codes, kind='stable')
+            name = self._write_segment(codes[order], np.concatenate([p['times'] for p in pieces])[order],
+                                       {f: np.concatenate([p[f] for p in pieces])[order] for f in self.fields})
+            old_generation = self.generation
+            self.generation += 1
+            names = [s['name'] for s in segments] + [name]
+            _atomic_json(os.path.join(self.path, MANIFEST_FILE),
+                         {'fields': list(self.fields), 'segments': names, 'generation': self.generation})
+            for column in self._columns():
+                path = self._tail_path(column, old_generation)
+                if os.path.exists(path):
+                    os.remove(path)
+            for segment in merged:
+                shutil.rmtree(os.path.join(self.path, segment['name']), ignore_errors=True)
+            self.segments = segments + [self._open_segment(name)]
+            self._tail, self._tail_rows = [], 0
+
+    # -- reads -------------------------------------------------------------------
+
+    def __len__(self):
+        return sum(len(s['times']) for s in self.segments) + self._tail_rows
+
+    @staticmethod
+    def _bounds(source, codes):
+        # [lo, hi) of each code's rows in a segment (CSR indptr) or a code-sorted tail chunk.
+        if 'indptr' in source:
+            indptr = source['indptr']
+            known = codes + 1 < len(indptr)
+            safe = np.where(known, codes, 0)
+            return np.where(known, indptr[safe], 0), np.where(known, indptr[safe + 1], 0)
+        return (np.searchsorted(source['codes'], codes, side='left'),
+                np.searchsorted(source['codes'], codes, side='right'))
+
+    def _pieces(self, code, start, end, field):
+        pieces = []
+        for source in self.segments + self._tail:
+            lo, hi = (int(v[0]) for v in self._bounds(source, np.array([code])))
+            times = source['times'][lo:hi]
+            a = np.searchsorted(times, start, side='left') if start is not None else 0
+            b = np.searchsorted(times, end, side='right') if end is not None else len(times)
+            if b > a:
+                pieces.append((times[a:b], source[field][lo + a:lo + b]))
+        return pieces
+
+    def _gather(self, codes, start=None, end=None, field=None, last=None):
+        """
+        Ticks of many bonds in one vectorized pass over every segment and tail chunk:
+        (owner, times, values) where owner indexes `codes`, grouped by owner in time order.
+        With `last`, only each bond's last `last` ticks are read.
+        """
+        field = field or self.fields[0]
+        owners, times, values = [], [], []
+        for source in self.segments + self._tail:
+            lo, hi = self._bounds(source, codes)
+            hi = np.where(codes >= 0, hi, lo)
+            if last is not None:
+                lo = np.maximum(lo, hi - last)
+            lengths = hi - lo
+            total = int(lengths.sum())
+            if not total:
+                continue
+            index = np.repeat(lo - np.cumsum(lengths) + lengths, lengths) + np.arange(total)
+            owner = np.repeat(np.arange(len(codes)), lengths)
+            t = np.asarray(source['times'][index])
+            mask = np.ones(total, dtype=bool)
+            if start is not None:
+                mask &= t >= start
+            if end is not None:
+                mask &= t <= end
+            owners.append(owner[mask])
+            times.append(t[mask])
+            values.append(np.asarray(source[field][index[mask]]))
+        if not owners:
+            return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64), np.zeros(0)
+        owner = np.concatenate(owners)
+        # Sources are oldest first, so a stable sort by owner keeps each bond in time order.
+        order = np.argsort(owner, kind='stable')
+        return owner[order], np.concatenate(times)[order], np.concatenate(values)[order]
+
+    def range(self, bond, start=None, end=None, field=None):
+        """
+        (timestamps as datetime64[ns], values) of one bond between `start` and `end`
+        inclusive. Views into the mapped segment when the range lies in one segment.
+        """
+        field = field or self.fields[0]
+        code = self._code_of.get(str(bond), -1)
+        if code < 0:
+            return np.zeros(0, dtype='datetime64[ns]'), np.zeros(0)
+        start = None if start is None else _timestamp_ns(start)
+        end = None if end is None else _timestamp_ns(end)
+        pieces = self._pieces(code, start, end, field)
+        if not pieces:
+            return np.zeros(0, dtype='datetime64[ns]'), np.zeros(0)
+        if len(pieces) == 1:
+            times, values = pieces[0]
+        else:
+            times, values = np.concatenate([p[0] for p in pieces]), np.concatenate([p[1] for p in pieces])
+        return times.view('datetime64[ns]'), values
+
+    def series(self, bond, start=None, end=None, field=None):
+        times, values = self.range(bond, start, end, field)
+        return pd.Series(values, index=pd.DatetimeIndex(times, name='time'), name=str(bond))
+
+    def recent(self, bonds=None, n=30, field=None):
+        """
+        The last `n` values of each bond, {bond: array}, e.g. to seed a SpreadAnomalyDetector.
+        """
+        bonds = list(self.bonds if bonds is None else bonds)
+        codes = np.array([self._code_of.get(str(b), -1) for b in bonds], dtype=np.int64)
+        owner, _, values = self._gather(codes, field=field, last=n)
+        # Each bond may have up to `n` ticks from every source; keep its last `n` overall.
+        ends = np.cumsum(np.bincount(owner, minlength=len(bonds)))
+        keep = np.arange(len(owner)) >= ends[owner] - n
+        owner, values = owner[keep], values[keep]
+        splits = np.searchsorted(owner, np.arange(1, len(bonds)))
+        return dict(zip(bonds, np.split(values, splits)))
+
+    def panel(self, bonds=None, start=None, end=None, field=None, freq='D'):
+        """
+        Wide (dates x bonds) panel with the last value of each bond per `freq` period, the
+        layout macro_linkage.factor_exposures expects. Only the requested range is read.
+        """
+        bonds = list(self.bonds if bonds is None else bonds)
+        codes = np.array([self._code_of.get(str(b), -1) for b in bonds], dtype=np.int64)
+        start = None if start is None else _timestamp_ns(start)
+        end = None if end is None else _timestamp_ns(end)
+        owner, times, values = self._gather(codes, start, end, field)
+        ticks = pd.DataFrame({
+            'date': pd.DatetimeIndex(times.view('datetime64[ns]')).floor(freq),
+            'bond': owner,
+            'value': values,
+        })
+        frame = ticks.groupby(['date', 'bond'], sort=True)['value'].last().unstack('bond')
+        present = [i for i in range(len(bonds)) if i in frame.columns]
+        frame = frame.reindex(columns=present)
+        frame.columns = [bonds[i] for i in present]
+        frame.index.name = 'date'
+        return frame
@@ -1,11 +1,21 @@
 import networkx as nx
-import streamlit as st
 
-def build_relationships(bond_data):
+from .layout import DEFAULT_LAYOUT_CACHE, compute_layout
+
+def build_relationships(bond_data, store=None):
     """
     Build a knowledge graph from bond data.
     Expects bond_data as a dict with keys: issuer, sector, rating, bond_id.
+    With a KnowledgeGraphStore, the bond is upserted into it and the issuer's neighbourhood
+    in the shared graph is returned instead of a one-off graph.
     """
+    if store is not None:
+        store.upsert_bond(bond_data)
+        issuer = bond_data.get("issuer")
+        if issuer:
+            return store.subgraph("issuer", issuer)
+        return store.subgraph("bond", bond_data.get("bond_id", bond_data.get("bond")))
+
     G = nx.DiGraph()
     issuer = bond_data.get("issuer", "Unknown Issuer")
     sector = bond_data.get("sector", "Unknown Sector")
@@ -19,14 +29,16 @@ def build_relationships(bond_data):
 
     return G
 
-def visualize_knowledge_graph(G):
+def visualize_knowledge_graph(G, cache=DEFAULT_LAYOUT_CACHE):
     """
     Visualize the knowledge graph using Streamlit.
+    Positions come from the layout cache, so reruns on the same graph skip the spring layout.
     """
     import matplotlib.pyplot as plt
+    import streamlit as st
 
     plt.figure(figsize=(6, 4))
-    pos = nx.spring_layout(G)
+    pos = compute_layout(G, cache=cache)
     nx.draw(G, pos, with_labels=True, node_color='lightblue', edge_color='gray', node_size=2000, font_size=10)
     st.pyplot(plt)
     plt.clf()
@@ -0,0 +1,230 @@
+import hashlib
+import os
+import tempfile
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+import networkx as nx
+
+try:
+    from pyvis.network import Network
+    PYVIS_AVAILABLE = True
+except ImportError:
+    PYVIS_AVAILABLE = False
+
+NODE_COLORS = {'sector': '#e4572e', 'issuer': '#f3a712', 'bond': '#29335c', 'rating': '#669bbc', 'event': '#a8c686'}
+
+
+def _attrs_repr(attrs):
+    return repr(sorted((str(k), repr(v)) for k, v in attrs.items()))
+
+
+def graph_hash(G):
+    """
+    Content hash of a graph's nodes and edges with their attributes, independent of
+    insertion order, so graphs that differ only in titles, sizes or weights differ.
+    """
+    digest = hashlib.blake2b(digest_size=16)
+    for node in sorted(repr(n) + _attrs_repr(attrs) for n, attrs in G.nodes(data=True)):
+        digest.update(node.encode())
+        digest.update(b'\0')
+    digest.update(b'\1')
+    for edge in sorted(repr(tuple(sorted(map(repr, (u, v))))) + _attrs_repr(attrs) for u, v, attrs in G.edges(data=True)):
+        digest.update(edge.encode())
+        digest.update(b'\0')
+    return digest.hexdigest()
+
+
+class LayoutCache:
+    """
+    LRU of node positions and rendered HTML keyed by graph hash. The most recent layout is
+    kept as the seed for incremental updates of a growing graph, so give each user session
+    its own cache; DEFAULT_LAYOUT_CACHE is for single-user scripts.
+    """
+
+    def __init__(self, max_entries=64):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.latest = None
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        with self._lock:
+            value = self._entries.get(key)
+            if value is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key, value):
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.latest = None
+
+
+DEFAULT_LAYOUT_CACHE = LayoutCache()
+
+
+def compute_layout(G, cache=DEFAULT_LAYOUT_CACHE, previous=None, seed=42, iterations=50):
+    """
+    Spring-layout positions for G, computed once per graph content.
+    Nodes already placed in `previous` (default: the cache's most recent layout) keep their
+    positions and only new nodes are laid out, starting next to their placed neighbours.
+    """
+    key = ('layout', graph_hash(G))
+    if cache is not None:
+        pos = cache.get(key)
+        if pos is not None:
+            cache.latest = pos
+            return pos
+        if previous is None:
+            previous = cache.latest
+    if len(G) == 0:
+        return {}
+    known = {n: previous[n] for n in G.nodes() if previous and n in previous}
+    if known and len(known) < len(G):
+        rng = np.random.default_rng(seed)
+        spread = np.ptp(np.array(list(known.values())), axis=0).max() if len(known) > 1 else 1.0
+        radius = 0.1 * (spread or 1.0)
+        init = dict(known)
+        # New nodes start on a ring around the placed nodes they attach to, so the
+        # simulation only has to settle them locally.
+        new = [n for n in G.nodes() if n not in init]
+        groups = {}
+        for n in new:
+            anchors = tuple(sorted((m for m in G.neighbors(n) if m in known), key=repr))
+            groups.setdefault(anchors, []).append(n)
+        for anchors, members in groups.items():
+            center = np.mean([known[m] for m in anchors], axis=0) if anchors else np.zeros(2)
+            angles = 2 * np.pi * (np.arange(len(members)) + rng.random()) / len(members)
+            ring = center + radius * np.column_stack([np.cos(angles), np.sin(angles)])
+            init.update(zip(members, ring))
+        pos = nx.spring_layout(G, pos=init, fixed=list(known), iterations=iterations, seed=seed)
+    elif known:
+        pos = known
+    else:
+        pos = nx.spring_layout(G, iterations=iterations, seed=seed)
+    pos = {n: np.asarray(p, dtype=np.float64) for n, p in pos.items()}
+    if cache is not None:
+        cache.put(key, pos)
+        cache.latest = pos
+    return pos
+
+
+def _node_id(kind, name):
+    return f"{kind}:{name}"
+
+
+def lod_graph(bonds_df, expanded=(), max_issuers=100, max_bonds=200):
+    """
+    Level-of-detail view of a portfolio: one super-node per sector (sized by bond count),
+    linked when they share issuers. Sectors in `expanded` open into their largest
+    `max_issuers` issuers and issuers in `expanded` open into their bonds (at most
+    `max_bonds` per issuer).
+    Node ids are '<kind>:<name>'; nodes carry type, label, size and title attributes.
+    """
+    frame = pd.DataFrame({
+        'bond': bonds_df['bond'].astype(str),
+        'sector': bonds_df['sector'].astype(str),
+        'issuer': bonds_df['issuer'].astype(str).where(bonds_df['issuer'].notna(), None)
+        if 'issuer' in bonds_df.columns else None,
+    })
+    expanded = set(map(str, expanded))
+    G = nx.Graph()
+    sector_counts = frame.groupby('sector', sort=True).size()
+    for sector, count in sector_counts.items():
+        G.add_node(_node_id('sector', sector), type='sector', label=sector, size=10 + 3 * np.log1p(count),
+                   title=f"{sector}: {count} bonds", count=int(count))
+    issued = frame.dropna(subset=['issuer'])
+    pairs = issued.groupby(['issuer', 'sector'], sort=True).size().rename('count').reset_index()
+    # Sectors sharing an issuer are linked, weighted by the number of shared issuers.
+    multi = pairs[pairs.duplicated('issuer', keep=False)]
+    if len(multi):
+        links = multi.merge(multi, on='issuer')
+        links = links[links['sector_x'] < links['sector_y']].groupby(['sector_x', 'sector_y']).size()
+        for (a, b), weight in links.items():
+            G.add_edge(_node_id('sector', a), _node_id('sector', b), weight=int(weight),
+                       title=f"{weight} shared issuers")
+    opened = pairs[pairs['sector'].isin(expanded)].sort_values('count', ascending=False, kind='stable')
+    opened = opened.groupby('sector', sort=False).head(max_issuers)
+    for issuer, sector, count in opened.itertuples(index=False):
+        node = _node_id('issuer', issuer)
+        if node not in G:
+            G.add_node(node, type='issuer', label=issuer, size=8 + 2 * np.log1p(count),
+                       title=f"{issuer}: {count} bonds", count=int(count))
+        G.add_edge(_node_id('sector', sector), node, weight=int(count))
+    for issuer in sorted(expanded & set(issued['issuer'])):
+        node = _node_id('issuer', issuer)
+        bonds = issued[issued['issuer'] == issuer]
+        if node not in G:
+            G.add_node(node, type='issuer', label=issuer, size=8 + 2 * np.log1p(len(bonds)),
+                       title=f"{issuer}: {len(bonds)} bonds", count=len(bonds))
+            for sector in bonds['sector'].unique():
+                G.add_edge(_node_id('sector', sector), node)
+        for bond in bonds['bond'].head(max_bonds):
+            G.add_node(_node_id('bond', bond), type='bond', label=bond, size=5, title=bond)
+            G.add_edge(node, _node_id('bond', bond))
+    return G
+
+
+def _pyvis_html(net):
+    if hasattr(net, 'generate_html'):
+        return net.generate_html()
+    # Older pyvis can only write files: use a private temporary file, not the working directory.
+    fd, path = tempfile.mkstemp(suffix='.html')
+    os.close(fd)
+    try:
+        net.write_html(path)
+        with open(path) as f:
+            return f.read()
+    finally:
+        os.remove(path)
+
+
+def render_html(G, cache=DEFAULT_LAYOUT_CACHE, height="500px", width="100%", edge_colors=None):
+    """
+    Interactive pyvis HTML for G as a string, with node positions from compute_layout
+    and physics disabled so the browser does not re-simulate. Cached by graph content.
+    `edge_colors` maps (u, v) pairs to colors for highlighted edges.
+    """
+    if not PYVIS_AVAILABLE:
+        raise ImportError("pyvis is required for interactive graphs: pip install pyvis")
+    color_key = tuple(sorted((repr(k), v) for k, v in (edge_colors or {}).items()))
+    key = ('html', graph_hash(G), height, width, color_key)
+    html = cache.get(key) if cache is not None else None
+    if html is not None:
+        return html
+    pos = compute_layout(G, cache=cache)
+    scale = 400.0
+    net = Network(height=height, width=width, notebook=False)
+    for n, attrs in G.nodes(data=True):
+        x, y = pos[n]
+        options = {'color': NODE_COLORS[attrs['type']]} if attrs.get('type') in NODE_COLORS else {}
+        net.add_node(str(n), label=str(attrs.get('label', n)), title=str(attrs.get('title', n)),
+                     size=float(attrs.get('size', 10)), x=float(x * scale), y=float(y * scale),
+                     physics=False, **options)
+    colors = edge_colors or {}
+    for u, v, attrs in G.edges(data=True):
+        color = colors.get((u, v)) or colors.get((v, u))
+        options = {'color': color} if color else {}
+        if 'title' in attrs:
+            options['title'] = str(attrs['title'])
+        net.add_edge(str(u), str(v), **options)
+    net.toggle_physics(False)
+    html = _pyvis_html(net)
+    if cache is not None:
+        cache.put(key, html)
+    return html
@@ -0,0 +1,680 @@
+import json
+import os
+import threading
+from contextlib import contextmanager
+
+import numpy as np
+import pandas as pd
+
+try:
+    import networkx as nx
+    NETWORKX_AVAILABLE = True
+except ImportError:
+    NETWORKX_AVAILABLE = False
+
+try:
+    import fcntl
+    FCNTL_AVAILABLE = True
+except ImportError:
+    # Without fcntl (Windows) a store directory must only be written by one process.
+    FCNTL_AVAILABLE = False
+
+NODE_KINDS = ('issuer', 'bond', 'sector', 'rating', 'event')
+SNAPSHOT_FILE = 'graph.npz'
+CHANGELOG_FILE = 'changes.jsonl'
+LOCK_FILE = 'changes.lock'
+
+# Edges written for each bond record: (source column, target column, relation).
+BOND_EDGES = (
+    ('bond', 'sector', 'belongs_to_sector'),
+    ('bond', 'rating', 'has_rating'),
+    ('issuer', 'bond', 'issues_bond'),
+    ('issuer', 'sector', 'belongs_to_sector'),
+    ('issuer', 'rating', 'has_rating'),
+)
+
+
+def _is_missing(value):
+    return value is None or value == '' or (isinstance(value, float) and np.isnan(value))
+
+
+def _jsonable(value):
+    if isinstance(value, np.generic):
+        return value.item()
+    if isinstance(value, pd.Timestamp):
+        return value.isoformat()
+    return value
+
+
+def _kind_code(kind):
+    try:
+        return NODE_KINDS.index(kind)
+    except ValueError:
+        raise ValueError(f"Unsupported node kind: {kind}. Use one of {', '.join(NODE_KINDS)}")
+
+
+class KnowledgeGraphStore:
+    """
+    Long-lived graph of issuers, bonds, sectors, ratings and events.
+    Nodes are keyed by (kind, name), names stored as strings, and edges by (source, target,
+    relation); node and edge tables are flat id columns, with lookup indexes and CSR
+    adjacency built lazily.
+    Upserts are idempotent: unchanged nodes and edges are skipped and not logged, and
+    batches (upsert_frame) are applied and logged as whole columns. With a `path`, changes
+    are appended to changes.jsonl and `checkpoint()` writes a compact graph.npz snapshot
+    and truncates the log; opening the store loads the snapshot and replays the log. The
+    store checkpoints itself once the log holds `checkpoint_ops` operations or
+    `checkpoint_bytes` bytes. Writes take a lock file and first replay what other processes
+    sharing the directory have logged, so sequence numbers never collide; their changes
+    show up in this process on its next write or `refresh()`.
+    """
+
+    def __init__(self, path=None, checkpoint_ops=10_000, checkpoint_bytes=64 << 20):
+        self.path = path
+        self.checkpoint_ops = checkpoint_ops
+        self.checkpoint_bytes = checkpoint_bytes
+        self._lock = threading.RLock()
+        self._log = None
+        self._lock_file = None
+        self._depth = 0
+        self._clear()
+        if path:
+            os.makedirs(path, exist_ok=True)
+            with self._exclusive():
+                pass
+
+    def _clear(self):
+        self._kind = []
+        self._name = []
+        self._node_attrs = {}
+        self._removed = set()
+        self._src = []
+        self._dst = []
+        self._rel = []
+        self._relations = []
+        self._edge_attrs = {}
+        self._removed_edges = set()
+        self._nodes_by_key = None
+        self._edges_by_key = None
+        self._csr = None
+        self.seq = 0
+        # Bytes of the change log applied so far, operations in it, and the snapshot they follow.
+        self._offset = 0
+        self._log_ops = 0
+        self._snapshot_id = None
+
+    def __len__(self):
+        return len(self._kind) - len(self._removed)
+
+    @property
+    def edge_count(self):
+        return len(self._src) - len(self._removed_edges)
+
+    # -- persistence -------------------------------------------------------------
+
+    def _snapshot_path(self):
+        return os.path.join(self.path, SNAPSHOT_FILE)
+
+    def _log_path(self):
+        return os.path.join(self.path, CHANGELOG_FILE)
+
+    def _snapshot_stamp(self):
+        try:
+            stat = os.stat(self._snapshot_path())
+        except OSError:
+            return None
+        return stat.st_ino, stat.st_mtime_ns, stat.st_size
+
+    def _load(self):
+        self._clear()
+        self._snapshot_id = self._snapshot_stamp()
+        if self._snapshot_id is not None:
+            with np.load(self._snapshot_path(), allow_pickle=False) as data:
+                self._kind = data['node_kind'].tolist()
+                self._name = data['node_name'].tolist()
+                self._node_attrs = {i: json.loads(a) for i, a in
+                                    zip(data['node_attr_id'].tolist(), data['node_attr_json'].tolist())}
+                self._src = data['edge_src'].tolist()
+                self._dst = data['edge_dst'].tolist()
+                self._rel = data['edge_rel'].tolist()
+                self._relations = data['relations'].tolist()
+                self._edge_attrs = {i: json.loads(a) for i, a in
+                                    zip(data['edge_attr_id'].tolist(), data['edge_attr_json'].tolist())}
+                self.seq = int(data['seq'])
+        self._replay()
+
+    def _replay(self):
+        """
+        Apply log lines past the consumed offset (written by this or another process).
+        """
+        if not os.path.exists(self._log_path()):
+            return
+        with open(self._log_path(), 'rb') as f:
+            f.seek(self._offset)
+            data = f.read()
+        pos = 0
+        while True:
+            end = data.find(b'\n', pos)
+            if end < 0:
+                break
+            line = data[pos:end].strip()
+            if line:
+                try:
+                    op = json.loads(line)
+                except json.JSONDecodeError:
+                    # A torn line from an interrupted write; everything before it applies.
+                    break
+                if op.get('seq', 0) > self.seq:
+                    self._apply(op, log=False)
+                    self.seq = op['seq']
+                self._log_ops += 1
+            pos = end + 1
+        self._offset += pos
+
+    def _sync(self):
+        # Called with the file lock held: catch up with other writers before logging.
+        size = os.path.getsize(self._log_path()) if os.path.exists(self._log_path()) else 0
+        if self._snapshot_stamp() != self._snapshot_id or size < self._offset:
+            # Another process checkpointed: its snapshot holds everything up to its log.
+            self._load()
+        else:
+            self._replay()
+        size = os.path.getsize(self._log_path()) if os.path.exists(self._log_path()) else 0
+        if size > self._offset:
+            # Drop a torn tail so new lines start on a line boundary.
+            with open(self._log_path(), 'r+b') as f:
+                f.truncate(self._offset)
+
+    @contextmanager
+    def _exclusive(self):
+        """
+        Hold the thread lock and, for a persistent store, the directory's lock file, synced
+        with the log; on leaving, flush and checkpoint if the log has grown too large.
+        """
+        with self._lock:
+            if not self.path:
+                yield
+                return
+            self._depth += 1
+            try:
+                if self._depth == 1:
+                    self._lock_file = open(os.path.join(self.path, LOCK_FILE), 'a')
+                    if FCNTL_AVAILABLE:
+                        fcntl.flock(self._lock_file.fileno(), fcntl.LOCK_EX)
+                    self._sync()
+                yield
+                if self._depth == 1 and ((self.checkpoint_ops and self._log_ops >= self.checkpoint_ops)
+                                         or (self.checkpoint_bytes and self._offset >= self.checkpoint_bytes)):
+                    self.checkpoint()
+            finally:
+                if self._depth == 1:
+                    try:
+                        self.flush()
+                    finally:
+                        self._lock_file.close()
+                        self._lock_file = None
+                self._depth -= 1
+
+    def refresh(self):
+        """
+        Pick up changes other processes have written to the store directory.
+        """
+        with self._exclusive():
+            pass
+
+    def _write(self, op):
+        self.seq += 1
+        if not self.path:
+            return
+        op['seq'] = self.seq
+        if self._log is None:
+            self._log = open(self._log_path(), 'ab')
+        line = (json.dumps(op, default=str) + '\n').encode()
+        self._log.write(line)
+        self._offset += len(line)
+        self._log_ops += 1
+
+    def flush(self):
+        with self._lock:
+            if self._log is not None:
+                self._log.flush()
+
+    def checkpoint(self):
+        """
+        Write a snapshot of the whole graph (removed nodes and edges compacted away) and
+        truncate the change log.
+        """
+        if not self.path:
+            raise ValueError("checkpoint requires a store path")
+        with self._exclusive():
+            self._compact()
+            tmp = self._snapshot_path() + f".{os.getpid()}.tmp.npz"
+            node_attr_id = sorted(self._node_attrs)
+            edge_attr_id = sorted(self._edge_attrs)
+            np.savez(
+                tmp,
+                node_kind=np.array(self._kind, dtype=np.int8),
+                node_name=np.array([str(n) for n in self._name], dtype=str),
+                node_attr_id=np.array(node_attr_id, dtype=np.int64),
+                node_attr_json=np.array([json.dumps(self._node_attrs[i], default=str) for i in node_attr_id], dtype=str),
+                edge_src=np.array(self._src, dtype=np.int64),
+                edge_dst=np.array(self._dst, dtype=np.int64),
+                edge_rel=np.array(self._rel, dtype=np.int32),
+                relations=np.array(self._relations, dtype=str),
+                edge_attr_id=np.array(edge_attr_id, dtype=np.int64),
+                edge_attr_json=np.array([json.dumps(self._edge_attrs[i], default=str) for i in edge_attr_id], dtype=str),
+                seq=np.int64(self.seq),
+            )
+            os.replace(tmp, self._snapshot_path())
+            if self._log is not None:
+                self._log.close()
+                self._log = None
+            open(self._log_path(), 'w').close()
+            self._snapshot_id = self._snapshot_stamp()
+            self._offset = 0
+            self._log_ops = 0
+
+    def _compact(self):
+        if not self._removed and not self._removed_edges:
+            return
+        keep_nodes = np.array([i not in self._removed for i in range(len(self._kind))], dtype=bool)
+        remap = np.cumsum(keep_nodes) - 1
+        keep_edges = [e for e in range(len(self._src)) if e not in self._removed_edges]
+        edge_remap = {e: k for k, e in enumerate(keep_edges)}
+        self._kind = [k for k, keep in zip(self._kind, keep_nodes) if keep]
+        self._name = [n for n, keep in zip(self._name, keep_nodes) if keep]
+        self._node_attrs = {int(remap[i]): a for i, a in self._node_attrs.items() if keep_nodes[i]}
+        self._src = remap[np.array(self._src, dtype=np.int64)[keep_edges]].tolist() if keep_edges else []
+        self._dst = remap[np.array(self._dst, dtype=np.int64)[keep_edges]].tolist() if keep_edges else []
+        self._rel = [self._rel[e] for e in keep_edges]
+        self._edge_attrs = {edge_remap[e]: a for e, a in self._edge_attrs.items() if e in edge_remap}
+        self._removed, self._removed_edges = set(), set()
+        self._invalidate(indexes=True)
+
+    def close(self):
+        with self._lock:
+            if self._log is not None:
+                self._log.close()
+                self._log = None
+
+    # -- indexes -----------------------------------------------------------------
+
+    def _invalidate(self, indexes=False):
+        self._csr = None
+        if indexes:
+            self._nodes_by_key = None
+            self._edges_by_key = None
+
+    def _node_index(self):
+        if self._nodes_by_key is None:
+            index = dict(zip(zip(self._kind, self._name), range(len(self._kind))))
+            for i in self._removed:
+                index.pop((self._kind[i], self._name[i]), None)
+            self._nodes_by_key = index
+        return self._nodes_by_key
+
+    def _edge_index(self):
+        if self._edges_by_key is None:
+            index = dict(zip(zip(self._src, self._dst, self._rel), range(len(self._src))))
+            for e in self._removed_edges:
+                index.pop((self._src[e], self._dst[e], self._rel[e]), None)
+            self._edges_by_key = index
+        return self._edges_by_key
+
+    def _relation_code(self, relation):
+        try:
+            return self._relations.index(relation)
+        except ValueError:
+            self._relations.append(relation)
+            return len(self._relations) - 1
+
+    def _adjacency(self):
+        """
+        CSR arrays over live edges in both directions: (indptr, neighbor ids, edge ids).
+        """
+        if self._csr is None:
+            n = len(self._kind)
+            src = np.array(self._src, dtype=np.int64)
+            dst = np.array(self._dst, dtype=np.int64)
+            eid = np.arange(len(src))
+            if self._removed_edges:
+                live = np.ones(len(src), dtype=bool)
+                live[list(self._removed_edges)] = False
+                src, dst, eid = src[live], dst[live], eid[live]
+            a = np.concatenate([src, dst])
+            b = np.concatenate([dst, src])
+            e = np.concatenate([eid, eid])
+            order = np.argsort(a, kind='stable')
+            indptr = np.zeros(n + 1, dtype=np.int64)
+            np.cumsum(np.bincount(a, minlength=n), out=indptr[1:])
+            self._csr = (indptr, b[order], e[order])
+        return self._csr
+
+    # -- mutation ----------------------------------------------------------------
+
+    def _ensure_nodes(self, kind, names):
+        """
+        Node ids for (kind, name) pairs, creating missing nodes. Returns (ids, created mask).
+        """
+        index = self._node_index()
+        codes, uniques = pd.factorize(pd.Series(names, dtype=object).astype(str))
+        unique_ids = np.empty(len(uniques), dtype=np.int64)
+        unique_new = np.zeros(len(uniques), dtype=bool)
+        for j, name in enumerate(uniques.tolist()):
+            i = index.get((kind, name))
+            if i is None:
+                i = len(self._kind)
+                self._kind.append(kind)
+                self._name.append(name)
+                index[(kind, name)] = i
+                unique_new[j] = True
+            unique_ids[j] = i
+        ids = unique_ids[codes]
+        # Only the first occurrence of a new name counts as a creation.
+        created = np.zeros(len(codes), dtype=bool)
+        first = np.unique(codes, return_index=True)[1]
+        created[first] = unique_new[codes[first]]
+        return ids, created
+
+    def _apply(self, op, log=True):
+        """
+        Apply one change-log operation; returns the number of nodes or edges it changed and
+        logs only the changed part.
+        """
+        kind = op['op']
+        if kind == 'nodes':
+            code = _kind_code(op['kind'])
+            names, attrs = op['names'], op.get('attrs')
+            ids, created = self._ensure_nodes(code, names)
+            changed = created.copy()
+            if attrs:
+                for j, (i, a) in enumerate(zip(ids.tolist(), attrs)):
+                    if not a:
+                        continue
+                    current = self._node_attrs.setdefault(i, {})
+                    if any(current.get(k) != v for k, v in a.items()):
+                        current.update(a)
+                        changed[j] = True
+            if changed.any():
+                self._invalidate()
+                if log:
+                    sel = np.flatnonzero(changed).tolist()
+                    entry = {'op': 'nodes', 'kind': op['kind'], 'names': [names[j] for j in sel]}
+                    if attrs:
+                        entry['attrs'] = [attrs[j] for j in sel]
+                    self._write(entry)
+            return int(changed.sum())
+        if kind == 'edges':
+            rel = self._relation_code(op['relation'])
+            src_names, dst_names, attrs = op['src'], op['dst'], op.get('attrs')
+            src, src_new = self._ensure_nodes(_kind_code(op['src_kind']), src_names)
+            dst, dst_new = self._ensure_nodes(_kind_code(op['dst_kind']), dst_names)
+            index = self._edge_index()
+            changed = np.zeros(len(src), dtype=bool)
+            for j, (s, d) in enumerate(zip(src.tolist(), dst.tolist())):
+                key = (s, d, rel)
+                e = index.get(key)
+                a = attrs[j] if attrs else None
+                if e is None:
+                    e = len(self._src)
+                    self._src.append(s)
+                    self._dst.append(d)
+                    self._rel.append(rel)
+                    index[key] = e
+                    changed[j] = True
+                    if a:
+                        self._edge_attrs[e] = dict(a)
+                elif a and any(self._edge_attrs.get(e, {}).get(k) != v for k, v in a.items()):
+                    self._edge_attrs.setdefault(e, {}).update(a)
+                    changed[j] = True
+            if changed.any() or src_new.any() or dst_new.any():
+                self._invalidate()
+            if changed.any() and log:
+                sel = np.flatnonzero(changed).tolist()
+                entry = {'op': 'edges', 'relation': op['relation'], 'src_kind': op['src_kind'],
+                         'dst_kind': op['dst_kind'], 'src': [src_names[j] for j in sel],
+                         'dst': [dst_names[j] for j in sel]}
+                if attrs:
+                    entry['attrs'] = [attrs[j] for j in sel]
+                self._write(entry)
+            return int(changed.sum())
+        if kind == 'remove_node':
+            i = self._node_index().pop((_kind_code(op['kind']), str(op['name'])), None)
+            if i is None:
+                return 0
+            self._removed.add(i)
+            self._node_attrs.pop(i, None)
+            indptr, _, edge_ids = self._adjacency()
+            index = self._edge_index()
+            for e in edge_ids[indptr[i]:indptr[i + 1]].tolist():
+                self._removed_edges.add(e)
+                index.pop((self._src[e], self._dst[e], self._rel[e]), None)
+            self._invalidate()
+        elif kind == 'remove_edge':
+            index = self._node_index()
+            s = index.get((_kind_code(op['src'][0]), str(op['src'][1])))
+            d = index.get((_kind_code(op['dst'][0]), str(op['dst'][1])))
+            rel = self._relations.index(op['relation']) if op['relation'] in self._relations else None
+            e = self._edge_index().pop((s, d, rel), None)
+            if e is None:
+                return 0
+            self._removed_edges.add(e)
+            self._edge_attrs.pop(e, None)
+            self._invalidate()
+        else:
+            raise ValueError(f"Unknown change log operation: {kind}")
+        if log:
+            self._write(dict(op))
+        return 1
+
+    def upsert_node(self, kind, name, **attrs):
+        """
+        Add a node or merge attributes into it. Returns True when the graph changed.
+        """
+        with self._exclusive():
+            attrs = {k: _jsonable(v) for k, v in attrs.items()}
+            changed = self._apply({'op': 'nodes', 'kind': kind, 'names': [name], 'attrs': [attrs] if attrs else None})
+            self.flush()
+            return bool(changed)
+
+    def upsert_edge(self, source, target, relation, **attrs):
+        """
+        Add a directed `relation` edge between (kind, name) nodes, creating them as needed.
+        """
+        with self._exclusive():
+            attrs = {k: _jsonable(v) for k, v in attrs.items()}
+            changed = self._apply({'op': 'edges', 'relation': relation, 'src_kind': source[0], 'src': [source[1]],
+                                   'dst_kind': target[0], 'dst': [target[1]], 'attrs': [attrs] if attrs else None})
+            self.flush()
+            return bool(changed)
+
+    def remove_node(self, kind, name):
+        with self._exclusive():
+            changed = self._apply({'op': 'remove_node', 'kind': kind, 'name': name})
+            self.flush()
+            return bool(changed)
+
+    def remove_edge(self, source, target, relation):
+        with self._exclusive():
+            changed = self._apply({'op': 'remove_edge', 'src': list(source), 'dst': list(target),
+                                   'relation': relation})
+            self.flush()
+            return bool(changed)
+
+    def upsert_frame(self, df, attr_columns=()):
+        """
+        Upsert every bond of a portfolio frame (bond or bond_id, issuer, sector, rating) with
+        its edges, one column batch per node kind and relation. Only new or changed nodes and
+        edges are logged. Returns the number of nodes and edges that changed.
+        """
+        bond_col = 'bond' if 'bond' in df.columns else 'bond_id'
+        frame = pd.DataFrame(index=df.index)
+        for col in ('bond', 'issuer', 'sector', 'rating'):
+            source = bond_col if col == 'bond' else col
+            values = df[source].astype(object) if source in df.columns else pd.Series(None, index=df.index, dtype=object)
+            frame[col] = values.where(values.notna() & (values.astype(str) != ''), None)
+        frame = frame[frame['bond'].notna()]
+        changed = 0
+        with self._exclusive():
+            attrs = None
+            if attr_columns:
+                records = df.loc[frame.index, list(attr_columns)].to_dict(orient='records')
+                attrs = [{k: _jsonable(v) for k, v in r.items()} for r in records]
+            changed += self._apply({'op': 'nodes', 'kind': 'bond', 'names': frame['bond'].tolist(), 'attrs': attrs})
+            for src_col, dst_col, relation in BOND_EDGES:
+                pairs = frame[[src_col, dst_col]].dropna().drop_duplicates()
+                if len(pairs):
+                    changed += self._apply({'op': 'edges', 'relation': relation, 'src_kind': src_col,
+                                            'dst_kind': dst_col, 'src': pairs[src_col].tolist(),
+                                            'dst': pairs[dst_col].tolist()})
+            self.flush()
+        return changed
+
+    def upsert_bond(self, bond_data):
+        """
+        Upsert one bond record (keys bond or bond_id, issuer, sector, rating) with its edges.
+        """
+        bond = bond_data.get('bond', bond_data.get('bond_id'))
+        if _is_missing(bond):
+            raise ValueError("Bond record needs a 'bond' or 'bond_id'")
+        record = {col: bond_data.get(col) for col in ('issuer', 'sector', 'rating')}
+        return bool(self.upsert_frame(pd.DataFrame([{'bond': bond, **record}])))
+
+    def add_event(self, name, affects=(), **attrs):
+        """
+        Upsert an event node and 'affects' edges to the (kind, name) nodes it touches.
+        """
+        with self._exclusive():
+            changed = self.upsert_node('event', name, **attrs)
+            for target in affects:
+                changed |= self.upsert_edge(('event', name), target, 'affects')
+            return changed
+
+    def add_events(self, df, attr_columns=()):
+        """
+        Batch form of add_event for a frame of events (name, bond or bond_id, issuer): event
+        nodes with 'affects' edges to their bond and issuer, and issuer -> bond edges, applied
+        as column batches. Returns the number of nodes and edges that changed.
+        """
+        bond_col = 'bond' if 'bond' in df.columns else 'bond_id'
+        frame = pd.DataFrame({'event': df['name'].astype(str)}, index=df.index)
+        for col, source in (('bond', bond_col), ('issuer', 'issuer')):
+            values = df[source].astype(object) if source in df.columns else pd.Series(None, index=df.index, dtype=object)
+            frame[col] = values.where(values.notna() & (values.astype(str) != ''), None)
+        changed = 0
+        with self._exclusive():
+            attrs = None
+            if attr_columns:
+                records = df[list(attr_columns)].to_dict(orient='records')
+                attrs = [{k: _jsonable(v) for k, v in r.items() if not _is_missing(v)} for r in records]
+            changed += self._apply({'op': 'nodes', 'kind': 'event', 'names': frame['event'].tolist(), 'attrs': attrs})
+            for src_col, dst_col, relation in (('event', 'bond', 'affects'), ('event', 'issuer', 'affects'),
+                                               ('issuer', 'bond', 'issues_bond')):
+                pairs = frame[[src_col, dst_col]].dropna().drop_duplicates()
+                if len(pairs):
+                    changed += self._apply({'op': 'edges', 'relation': relation, 'src_kind': src_col,
+                                            'dst_kind': dst_col, 'src': pairs[src_col].tolist(),
+                                            'dst': pairs[dst_col].tolist()})
+            self.flush()
+        return changed
+
+    # -- queries -----------------------------------------------------------------
+
+    def node(self, kind, name):
+        i = self._node_index().get((_kind_code(kind), str(name)))
+        return None if i is None else dict(self._node_attrs.get(i, {}))
+
+    def nodes(self, kind=None):
+        code = None if kind is None else _kind_code(kind)
+        return [(NODE_KINDS[k], n) for i, (k, n) in enumerate(zip(self._kind, self._name))
+                if (code is None or k == code) and i not in self._removed]
+
+    def neighbors(self, kind, name, relation=None, direction='both'):
+        """
+        (kind, name) keys linked to a node, optionally filtered by relation and direction.
+        """
+        i = self._node_index().get((_kind_code(kind), str(name)))
+        if i is None:
+            return []
+        indptr, neighbors, edge_ids = self._adjacency()
+        result = []
+        for j, e in zip(neighbors[indptr[i]:indptr[i + 1]].tolist(), edge_ids[indptr[i]:indptr[i + 1]].tolist()):
+            if relation is not None and self._relations[self._rel[e]] != relation:
+                continue
+            outgoing = self._src[e] == i
+            if (direction == 'out' and not outgoing) or (direction == 'in' and outgoing):
+                continue
+            result.append((NODE_KINDS[self._kind[j]], self._name[j]))
+        return list(dict.fromkeys(result))
+
+    def edges(self):
+        return [((NODE_KINDS[self._kind[s]], self._name[s]), (NODE_KINDS[self._kind[d]], self._name[d]),
+                 self._relations[r], dict(self._edge_attrs.get(e, {})))
+                for e, (s, d, r) in enumerate(zip(self._src, self._dst, self._rel)) if e not in self._removed_edges]
+
+    def portfolio_frame(self):
+        """
+        One row per bond with its issuer, sector and rating, e.g. for EventCorrelationEngine.
+        """
+        kind = np.array(self._kind, dtype=np.int8)
+        name = np.array(self._name, dtype=object)
+        bond_code = NODE_KINDS.index('bond')
+        bonds = np.flatnonzero(kind == bond_code)
+        if self._removed:
+            bonds = bonds[~np.isin(bonds, list(self._removed))]
+        frame = pd.DataFrame({'bond': name[bonds]}, index=bonds)
+        src = np.array(self._src, dtype=np.int64)
+        dst = np.array(self._dst, dtype=np.int64)
+        rel = np.array(self._rel, dtype=np.int64)
+        live = np.ones(len(src), dtype=bool)
+        if self._removed_edges:
+            live[list(self._removed_edges)] = False
+        for col, relation, bond_side in (('issuer', 'issues_bond', dst), ('sector', 'belongs_to_sector', src),
+                                         ('rating', 'has_rating', src)):
+            other = src if bond_side is dst else dst
+            if relation not in self._relations:
+                frame[col] = None
+                continue
+            mask = live & (rel == self._relations.index(relation)) & (kind[bond_side] == bond_code)
+            links = pd.Series(name[other[mask]], index=bond_side[mask])
+            frame[col] = links[~links.index.duplicated()].reindex(frame.index).to_numpy()
+        return frame.reset_index(drop=True)[['bond', 'issuer', 'sector', 'rating']]
+
+    def subgraph(self, kind, name, radius=1):
+        """
+        networkx DiGraph of a node and everything within `radius` hops, with `relation` edge
+        attributes and `type` node attributes.
+        """
+        if not NETWORKX_AVAILABLE:
+            raise ImportError("networkx is required for graph export: pip install networkx")
+        indptr, neighbors, edge_ids = self._adjacency()
+        start = self._node_index().get((_kind_code(kind), str(name)))
+        keep = set() if start is None else {start}
+        frontier = set(keep)
+        for _ in range(radius):
+            reached = set()
+            for i in frontier:
+                reached.update(neighbors[indptr[i]:indptr[i + 1]].tolist())
+            frontier = reached - keep
+            keep |= reached
+        G = nx.DiGraph()
+        for i in keep:
+            G.add_node(self._name[i], type=NODE_KINDS[self._kind[i]], **self._node_attrs.get(i, {}))
+        for i in keep:
+            for e in edge_ids[indptr[i]:indptr[i + 1]].tolist():
+                s, d = self._src[e], self._dst[e]
+                if s == i and d in keep:
+                    G.add_edge(self._name[s], self._name[d], relation=self._relations[self._rel[e]],
+                               **self._edge_attrs.get(e, {}))
+        return G
+
+    def to_networkx(self):
+        if not NETWORKX_AVAILABLE:
+            raise ImportError("networkx is required for graph export: pip install networkx")
+        G = nx.DiGraph()
+        G.add_nodes_from((n, {'type': NODE_KINDS[k], **self._node_attrs.get(i, {})})
+                         for i, (k, n) in enumerate(zip(self._kind, self._name)) if i not in self._removed)
+        G.add_edges_from((self._name[s], self._name[d], {'relation': self._relations[r], **self._edge_attrs.get(e, {})})
+                         for e, (s, d, r) in enumerate(zip(self._src, self._dst, self._rel))
+                         if e not in self._removed_edges)
+        return G
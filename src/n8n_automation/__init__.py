@@ -2,23 +2,20 @@ import pandas as pd
 import smtplib
 from email.message import EmailMessage
 
-def fetch_bond_data(bond_ticker):
+def fetch_bond_data(bond_ticker, store=None):
     """
     Simulate pulling bond data from an API or database.
+    With a TimeSeriesStore, spread_history and latest_spread come from its stored ticks.
     """
-    # Placeholder: Replace with real API/database call
-    import numpy as np
-    sample_data = {
-        "bond_id": bond_ticker,
-        "issuer": "Acme Corp",
-        "sector": "Technology",
-        "rating": "A",
-        "yield": 5.2,
-        "spread": 120,
-        "cash_flows": [5, 5, 105],
-        "spread_history": list(np.random.normal(120, 10, 30)),  # 30 historical spread values
-        "latest_spread": 125
-    }
+    # Placeholder: Replace with real API/database call. Seeded by the ticker, so repeated
+    # calls for one bond return the same data.
+    from utils.synthetic import synthetic_bond
+    sample_data = synthetic_bond(bond_ticker, history_days=30)
+    if store is not None:
+        _, history = store.range(bond_ticker)
+        if len(history):
+            sample_data["spread_history"] = history.tolist()
+            sample_data["latest_spread"] = float(history[-1])
     return sample_data
 
 def clean_bond_data(raw_data):
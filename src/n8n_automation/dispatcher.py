@@ -0,0 +1,291 @@
+import asyncio
+import hashlib
+import json
+import os
+import random
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+
+import numpy as np
+import requests
+from requests.adapters import HTTPAdapter
+
+RETRY_STATUS = {408, 425, 429, 500, 502, 503, 504}
+
+
+def idempotency_key(alert):
+    """
+    Key identifying one alert event: its own 'idempotency_key' if set, else its 'event_id',
+    else a hash of its content including its 'timestamp', so the same breach reported
+    again later is a new alert while a resubmission of the same event is a duplicate.
+    """
+    if isinstance(alert, dict) and alert.get('idempotency_key'):
+        return str(alert['idempotency_key'])
+    if isinstance(alert, dict) and alert.get('event_id') is not None:
+        return f"event:{alert['event_id']}"
+    body = json.dumps(alert, sort_keys=True, default=str).encode()
+    return hashlib.sha256(body).hexdigest()
+
+
+def _stamped(alert):
+    # Alerts with neither an event id nor a timestamp are stamped when submitted.
+    if isinstance(alert, dict) and not any(alert.get(k) is not None for k in ('idempotency_key', 'event_id', 'timestamp')):
+        alert = {**alert, 'timestamp': datetime.now(timezone.utc).isoformat()}
+    return alert
+
+
+class WebhookDispatcher:
+    """
+    Asyncio dispatcher for n8n webhook alerts.
+    Alerts go through a bounded queue (submit waits when it is full) and are posted by
+    `concurrency` workers over one keep-alive requests.Session, whose blocking calls run in
+    a thread pool of the same size. Workers batch up to `batch_size` alerts that arrive
+    within `batch_wait` seconds into one payload {"batch_id": ..., "alerts": [...]}, the
+    same shape for a batch of one. Every alert carries an idempotency key (see
+    idempotency_key) and repeats are dropped while the key is among the last `dedup_size`.
+    Connection errors and 408/429/5xx are retried with exponential backoff; alerts that
+    still fail are appended to `dead_letter_path` as JSON lines.
+    """
+
+    def __init__(self, url, concurrency=8, max_queue=10_000, batch_size=50, batch_wait=0.05,
+                 max_retries=5, backoff=0.2, max_backoff=10.0, timeout=5, dead_letter_path=None,
+                 session=None, dedup_size=100_000):
+        self.url = url
+        self.concurrency = concurrency
+        self.max_queue = max_queue
+        self.batch_size = batch_size
+        self.batch_wait = batch_wait
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.timeout = timeout
+        self.dead_letter_path = dead_letter_path
+        self.dedup_size = dedup_size
+        if session is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=1, pool_maxsize=concurrency)
+            session.mount('http://', adapter)
+            session.mount('https://', adapter)
+        self.session = session
+        self._seen = OrderedDict()
+        self._queue = None
+        self._workers = []
+        self._executor = None
+        self._dead_letter_lock = threading.Lock()
+        self._reset_stats()
+
+    def _reset_stats(self):
+        self._started = None
+        self._latencies = []
+        self._counts = {'submitted': 0, 'duplicates': 0, 'delivered': 0, 'dead_lettered': 0,
+                        'requests': 0, 'retries': 0}
+
+    async def start(self):
+        if self._queue is not None:
+            return self
+        self._queue = asyncio.Queue(maxsize=self.max_queue)
+        self._executor = ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix='n8n-dispatch')
+        self._started = time.monotonic()
+        self._workers = [asyncio.create_task(self._worker()) for _ in range(self.concurrency)]
+        return self
+
+    async def __aenter__(self):
+        return await self.start()
+
+    async def __aexit__(self, *exc):
+        await self.close()
+
+    def _claim(self, key):
+        if key in self._seen:
+            self._counts['duplicates'] += 1
+            return False
+        self._seen[key] = None
+        if len(self._seen) > self.dedup_size:
+            self._seen.popitem(last=False)
+        return True
+
+    async def submit(self, alert):
+        """
+        Queue an alert, waiting for space when the queue is full. Returns False for duplicates.
+        """
+        await self.start()
+        alert = _stamped(alert)
+        key = idempotency_key(alert)
+        if not self._claim(key):
+            return False
+        self._counts['submitted'] += 1
+        await self._queue.put((key, alert, time.monotonic()))
+        return True
+
+    def submit_nowait(self, alert):
+        """
+        Queue an alert without waiting; raises asyncio.QueueFull when the queue is full.
+        """
+        if self._queue is None:
+            raise RuntimeError("Dispatcher is not started")
+        alert = _stamped(alert)
+        key = idempotency_key(alert)
+        if key in self._seen:
+            self._counts['duplicates'] += 1
+            return False
+        self._queue.put_nowait((key, alert, time.monotonic()))
+        self._claim(key)
+        self._counts['submitted'] += 1
+        return True
+
+    async def _next_batch(self):
+        batch = [await self._queue.get()]
+        deadline = time.monotonic() + self.batch_wait
+        while len(batch) < self.batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self._queue.get(), remaining))
+            except asyncio.TimeoutError:
+                break
+        return batch
+
+    def _post(self, payload, key):
+        response = self.session.post(self.url, json=payload, timeout=self.timeout,
+                                     headers={'Idempotency-Key': key})
+        return response.status_code
+
+    async def _deliver(self, batch):
+        key = hashlib.sha256('|'.join(item[0] for item in batch).encode()).hexdigest()
+        payload = {'batch_id': key, 'alerts': [item[1] for item in batch]}
+        loop = asyncio.get_running_loop()
+        error = None
+        for attempt in range(self.max_retries + 1):
+            if attempt:
+                self._counts['retries'] += 1
+                delay = min(self.max_backoff, self.backoff * 2 ** (attempt - 1))
+                await asyncio.sleep(delay * (0.5 + random.random() / 2))
+            self._counts['requests'] += 1
+            try:
+                status = await loop.run_in_executor(self._executor, self._post, payload, key)
+            except requests.RequestException as e:
+                error = str(e)
+                continue
+            if 200 <= status < 300:
+                now = time.monotonic()
+                self._latencies.extend(now - item[2] for item in batch)
+                self._counts['delivered'] += len(batch)
+                return True
+            error = f"HTTP {status}"
+            if status not in RETRY_STATUS:
+                break
+        self._dead_letter(batch, error, attempt + 1)
+        return False
+
+    def _dead_letter(self, batch, error, attempts):
+        self._counts['dead_lettered'] += len(batch)
+        for key, _, _ in batch:
+            # Let a later resubmission of an undelivered alert through.
+            self._seen.pop(key, None)
+        if not self.dead_letter_path:
+            return
+        lines = [json.dumps({'idempotency_key': key, 'alert': alert, 'error': error,
+                             'attempts': attempts, 'failed_at': time.time()}, default=str)
+                 for key, alert, _ in batch]
+        with self._dead_letter_lock:
+            os.makedirs(os.path.dirname(os.path.abspath(self.dead_letter_path)), exist_ok=True)
+            with open(self.dead_letter_path, 'a') as f:
+                f.write('\n'.join(lines) + '\n')
+
+    async def _worker(self):
+        while True:
+            batch = await self._next_batch()
+            try:
+                await self._deliver(batch)
+            except Exception as e:
+                self._dead_letter(batch, repr(e), 0)
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+
+    async def drain(self):
+        """
+        Wait until every queued alert is delivered or dead-lettered.
+        """
+        if self._queue is not None:
+            await self._queue.join()
+
+    async def close(self):
+        if self._queue is None:
+            return
+        await self.drain()
+        for task in self._workers:
+            task.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+        self._queue = None
+        self._executor.shutdown(wait=True)
+        self._executor = None
+
+    def stats(self):
+        """
+        Counters plus throughput (delivered alerts per second since start) and latency
+        percentiles (seconds from submit to delivery).
+        """
+        elapsed = time.monotonic() - self._started if self._started else 0.0
+        stats = dict(self._counts)
+        stats['queued'] = self._queue.qsize() if self._queue is not None else 0
+        stats['elapsed'] = elapsed
+        stats['throughput'] = stats['delivered'] / elapsed if elapsed > 0 else 0.0
+        latencies = np.array(self._latencies)
+        for name, q in (('latency_p50', 50), ('latency_p95', 95), ('latency_p99', 99)):
+            stats[name] = float(np.percentile(latencies, q)) if len(latencies) else None
+        stats['latency_max'] = float(latencies.max()) if len(latencies) else None
+        return stats
+
+
+class BackgroundDispatcher:
+    """
+    Runs a WebhookDispatcher on its own event loop thread so synchronous callers (the
+    dashboard, SmartAlert.send_alert) can queue alerts without blocking.
+    Keyword arguments are passed to WebhookDispatcher.
+    """
+
+    def __init__(self, url, **kwargs):
+        self.dispatcher = WebhookDispatcher(url, **kwargs)
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._loop.run_forever, name='n8n-dispatcher', daemon=True)
+        self._thread.start()
+        self._call(self.dispatcher.start())
+
+    def _call(self, coro, timeout=None):
+        return asyncio.run_coroutine_threadsafe(coro, self._loop).result(timeout)
+
+    def submit(self, alert, timeout=None):
+        """
+        Queue an alert; returns False for duplicates. Blocks only while the queue is full.
+        """
+        return self._call(self.dispatcher.submit(alert), timeout)
+
+    def drain(self, timeout=None):
+        self._call(self.dispatcher.drain(), timeout)
+
+    def stats(self):
+        return self._call(self._stats())
+
+    async def _stats(self):
+        return self.dispatcher.stats()
+
+    def close(self, timeout=None):
+        if not self._loop.is_running():
+            return
+        self._call(self.dispatcher.close(), timeout)
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join(timeout)
+        self._loop.close()
+        self.dispatcher.session.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -0,0 +1,303 @@
+import glob
+import hashlib
+import json
+import os
+import re
+import uuid
+
+import numpy as np
+import pandas as pd
+
+from rag_ai.index import InsightIndex
+
+RECORD_EXTENSIONS = ('.jsonl', '.ndjson')
+
+# Source field names accepted for each normalized field, in order of preference.
+FIELD_ALIASES = {
+    'bond_id': ('bond_id', 'bond', 'isin', 'cusip', 'ticker'),
+    'issuer': ('issuer', 'company', 'issuer_name', 'entity'),
+    'sector': ('sector', 'industry'),
+    'date': ('date', 'published', 'published_at', 'timestamp', 'time'),
+    'event': ('event', 'headline', 'title', 'type'),
+    'details': ('details', 'body', 'text', 'summary', 'content'),
+}
+CONTENT_FIELDS = ('bond_id', 'issuer', 'sector', 'date', 'event', 'details')
+
+_SPACES = re.compile(r"\s+")
+
+
+def list_sources(paths):
+    """
+    JSONL files under `paths` (files or directories, searched recursively), sorted.
+    """
+    if isinstance(paths, (str, os.PathLike)):
+        paths = [paths]
+    files = []
+    for path in paths:
+        path = os.fspath(path)
+        if os.path.isdir(path):
+            for root, _, names in os.walk(path):
+                files.extend(os.path.join(root, n) for n in names if n.endswith(RECORD_EXTENSIONS))
+        elif os.path.exists(path):
+            files.append(path)
+        else:
+            raise ValueError(f"No such file or directory: {path}")
+    return sorted(set(os.path.abspath(f) for f in files))
+
+
+def iter_records(paths, offsets=None):
+    """
+    Generator of (path, end_offset, record) over JSON-lines files, one line in memory at a
+    time, starting each file at its byte offset in `offsets`. Malformed complete lines are
+    yielded with record None; an unterminated last line that does not parse is left for
+    the next run, as the file may still be being written.
+    """
+    offsets = offsets or {}
+    for path in list_sources(paths):
+        offset = offsets.get(path, 0)
+        if offset >= os.path.getsize(path):
+            continue
+        with open(path, 'rb') as f:
+            f.seek(offset)
+            for line in f:
+                try:
+                    record = json.loads(line) if line.strip() else None
+                except ValueError:
+                    if not line.endswith(b'\n'):
+                        break
+                    record = None
+                offset += len(line)
+                if record is not None and not isinstance(record, dict):
+                    record = None
+                yield path, offset, record
+
+
+def normalize_issuer(name, aliases=None):
+    """
+    Issuer name with whitespace collapsed and trailing punctuation dropped, mapped through
+    `aliases` (matched case-insensitively) to a canonical name.
+    """
+    if name is None:
+        return None
+    name = _SPACES.sub(' ', str(name)).strip().rstrip('.,;')
+    if not name:
+        return None
+    if aliases:
+        return aliases.get(name.upper(), name)
+    return name
+
+
+def _parse_dates(values):
+    # ISO timestamps parse in one vectorized pass; anything else falls back to mixed formats.
+    raw = pd.Series(values, dtype=object)
+    dates = pd.to_datetime(raw, errors='coerce', utc=True, format='ISO8601')
+    retry = dates.isna() & raw.notna()
+    if retry.any():
+        dates[retry] = pd.to_datetime(raw[retry], errors='coerce', utc=True, format='mixed')
+    return [None if pd.isna(d) else d.strftime('%Y-%m-%d') for d in dates]
+
+
+def normalize_records(records, issuer_aliases=None):
+    """
+    Event records with the fields of CONTENT_FIELDS: source aliases resolved, whitespace
+    collapsed, bond ids upper-cased, issuers canonicalized and dates as YYYY-MM-DD (None
+    when unparseable). Dates are parsed for the whole batch at once.
+    """
+    out = []
+    for record in records:
+        row = {}
+        for field, names in FIELD_ALIASES.items():
+            value = next((record[n] for n in names if record.get(n) not in (None, '')), None)
+            row[field] = _SPACES.sub(' ', str(value)).strip() if value is not None else None
+        if row['bond_id']:
+            row['bond_id'] = row['bond_id'].replace(' ', '').upper()
+        row['issuer'] = normalize_issuer(row['issuer'], issuer_aliases)
+        out.append(row)
+    for row, date in zip(out, _parse_dates([row['date'] for row in out])):
+        row['date'] = date
+    return out
+
+
+def normalize_record(record, issuer_aliases=None):
+    """
+    One record through normalize_records.
+    """
+    return normalize_records([record], issuer_aliases)[0]
+
+
+def content_hash(record):
+    """
+    64-bit hash of a normalized record's content fields, so the same event delivered twice
+    (or by two feeds) hashes alike regardless of other metadata.
+    """
+    body = json.dumps([record.get(f) for f in CONTENT_FIELDS], ensure_ascii=False).encode()
+    return int.from_bytes(hashlib.blake2b(body, digest_size=8).digest(), 'little')
+
+
+class SeenHashes:
+    """
+    Set of 64-bit content hashes kept as sorted uint64 runs (8 bytes per hash) that are
+    merged like a binary counter, so memory stays proportional to the number of distinct
+    events and a batch is checked with a few searchsorted calls.
+    """
+
+    def __init__(self, hashes=None):
+        self.runs = []
+        if hashes is not None and len(hashes):
+            self.runs.append(np.unique(np.asarray(hashes, dtype=np.uint64)))
+
+    def __len__(self):
+        return sum(len(r) for r in self.runs)
+
+    def _contains(self, hashes):
+        found = np.zeros(len(hashes), dtype=bool)
+        for run in self.runs:
+            pos = np.minimum(np.searchsorted(run, hashes), len(run) - 1)
+            found |= run[pos] == hashes
+        return found
+
+    def add_new(self, hashes):
+        """
+        Mask of the hashes not seen before (first occurrence within the batch), which are
+        then added.
+        """
+        hashes = np.asarray(hashes, dtype=np.uint64)
+        fresh = np.zeros(len(hashes), dtype=bool)
+        _, first = np.unique(hashes, return_index=True)
+        fresh[first] = True
+        fresh &= ~self._contains(hashes)
+        if fresh.any():
+            self.runs.append(np.sort(hashes[fresh]))
+            while len(self.runs) > 1 and len(self.runs[-2]) <= 2 * len(self.runs[-1]):
+                self.runs[-2:] = [np.sort(np.concatenate(self.runs[-2:]))]
+        return fresh
+
+    def to_array(self):
+        return np.sort(np.concatenate(self.runs)) if self.runs else np.zeros(0, dtype=np.uint64)
+
+
+class EventIngestor:
+    """
+    Streaming ingestion of news/event JSONL into an InsightIndex and a KnowledgeGraphStore.
+    Records are read lazily, normalized (normalize_records), deduplicated by content hash
+    against everything ingested before, and pushed in micro-batches of `batch_size`. Every
+    `checkpoint_every` batches (and at the end of a run) the graph store is flushed, the
+    index saved to `index_path`, and the per-file byte offsets and seen hashes written to
+    `checkpoint_path` (and with the index), so a restarted run resumes after the last
+    checkpoint. With an `index_path`, saved segments are reopened memory-mapped, which keeps
+    long backfills in bounded memory.
+    """
+
+    def __init__(self, index=None, store=None, checkpoint_path=None, index_path=None, batch_size=1000,
+                 checkpoint_every=10, issuer_aliases=None):
+        self.store = store
+        self.checkpoint_path = checkpoint_path
+        self.index_path = index_path
+        self.batch_size = batch_size
+        self.checkpoint_every = checkpoint_every
+        self.issuer_aliases = {k.upper(): v for k, v in (issuer_aliases or {}).items()}
+        self.offsets = {}
+        self.counts = {'records': 0, 'ingested': 0, 'duplicates': 0, 'malformed': 0, 'batches': 0}
+        self.seen = SeenHashes()
+        if index is None:
+            if index_path and os.path.exists(os.path.join(index_path, 'index.json')):
+                index = InsightIndex.load(index_path)
+            else:
+                index = InsightIndex()
+        self.index = index
+        if checkpoint_path:
+            self._load_checkpoint()
+
+    def _hashes_path(self, generation):
+        return f"{self.checkpoint_path}.{generation}.hashes.npy"
+
+    def _load_checkpoint(self):
+        state = None
+        if os.path.exists(self.checkpoint_path):
+            with open(self.checkpoint_path) as f:
+                state = json.load(f)
+        # State committed together with the saved index wins: after a crash between the two
+        # writes it is the one that matches the index's documents.
+        state = self.index.metadata.get('ingest', state)
+        if state is None:
+            return
+        self.offsets = state.get('offsets', {})
+        self.counts.update(state.get('counts', {}))
+        generation = state.get('generation')
+        if generation and os.path.exists(self._hashes_path(generation)):
+            self.seen = SeenHashes(np.load(self._hashes_path(generation)))
+
+    def checkpoint(self):
+        """
+        Persist the graph store, then the seen hashes of a new generation, then the index
+        together with the offsets and counts of that generation (one atomic write of its
+        index.json), and finally the checkpoint file. On restart the state saved with the
+        index is preferred, so index, hashes and offsets always match; a crash before the
+        index is saved only re-reads records, and the store takes repeated events unchanged.
+        """
+        if self.store is not None:
+            self.store.flush()
+        state = {'offsets': self.offsets, 'counts': self.counts}
+        if self.checkpoint_path:
+            directory = os.path.dirname(os.path.abspath(self.checkpoint_path))
+            os.makedirs(directory, exist_ok=True)
+            state['generation'] = uuid.uuid4().hex
+            hashes_path = self._hashes_path(state['generation'])
+            with open(hashes_path + '.tmp', 'wb') as f:
+                np.save(f, self.seen.to_array())
+            os.replace(hashes_path + '.tmp', hashes_path)
+        if self.index_path:
+            self.index.save(self.index_path, metadata={'ingest': state} if self.checkpoint_path else None)
+            self.index = InsightIndex.load(self.index_path)
+        if not self.checkpoint_path:
+            return
+        tmp = self.checkpoint_path + '.tmp'
+        with open(tmp, 'w') as f:
+            json.dump(state, f)
+        os.replace(tmp, self.checkpoint_path)
+        # Both the index and the checkpoint file now name this generation.
+        for path in glob.glob(glob.escape(self.checkpoint_path) + '.*.hashes.npy'):
+            if path != hashes_path:
+                os.remove(path)
+
+    def _push(self, records, positions):
+        normalized = normalize_records(records, self.issuer_aliases)
+        hashes = np.fromiter((content_hash(r) for r in normalized), dtype=np.uint64, count=len(normalized))
+        fresh = self.seen.add_new(hashes)
+        self.counts['duplicates'] += int(len(fresh) - fresh.sum())
+        if fresh.any():
+            frame = pd.DataFrame([r for r, keep in zip(normalized, fresh) if keep], columns=list(CONTENT_FIELDS))
+            frame['name'] = [f"{h:016x}" for h in hashes[fresh]]
+            self.index.add(frame)
+            if self.store is not None:
+                self.store.add_events(frame, attr_columns=('event', 'date', 'sector'))
+            self.counts['ingested'] += len(frame)
+        self.offsets.update(positions)
+        self.counts['batches'] += 1
+        if self.checkpoint_every and self.counts['batches'] % self.checkpoint_every == 0:
+            self.checkpoint()
+
+    def ingest(self, paths, limit=None):
+        """
+        Ingest new records from `paths` (files or directories), at most `limit` of them.
+        Returns the running counts: records read, ingested, duplicates, malformed, batches.
+        """
+        records, positions = [], {}
+        read = 0
+        for path, offset, record in iter_records(paths, self.offsets):
+            if limit is not None and read >= limit:
+                break
+            read += 1
+            self.counts['records'] += 1
+            positions[path] = offset
+            if record is None:
+                self.counts['malformed'] += 1
+            else:
+                records.append(record)
+            if len(records) >= self.batch_size:
+                self._push(records, positions)
+                records, positions = [], {}
+        if records or positions:
+            self._push(records, positions)
+        self.checkpoint()
+        return dict(self.counts)
@@ -1,5 +1,7 @@
 import random
 
+from .index import InsightIndex
+
 # Simulated knowledge base
 knowledge_base = [
     {"bond_id": "ACME2025", "event": "Downgrade", "details": "Moody's downgraded Acme Corp to A- in 2024."},
@@ -8,12 +10,31 @@ knowledge_base = [
     {"bond_id": "XYZ2030", "event": "Regulatory", "details": "New capital requirements introduced for sector in 2024."},
 ]
 
-def retrieve_insights(bond_data):
+_default_index = None
+
+def default_index():
+    """
+    InsightIndex over the built-in knowledge base, built on first use.
+    """
+    global _default_index
+    if _default_index is None:
+        _default_index = InsightIndex(knowledge_base)
+    return _default_index
+
+def retrieve_insights(bond_data, index=None, k=5):
     """
     Retrieve relevant insights from the knowledge base for a given bond.
+    Events are looked up in `index` (default: the built-in knowledge base) by bond_id, most
+    recent first; with a "query" in bond_data they are ranked by relevance to it instead.
     """
+    index = default_index() if index is None else index
     bond_id = bond_data.get("bond_id")
-    relevant = [item for item in knowledge_base if item["bond_id"] == bond_id]
+    query = bond_data.get("query")
+    if query:
+        filters = {"bond_id": bond_id} if bond_id else {}
+        relevant = index.search(query, k=k, **filters)
+    else:
+        relevant = index.latest_for_bonds([bond_id], k=k)[str(bond_id)] if bond_id else []
     if not relevant:
         return "No recent events or insights found for this bond."
     # Simulate LLM-generated explanation
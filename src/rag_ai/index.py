@@ -0,0 +1,421 @@
+import json
+import os
+import re
+import shutil
+import uuid
+
+import numpy as np
+import pandas as pd
+
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+")
+FILTER_FIELDS = ('bond_id', 'issuer', 'sector')
+TEXT_FIELDS = ('event', 'details')
+
+
+def tokenize(text):
+    """
+    Lower-case alphanumeric tokens of a text.
+    """
+    return TOKEN_PATTERN.findall(str(text).lower()) if text is not None else []
+
+
+def _columns(docs):
+    """
+    Filter, text and date columns of documents given as a DataFrame or a list of dicts
+    ('bond' is accepted for 'bond_id'; missing fields are empty).
+    """
+    frame = docs if isinstance(docs, pd.DataFrame) else pd.DataFrame(list(docs))
+    if 'bond_id' not in frame.columns and 'bond' in frame.columns:
+        frame = frame.rename(columns={'bond': 'bond_id'})
+    frame = frame.reset_index(drop=True)
+    columns = {}
+    for field in FILTER_FIELDS + TEXT_FIELDS:
+        if field in frame.columns:
+            values = frame[field].astype(object)
+            columns[field] = values.where(values.notna(), '').astype(str).to_numpy(dtype=object)
+        else:
+            columns[field] = np.full(len(frame), '', dtype=object)
+    dates = frame['date'] if 'date' in frame.columns else pd.Series([None] * len(frame), dtype=object)
+    columns['date'] = pd.to_datetime(dates, errors='coerce').to_numpy().astype('datetime64[D]')
+    return columns
+
+
+def _lookup(labels, values):
+    """
+    Positions of `values` in the sorted array `labels`, -1 where absent.
+    """
+    values = np.asarray(values, dtype=str)
+    if not len(labels):
+        return np.full(len(values), -1, dtype=np.int64)
+    pos = np.minimum(np.searchsorted(labels, values), len(labels) - 1)
+    return np.where(labels[pos] == values, pos, -1)
+
+
+def _group_index(codes, n_groups, dates):
+    # Documents of each group, most recent first (then in insertion order): order[indptr[g]:indptr[g + 1]].
+    recency = np.where(np.isnat(dates), np.iinfo(np.int64).min + 1, dates.astype(np.int64))
+    order = np.lexsort((np.arange(len(codes)), -recency, codes))
+    indptr = np.zeros(n_groups + 1, dtype=np.int64)
+    np.cumsum(np.bincount(codes, minlength=n_groups), out=indptr[1:])
+    return order.astype(np.int64), indptr
+
+
+class _Segment:
+    """
+    Immutable block of documents: CSR postings (term -> documents and term frequencies)
+    over a sorted vocabulary, label-coded filter fields, dates, and the event text as one
+    utf-8 blob with offsets. All state is plain arrays, so a saved segment can be mapped.
+    """
+
+    def __init__(self, arrays, name=None):
+        self.arrays = arrays
+        for key, value in arrays.items():
+            setattr(self, key, value)
+        self.n_docs = len(self.doc_len)
+        # Segments never change, so a saved segment directory is reused as long as it exists.
+        self.name = name or f"segment_{uuid.uuid4().hex}"
+
+    @classmethod
+    def build(cls, columns):
+        n = len(columns['date'])
+        tokens = [tokenize(f"{e} {d}") for e, d in zip(columns['event'], columns['details'])]
+        lengths = np.fromiter(map(len, tokens), dtype=np.int64, count=n)
+        term_codes, terms = pd.factorize(np.array([t for doc in tokens for t in doc], dtype=object))
+        terms = np.asarray(terms, dtype=str)
+        order = np.argsort(terms, kind='stable')
+        rank = np.empty(len(order), dtype=np.int64)
+        rank[order] = np.arange(len(order))
+        doc_ids = np.repeat(np.arange(n, dtype=np.int64), lengths)
+        # (term, document) pairs sorted by term then document, with their counts.
+        keys, tf = np.unique(rank[term_codes] * max(n, 1) + doc_ids, return_counts=True)
+        term_of, postings = np.divmod(keys, max(n, 1))
+        arrays = {
+            'vocab': terms[order],
+            'indptr': np.concatenate([[0], np.cumsum(np.bincount(term_of, minlength=len(order)))]),
+            'postings': postings.astype(np.int32),
+            'tf': tf.astype(np.float32),
+            'doc_len': lengths.astype(np.float32),
+            'dates': columns['date'],
+        }
+        for field in FILTER_FIELDS:
+            labels, codes = np.unique(np.asarray(columns[field], dtype=str), return_inverse=True)
+            arrays[f"{field}_labels"], arrays[f"{field}_codes"] = labels, codes.astype(np.int32)
+        # Event and details of document i are fields 2i and 2i + 1 of the blob.
+        encoded = [s.encode() for pair in zip(columns['event'], columns['details']) for s in pair]
+        arrays['blob'] = np.frombuffer(b''.join(encoded), dtype=np.uint8)
+        arrays['text_offsets'] = np.concatenate([[0], np.cumsum(np.fromiter(map(len, encoded), dtype=np.int64,
+                                                                              count=len(encoded)))])
+        return cls._with_bond_index(arrays)
+
+    @classmethod
+    def _with_bond_index(cls, arrays):
+        arrays['bond_order'], arrays['bond_indptr'] = _group_index(
+            arrays['bond_id_codes'], len(arrays['bond_id_labels']), arrays['dates'])
+        return cls(arrays)
+
+    @classmethod
+    def merge(cls, segments):
+        """
+        One segment with the documents of `segments` in order, combined from their arrays
+        without re-tokenizing.
+        """
+        starts = np.cumsum([0] + [s.n_docs for s in segments])
+
+        def relabel(name):
+            # Union of sorted label arrays and, per segment, the map from old to new positions.
+            labels, inverse = np.unique(np.concatenate([s.arrays[name] for s in segments]), return_inverse=True)
+            bounds = np.cumsum([0] + [len(s.arrays[name]) for s in segments])
+            return labels, [inverse[bounds[i]:bounds[i + 1]] for i in range(len(segments))]
+
+        vocab, term_maps = relabel('vocab')
+        term_of = np.concatenate([np.repeat(m, np.diff(s.indptr)) for m, s in zip(term_maps, segments)])
+        # Segments are in document order, so a stable sort by term keeps each posting list sorted.
+        order = np.argsort(term_of, kind='stable')
+        arrays = {
+            'vocab': vocab,
+            'indptr': np.concatenate([[0], np.cumsum(np.bincount(term_of, minlength=len(vocab)))]),
+            'postings': np.concatenate([np.asarray(s.postings, dtype=np.int64) + start
+                                        for s, start in zip(segments, starts)])[order].astype(np.int32),
+            'tf': np.concatenate([s.tf for s in segments])[order],
+            'doc_len': np.concatenate([s.doc_len for s in segments]),
+            'dates': np.concatenate([s.dates for s in segments]),
+        }
+        for field in FILTER_FIELDS:
+            labels, maps = relabel(f"{field}_labels")
+            arrays[f"{field}_labels"] = labels
+            arrays[f"{field}_codes"] = np.concatenate(
+                [m[s.arrays[f"{field}_codes"]] for m, s in zip(maps, segments)]).astype(np.int32)
+        blob_starts = np.cumsum([0] + [len(s.blob) for s in segments])
+        arrays['blob'] = np.concatenate([s.blob for s in segments])
+        arrays['text_offsets'] = np.concatenate(
+            [s.text_offsets[:-1] + b for s, b in zip(segments, blob_starts)] + [[blob_starts[-1]]])
+        return cls._with_bond_index(arrays)
+
+    def text(self, i):
+        off = self.text_offsets
+        return (bytes(self.blob[off[2 * i]:off[2 * i + 1]]).decode(),
+                bytes(self.blob[off[2 * i + 1]:off[2 * i + 2]]).decode())
+
+    def mask(self, docs, filters):
+        """
+        Boolean mask over local document ids `docs` for the filters
+        ({'bond_id'|'issuer'|'sector': values, 'start', 'end'}).
+        """
+        keep = np.ones(len(docs), dtype=bool)
+        for field in FILTER_FIELDS:
+            wanted = filters.get(field)
+            if wanted is None:
+                continue
+            codes = _lookup(self.arrays[f"{field}_labels"], [wanted] if isinstance(wanted, str) else list(wanted))
+            keep &= np.isin(self.arrays[f"{field}_codes"][docs], codes[codes >= 0])
+        dates = self.dates[docs]
+        if filters.get('start') is not None:
+            keep &= dates >= np.datetime64(pd.Timestamp(filters['start']).date(), 'D')
+        if filters.get('end') is not None:
+            keep &= dates <= np.datetime64(pd.Timestamp(filters['end']).date(), 'D')
+        return keep
+
+
+class InsightIndex:
+    """
+    Offline retrieval over event documents (bond_id, issuer, sector, date, event, details).
+    Text is ranked with BM25 over an inverted index; results can be filtered by bond,
+    issuer, sector and date range. Documents are added in immutable segments that are
+    merged as they accumulate (at most about log2(n) segments), so adding a batch never
+    rebuilds the whole index. `save` writes plain .npy arrays that `load` memory-maps.
+    """
+
+    def __init__(self, docs=None, k1=1.2, b=0.75):
+        self.k1 = k1
+        self.b = b
+        self.segments = []
+        self.metadata = {}
+        if docs is not None:
+            self.add(docs)
+
+    def __len__(self):
+        return sum(s.n_docs for s in self.segments)
+
+    def _offsets(self):
+        return np.cumsum([0] + [s.n_docs for s in self.segments])
+
+    def add(self, docs):
+        """
+        Index a batch of documents; returns their document ids.
+        """
+        columns = _columns(docs)
+        n = len(columns['date'])
+        first = len(self)
+        if n:
+            self.segments.append(_Segment.build(columns))
+            # Merge while the previous segment is no larger than the newest, like a binary counter.
+            while len(self.segments) > 1 and self.segments[-2].n_docs <= self.segments[-1].n_docs:
+                self.segments[-2:] = [_Segment.merge(self.segments[-2:])]
+        return np.arange(first, first + n)
+
+    def optimize(self):
+        """
+        Merge all segments into one.
+        """
+        if len(self.segments) > 1:
+            self.segments = [_Segment.merge(self.segments)]
+
+    def document(self, doc_id):
+        offsets = self._offsets()
+        s = int(np.searchsorted(offsets, doc_id, side='right')) - 1
+        if doc_id < 0 or s >= len(self.segments):
+            raise KeyError(doc_id)
+        segment, i = self.segments[s], int(doc_id - offsets[s])
+        event, details = segment.text(i)
+        date = segment.dates[i]
+        doc = {field: str(segment.arrays[f"{field}_labels"][segment.arrays[f"{field}_codes"][i]])
+               for field in FILTER_FIELDS}
+        doc.update({'date': None if np.isnat(date) else pd.Timestamp(date), 'event': event, 'details': details})
+        return doc
+
+    def _results(self, doc_ids, scores):
+        doc_ids = np.asarray(doc_ids, dtype=np.int64)
+        offsets = self._offsets()
+        owner = np.searchsorted(offsets, doc_ids, side='right') - 1
+        results = [None] * len(doc_ids)
+        for s in np.unique(owner):
+            segment, rows = self.segments[s], np.flatnonzero(owner == s)
+            local = doc_ids[rows] - offsets[s]
+            fields = {f: segment.arrays[f"{f}_labels"][segment.arrays[f"{f}_codes"][local]] for f in FILTER_FIELDS}
+            dates = segment.dates[local]
+            for j, (row, i) in enumerate(zip(rows, local)):
+                event, details = segment.text(i)
+                doc = {f: str(fields[f][j]) for f in FILTER_FIELDS}
+                doc.update({'date': None if np.isnat(dates[j]) else pd.Timestamp(dates[j]), 'event': event,
+                            'details': details, 'doc_id': int(doc_ids[row]), 'score': float(scores[row])})
+                results[row] = doc
+        return results
+
+    def search(self, query=None, k=10, **filters):
+        """
+        Top-`k` documents for a text query, ranked by BM25, as dicts with 'doc_id' and
+        'score'. Filters: bond_id, issuer, sector (a value or a list), start, end (dates).
+        Without a query the most recent matching documents are returned, with score 0.
+        """
+        ids, scores = self._search(query, k, filters)
+        return self._results(ids, scores)
+
+    def _search(self, query, k, filters):
+        terms = np.unique(np.asarray(tokenize(query), dtype=str)) if query else np.zeros(0, dtype=str)
+        if not len(terms):
+            return self._recent(k, filters)
+        total_docs = len(self)
+        avg_len = sum(float(s.doc_len.sum()) for s in self.segments) / max(total_docs, 1)
+        positions = [_lookup(s.vocab, terms) for s in self.segments]
+        df = np.zeros(len(terms))
+        for s, pos in zip(self.segments, positions):
+            found = pos >= 0
+            df[found] += s.indptr[pos[found] + 1] - s.indptr[pos[found]]
+        idf = np.log1p((total_docs - df + 0.5) / (df + 0.5))
+        found_ids, found_scores = [], []
+        for s, pos, start in zip(self.segments, positions, self._offsets()):
+            found = np.flatnonzero(pos >= 0)
+            if not len(found):
+                continue
+            lo, hi = s.indptr[pos[found]], s.indptr[pos[found] + 1]
+            take = np.concatenate([np.arange(a, b) for a, b in zip(lo, hi)])
+            docs, tf = np.asarray(s.postings[take], dtype=np.int64), s.tf[take]
+            weight = np.repeat(idf[found], hi - lo)
+            norm = self.k1 * (1 - self.b + self.b * s.doc_len[docs] / avg_len)
+            contrib = weight * tf * (self.k1 + 1) / (tf + norm)
+            docs, inverse = np.unique(docs, return_inverse=True)
+            score = np.bincount(inverse, weights=contrib)
+            keep = s.mask(docs, filters)
+            found_ids.append(docs[keep] + start)
+            found_scores.append(score[keep])
+        if not found_ids:
+            return np.zeros(0, dtype=np.int64), np.zeros(0)
+        ids, scores = np.concatenate(found_ids), np.concatenate(found_scores)
+        if len(ids) > k:
+            top = np.argpartition(-scores, k - 1)[:k]
+            ids, scores = ids[top], scores[top]
+        order = np.lexsort((ids, -scores))
+        return ids[order], scores[order]
+
+    def _recent(self, k, filters):
+        found_ids, found_dates = [], []
+        for s, start in zip(self.segments, self._offsets()):
+            bonds = filters.get('bond_id')
+            if bonds is not None:
+                codes = _lookup(s.bond_id_labels, [bonds] if isinstance(bonds, str) else list(bonds))
+                codes = codes[codes >= 0]
+                docs = np.concatenate([s.bond_order[s.bond_indptr[c]:s.bond_indptr[c + 1]] for c in codes]
+                                      + [np.zeros(0, dtype=np.int64)])
+            else:
+                docs = np.arange(s.n_docs)
+            docs = docs[s.mask(docs, filters)]
+            found_ids.append(docs + start)
+            found_dates.append(s.dates[docs])
+        if not found_ids:
+            return np.zeros(0, dtype=np.int64), np.zeros(0)
+        ids, dates = np.concatenate(found_ids), np.concatenate(found_dates)
+        recency = np.where(np.isnat(dates), np.iinfo(np.int64).min + 1, dates.astype(np.int64))
+        order = np.lexsort((ids, -recency))[:k]
+        return ids[order], np.zeros(len(order))
+
+    def latest_for_bonds(self, bond_ids, k=5):
+        """
+        The `k` most recent documents of each bond, gathered from the per-bond indexes in one
+        vectorized pass: {bond_id: [documents]}.
+        """
+        bond_ids = [str(b) for b in bond_ids]
+        owners, ids, recency = [], [], []
+        for s, start in zip(self.segments, self._offsets()):
+            codes = _lookup(s.bond_id_labels, bond_ids)
+            hit = np.flatnonzero(codes >= 0)
+            first = s.bond_indptr[codes[hit]]
+            counts = np.minimum(s.bond_indptr[codes[hit] + 1] - first, k)
+            ranks = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+            docs = s.bond_order[np.repeat(first, counts) + ranks]
+            dates = s.dates[docs]
+            owners.append(np.repeat(hit, counts))
+            ids.append(docs + start)
+            recency.append(np.where(np.isnat(dates), np.iinfo(np.int64).min + 1, dates.astype(np.int64)))
+        results = {b: [] for b in bond_ids}
+        if not owners:
+            return results
+        owners, ids, recency = np.concatenate(owners), np.concatenate(ids), np.concatenate(recency)
+        # Each segment contributes up to k per bond; keep the k most recent overall.
+        order = np.lexsort((ids, -recency, owners))
+        owners, ids = owners[order], ids[order]
+        starts = np.flatnonzero(np.r_[True, owners[1:] != owners[:-1]])
+        rank = np.arange(len(owners)) - np.repeat(starts, np.diff(np.r_[starts, len(owners)]))
+        keep = rank < k
+        for owner, doc in zip(owners[keep], self._results(ids[keep], np.zeros(int(keep.sum())))):
+            results[bond_ids[owner]].append(doc)
+        return results
+
+    def search_batch(self, queries, k=10, **filters):
+        """
+        Run many queries in one call. Each query is a string or a dict with an optional
+        'query' and its own filters (merged over the shared `filters`). Returns one result
+        list per query, in order.
+        """
+        results = []
+        for q in queries:
+            spec = {'query': q} if isinstance(q, str) or q is None else dict(q)
+            query = spec.pop('query', None)
+            results.append(self.search(query, k=k, **{**filters, **spec}))
+        return results
+
+    def save(self, path, metadata=None):
+        """
+        Write the index to directory `path`: one directory of .npy files per segment plus
+        index.json. Segments already saved there are not rewritten. `metadata` (JSON-able)
+        is committed in the same write of index.json and comes back as `load(...).metadata`.
+        """
+        os.makedirs(path, exist_ok=True)
+        for segment in self.segments:
+            directory = os.path.join(path, segment.name)
+            if os.path.isdir(directory):
+                continue
+            # Written aside and renamed, so a half-written segment is never listed.
+            tmp = f"{directory}.{os.getpid()}.tmp"
+            os.makedirs(tmp, exist_ok=True)
+            for key, value in segment.arrays.items():
+                np.save(os.path.join(tmp, f"{key}.npy"), np.asarray(value))
+            os.replace(tmp, directory)
+        names = [segment.name for segment in self.segments]
+        if metadata is not None:
+            self.metadata = metadata
+        meta = {'k1': self.k1, 'b': self.b, 'segments': names, 'documents': len(self),
+                'metadata': self.metadata}
+        tmp = os.path.join(path, 'index.json.tmp')
+        with open(tmp, 'w') as f:
+            json.dump(meta, f)
+        os.replace(tmp, os.path.join(path, 'index.json'))
+        # Merged-away segments; readers that still map them keep their open files.
+        for entry in os.listdir(path):
+            if entry.startswith('segment_') and entry not in names:
+                shutil.rmtree(os.path.join(path, entry), ignore_errors=True)
+
+    @classmethod
+    def load(cls, path, mmap=True):
+        """
+        Open an index written by `save`; arrays are memory-mapped unless `mmap` is False.
+        """
+        meta_path = os.path.join(path, 'index.json')
+        if not os.path.exists(meta_path):
+            raise ValueError(f"No insight index at {path}")
+        with open(meta_path) as f:
+            meta = json.load(f)
+        index = cls(k1=meta['k1'], b=meta['b'])
+        index.metadata = meta.get('metadata', {})
+        for name in meta['segments']:
+            directory = os.path.join(path, name)
+            arrays = {}
+            for file in sorted(os.listdir(directory)):
+                if not file.endswith('.npy'):
+                    continue
+                try:
+                    arrays[file[:-4]] = np.load(os.path.join(directory, file), mmap_mode='r' if mmap else None)
+                except ValueError:
+                    # Empty arrays cannot be mapped.
+                    arrays[file[:-4]] = np.load(os.path.join(directory, file))
+            index.segments.append(_Segment(arrays, name=name))
+        return index
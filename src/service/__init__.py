@@ -0,0 +1,2 @@
+from .app import ROUTES, UVICORN_AVAILABLE, AnalyticsService, create_app, serve
+from .client import LocalClient
@@ -0,0 +1,247 @@
+import asyncio
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from urllib.parse import parse_qsl
+
+from utils.cache import ResultCache, content_hash
+
+from . import handlers
+
+try:
+    import uvicorn
+    UVICORN_AVAILABLE = True
+except ImportError:
+    UVICORN_AVAILABLE = False
+
+EXECUTOR_KINDS = ('process', 'thread')
+DEFAULT_CACHE_TTL = 300
+
+# (method, path) -> handler in service.handlers; handlers run in the worker pool.
+ROUTES = {
+    ('POST', '/portfolio/metrics'): handlers.portfolio_metrics,
+    ('POST', '/portfolio/analytics'): handlers.portfolio_analytics,
+    ('POST', '/portfolio/risk'): handlers.portfolio_risk,
+    ('GET', '/scenarios'): handlers.scenarios_list,
+    ('POST', '/scenarios/run'): handlers.scenarios_run,
+    ('POST', '/alerts/check'): handlers.alerts_check,
+    ('POST', '/graph/propagate'): handlers.graph_propagate,
+    ('POST', '/graph/systemic'): handlers.graph_systemic,
+}
+
+
+def portfolio_key(spec):
+    """
+    Content hash of a request's portfolio: its records, or a local file's path, size and
+    modification time, so an edited file is not served from cache.
+    """
+    if not isinstance(spec, dict):
+        return None
+    if 'path' in spec and 'records' not in spec:
+        try:
+            stat = os.stat(spec['path'])
+        except OSError:
+            return None
+        return content_hash('path', os.path.abspath(spec['path']), stat.st_size, stat.st_mtime_ns)
+    return content_hash('records', spec.get('records'))
+
+
+class AnalyticsService:
+    """
+    ASGI application serving the bond_analytics and knowledge_graph analytics as JSON.
+    Handlers run in a pool of `workers` processes (or threads) off the event loop.
+    Identical requests (same route and input hash) that arrive while one is computing share
+    its result, and responses are kept in a ResultCache for `cache_ttl` seconds. Each response
+    says how it was served in its `x-cache` header: miss, hit or coalesced. Graph lookups in a
+    KnowledgeGraphStore, when given one, run in the event loop's default thread pool.
+    Portfolios given as {"path": ...} are read only from inside `data_dir` (relative paths
+    resolve against it); without one, only {"records": [...]} portfolios are accepted.
+    """
+
+    def __init__(self, workers=None, executor='process', cache=None, cache_ttl=DEFAULT_CACHE_TTL, store=None,
+                 data_dir=None):
+        if executor not in EXECUTOR_KINDS:
+            raise ValueError(f"Unsupported executor: {executor}. Use one of {', '.join(EXECUTOR_KINDS)}")
+        self.workers = workers or os.cpu_count() or 1
+        self.executor_kind = executor
+        self.cache = cache if cache is not None else ResultCache()
+        self.cache_ttl = cache_ttl
+        self.store = store
+        self.data_dir = os.path.realpath(data_dir) if data_dir else None
+        self.pool = None
+        self._inflight = {}
+        self.counts = {'requests': 0, 'computed': 0, 'cached': 0, 'coalesced': 0, 'errors': 0}
+        self.started = time.time()
+
+    def start(self):
+        if self.pool is None:
+            kind = ProcessPoolExecutor if self.executor_kind == 'process' else ThreadPoolExecutor
+            self.pool = kind(max_workers=self.workers)
+
+    def shutdown(self):
+        if self.pool is not None:
+            self.pool.shutdown(wait=True)
+            self.pool = None
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'lifespan':
+            await self._lifespan(receive, send)
+        elif scope['type'] == 'http':
+            await self._http(scope, receive, send)
+
+    async def _lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                self.start()
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                self.shutdown()
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+
+    async def _http(self, scope, receive, send):
+        body = b''
+        while True:
+            message = await receive()
+            body += message.get('body', b'')
+            if not message.get('more_body'):
+                break
+        status, payload, cache_state = await self.handle(scope['method'], scope['path'],
+                                                         scope.get('query_string', b''), body)
+        headers = [(b'content-type', b'application/json'), (b'content-length', str(len(payload)).encode())]
+        if cache_state:
+            headers.append((b'x-cache', cache_state.encode()))
+        await send({'type': 'http.response.start', 'status': status, 'headers': headers})
+        await send({'type': 'http.response.body', 'body': payload})
+
+    async def handle(self, method, path, query_string=b'', body=b''):
+        """
+        Serve one request; returns (status, JSON bytes, cache state or None).
+        """
+        self.counts['requests'] += 1
+        try:
+            if isinstance(query_string, bytes):
+                query_string = query_string.decode()
+            query = dict(parse_qsl(query_string))
+            if (method, path) == ('GET', '/health'):
+                return 200, self._encode(self.health()), None
+            if (method, path) == ('GET', '/graph/neighbors'):
+                return 200, self._encode(await self._neighbors(query)), None
+            handler = ROUTES.get((method, path))
+            if handler is None:
+                allowed = [m for m, p in ROUTES if p == path]
+                return (405 if allowed else 404), self._error('Method not allowed' if allowed else 'Not found'), None
+            try:
+                payload = json.loads(body) if body.strip() else {}
+            except ValueError as e:
+                raise ValueError(f"Invalid JSON body: {e}")
+            if not isinstance(payload, dict):
+                raise ValueError("Request body must be a JSON object")
+            payload.update((k, v) for k, v in query.items() if k not in payload)
+            return await self._dispatch(path, handler, payload)
+        except ValueError as e:
+            self.counts['errors'] += 1
+            return 400, self._error(str(e)), None
+        except Exception as e:
+            self.counts['errors'] += 1
+            return 500, self._error(f"{type(e).__name__}: {e}"), None
+
+    def _portfolio_spec(self, spec):
+        # A file portfolio's path, resolved (symlinks included) and confined to data_dir.
+        if not isinstance(spec, dict) or 'path' not in spec or 'records' in spec:
+            return spec
+        if self.data_dir is None:
+            raise ValueError("Portfolio files are not enabled on this service; send 'records' instead")
+        path = os.path.realpath(os.path.join(self.data_dir, str(spec['path'])))
+        if os.path.commonpath([path, self.data_dir]) != self.data_dir:
+            raise ValueError(f"Portfolio path is outside the data directory: {spec['path']}")
+        return dict(spec, path=path)
+
+    async def _dispatch(self, path, handler, payload):
+        if 'portfolio' in payload:
+            payload['portfolio'] = self._portfolio_spec(payload['portfolio'])
+        key = portfolio_key(payload.get('portfolio'))
+        rest = {k: v for k, v in payload.items() if k != 'portfolio'}
+        request_key = (path, content_hash(payload.get('portfolio') if key is None else key, rest))
+        cached = self.cache.get(request_key)
+        if cached is not None:
+            self.counts['cached'] += 1
+            return 200, cached, 'hit'
+        task = self._inflight.get(request_key)
+        if task is not None:
+            self.counts['coalesced'] += 1
+            status, body = await asyncio.shield(task)
+            return status, body, 'coalesced'
+        # The computation is its own task, shared by every waiter, so cancelling the request
+        # that started it leaves the others (and the cache) unaffected.
+        task = asyncio.ensure_future(self._compute_shared(request_key, handler, payload, key))
+        self._inflight[request_key] = task
+        task.add_done_callback(lambda done: self._finished(request_key, done))
+        status, body = await asyncio.shield(task)
+        return status, body, 'miss'
+
+    def _finished(self, request_key, task):
+        if self._inflight.get(request_key) is task:
+            del self._inflight[request_key]
+        if not task.cancelled():
+            task.exception()  # retrieved here so failures nobody waited for are not logged
+
+    async def _compute_shared(self, request_key, handler, payload, key):
+        status, body = await self._compute(handler, payload, key)
+        if status == 200:
+            self.cache.put(request_key, body, size=len(body), ttl=self.cache_ttl)
+        return status, body
+
+    async def _compute(self, handler, payload, key):
+        self.start()
+        self.counts['computed'] += 1
+        loop = asyncio.get_running_loop()
+        try:
+            result = await loop.run_in_executor(self.pool, handler, payload, key)
+        except ValueError as e:
+            self.counts['errors'] += 1
+            return 400, self._error(str(e))
+        return 200, self._encode(result)
+
+    async def _neighbors(self, query):
+        if self.store is None:
+            raise ValueError("No knowledge graph store configured")
+        if 'kind' not in query or 'name' not in query:
+            raise ValueError("Query parameters 'kind' and 'name' are required")
+        loop = asyncio.get_running_loop()
+        neighbors = await loop.run_in_executor(
+            None, lambda: self.store.neighbors(query['kind'], query['name'], relation=query.get('relation'),
+                                               direction=query.get('direction', 'both')))
+        return {'node': self.store.node(query['kind'], query['name']),
+                'neighbors': [{'kind': kind, 'name': name} for kind, name in neighbors]}
+
+    def health(self):
+        return {'status': 'ok', 'uptime_seconds': round(time.time() - self.started, 3), 'workers': self.workers,
+                'executor': self.executor_kind, 'inflight': len(self._inflight), 'counts': dict(self.counts),
+                'cache': self.cache.stats()}
+
+    @staticmethod
+    def _encode(value):
+        return json.dumps(value, default=str).encode()
+
+    def _error(self, message):
+        return self._encode({'error': message})
+
+
+def create_app(**kwargs):
+    """
+    AnalyticsService with keyword arguments passed through.
+    """
+    return AnalyticsService(**kwargs)
+
+
+def serve(app=None, host='127.0.0.1', port=8000, **kwargs):
+    """
+    Run the service with uvicorn, bound to localhost by default.
+    """
+    if not UVICORN_AVAILABLE:
+        raise ImportError("uvicorn is required to serve over HTTP: pip install uvicorn "
+                          "(service.LocalClient works without it)")
+    uvicorn.run(app or create_app(**kwargs), host=host, port=port, lifespan='on')
@@ -0,0 +1,136 @@
+import asyncio
+import json
+import time
+
+import numpy as np
+
+
+class Response:
+    def __init__(self, status, headers, body, seconds):
+        self.status = status
+        self.headers = headers
+        self.body = body
+        self.seconds = seconds
+
+    def json(self):
+        return json.loads(self.body)
+
+    @property
+    def cache(self):
+        return self.headers.get('x-cache')
+
+
+class LocalClient:
+    """
+    In-process client for an ASGI app: requests go straight to the app on a private event
+    loop, with no sockets, so the service can be exercised and load-tested locally. Use as a
+    context manager to run the app's lifespan startup and shutdown.
+    """
+
+    def __init__(self, app):
+        self.app = app
+        self.loop = asyncio.new_event_loop()
+        self._lifespan = None
+        self._events = None
+        self._done = None
+
+    def __enter__(self):
+        self.loop.run_until_complete(self._start())
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    async def _start(self):
+        self._events = asyncio.Queue()
+        self._done = asyncio.Queue()
+        scope = {'type': 'lifespan', 'asgi': {'version': '3.0'}}
+
+        async def send(message):
+            await self._done.put(message)
+
+        self._lifespan = asyncio.ensure_future(self.app(scope, self._events.get, send))
+        await self._events.put({'type': 'lifespan.startup'})
+        await self._done.get()
+
+    async def _stop(self):
+        await self._events.put({'type': 'lifespan.shutdown'})
+        await self._done.get()
+        await self._lifespan
+
+    def close(self):
+        if self._lifespan is not None:
+            self.loop.run_until_complete(self._stop())
+            self._lifespan = None
+        self.loop.close()
+
+    async def request_async(self, method, path, json_body=None, query=''):
+        """
+        One request through the app; returns a Response.
+        """
+        body = b'' if json_body is None else json.dumps(json_body).encode()
+        scope = {'type': 'http', 'asgi': {'version': '3.0'}, 'http_version': '1.1', 'method': method,
+                 'path': path, 'query_string': query.encode(), 'headers': [(b'content-type', b'application/json')]}
+        sent = False
+        response = {}
+
+        async def receive():
+            nonlocal sent
+            if sent:
+                return {'type': 'http.disconnect'}
+            sent = True
+            return {'type': 'http.request', 'body': body, 'more_body': False}
+
+        async def send(message):
+            if message['type'] == 'http.response.start':
+                response['status'] = message['status']
+                response['headers'] = {k.decode(): v.decode() for k, v in message.get('headers', [])}
+            elif message['type'] == 'http.response.body':
+                response['body'] = response.get('body', b'') + message.get('body', b'')
+
+        start = time.perf_counter()
+        await self.app(scope, receive, send)
+        return Response(response['status'], response['headers'], response.get('body', b''),
+                        time.perf_counter() - start)
+
+    def request(self, method, path, json_body=None, query=''):
+        return self.loop.run_until_complete(self.request_async(method, path, json_body, query))
+
+    def get(self, path, query=''):
+        return self.request('GET', path, query=query)
+
+    def post(self, path, json_body=None):
+        return self.request('POST', path, json_body)
+
+    def load_test(self, requests, concurrency=16):
+        """
+        Send `requests` ((method, path, body) tuples) with at most `concurrency` in flight and
+        summarize: throughput, latency percentiles in milliseconds, and counts by status and
+        by cache state.
+        """
+        async def run():
+            semaphore = asyncio.Semaphore(concurrency)
+
+            async def one(method, path, body):
+                async with semaphore:
+                    return await self.request_async(method, path, body)
+
+            return await asyncio.gather(*(one(*r) for r in requests))
+
+        start = time.perf_counter()
+        responses = self.loop.run_until_complete(run())
+        elapsed = time.perf_counter() - start
+        latencies = np.array([r.seconds for r in responses]) * 1000
+        statuses, caches = {}, {}
+        for r in responses:
+            statuses[r.status] = statuses.get(r.status, 0) + 1
+            caches[r.cache] = caches.get(r.cache, 0) + 1
+        return {
+            'requests': len(responses),
+            'seconds': round(elapsed, 4),
+            'requests_per_second': round(len(responses) / elapsed, 1) if elapsed else None,
+            'latency_ms': {f"p{q}": round(float(np.percentile(latencies, q)), 3) for q in (50, 90, 99)}
+            if len(latencies) else {},
+            'status': statuses,
+            'cache': {str(k): v for k, v in caches.items()},
+        }
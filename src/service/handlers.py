@@ -0,0 +1,151 @@
+import math
+
+import numpy as np
+import pandas as pd
+
+from bond_analytics.alerts import SmartAlert
+from bond_analytics.batch import ANALYTICS
+from bond_analytics.portfolio import Portfolio
+from bond_analytics.risk import calculate_portfolio_risk
+from bond_analytics.scenarios import apply_scenario, list_scenarios, run_scenarios, scenario_summary
+from knowledge_graph.event_correlation import EventCorrelationEngine
+from utils.cache import ResultCache
+
+METRIC_ANALYTICS = ('aggregate', 'sector_exposure', 'concentration', 'liquidity')
+
+# Parsed portfolios and correlation engines, per worker process, keyed by portfolio hash.
+_OBJECTS = ResultCache(max_bytes=256 * 1024 * 1024)
+
+
+def to_json_ready(value):
+    """
+    Plain JSON types for analytics results: DataFrames as lists of records (index included
+    when meaningful), Series as objects, numpy scalars as Python numbers, NaN as null.
+    """
+    if isinstance(value, pd.DataFrame):
+        if not isinstance(value.index, pd.RangeIndex) or value.index.name is not None:
+            value = value.reset_index()
+        return [to_json_ready(row) for row in value.to_dict(orient='records')]
+    if isinstance(value, pd.Series):
+        return {str(k): to_json_ready(v) for k, v in value.items()}
+    if isinstance(value, dict):
+        return {str(k): to_json_ready(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple, np.ndarray, pd.Index)):
+        return [to_json_ready(v) for v in value]
+    if isinstance(value, (pd.Timestamp, np.datetime64)) or value is pd.NaT:
+        return None if pd.isna(value) else pd.Timestamp(value).isoformat()
+    if value is pd.NA:
+        return None
+    if isinstance(value, np.generic):
+        value = value.item()
+    if isinstance(value, float) and not math.isfinite(value):
+        return None
+    return value
+
+
+def load_portfolio(spec, key=None):
+    """
+    Portfolio from a request's 'portfolio' object: {"records": [...]} of bond rows or
+    {"path": ...} of a local file. Reused across requests with the same `key`.
+    """
+    if not isinstance(spec, dict):
+        raise ValueError("'portfolio' must be an object with 'records' or 'path'")
+
+    def build():
+        if 'records' in spec:
+            return Portfolio.from_frame(pd.DataFrame(spec['records']))
+        if 'path' in spec:
+            return Portfolio(spec['path'])
+        raise ValueError("'portfolio' must contain 'records' or 'path'")
+
+    if key is None:
+        return build()
+    return _OBJECTS.get_or_compute(('portfolio', key), build)
+
+
+def _engine(payload, key):
+    portfolio = load_portfolio(payload.get('portfolio'), key)
+    if key is None:
+        return EventCorrelationEngine(portfolio.df)
+    return _OBJECTS.get_or_compute(('engine', key), lambda: EventCorrelationEngine(portfolio.df))
+
+
+def portfolio_analytics(payload, key=None):
+    """
+    The bond_analytics.batch ANALYTICS named in 'analytics' (default: the portfolio metrics),
+    with step 'options' as in the batch runner.
+    """
+    names = payload.get('analytics') or METRIC_ANALYTICS
+    unknown = [n for n in names if n not in ANALYTICS]
+    if unknown:
+        raise ValueError(f"Unknown analytics: {', '.join(unknown)}. Use any of {', '.join(ANALYTICS)}")
+    portfolio = load_portfolio(payload.get('portfolio'), key)
+    options = payload.get('options') or {}
+    return {name: to_json_ready(ANALYTICS[name](portfolio, options)) for name in names}
+
+
+def portfolio_metrics(payload, key=None):
+    return portfolio_analytics({**payload, 'analytics': payload.get('analytics') or METRIC_ANALYTICS}, key)
+
+
+def portfolio_risk(payload, key=None):
+    portfolio = load_portfolio(payload.get('portfolio'), key)
+    return to_json_ready(calculate_portfolio_risk(portfolio.df, discount_rate=payload.get('discount_rate')))
+
+
+def scenarios_list(payload, key=None):
+    return to_json_ready(list_scenarios())
+
+
+def scenarios_run(payload, key=None):
+    """
+    P&L summary across 'scenarios' (default all), the full (scenarios x bonds) matrix with
+    'detail', and the stressed book for a single 'apply' scenario.
+    """
+    portfolio = load_portfolio(payload.get('portfolio'), key)
+    pnl = run_scenarios(portfolio.df, scenarios=payload.get('scenarios'), mode=payload.get('mode', 'approx'))
+    result = {'summary': to_json_ready(scenario_summary(pnl).rename_axis('scenario'))}
+    if payload.get('detail'):
+        result['pnl'] = to_json_ready(pnl.rename_axis('scenario'))
+    if payload.get('apply'):
+        result['stressed'] = to_json_ready(apply_scenario(portfolio.df, payload['apply']))
+    return result
+
+
+def alerts_check(payload, key=None):
+    """
+    Z-score check of each {'bond_id', 'history', 'latest'} in 'checks' (or the payload
+    itself) against 'threshold', as SmartAlert.is_abnormal_move does.
+    """
+    checks = payload.get('checks', [payload])
+    threshold = float(payload.get('threshold', 2.5))
+    results = []
+    for check in checks:
+        history = check.get('history')
+        if history is None or len(history) < 2 or check.get('latest') is None:
+            raise ValueError("Each check needs 'history' (at least two values) and 'latest'")
+        alert = SmartAlert(np.asarray(history, dtype=np.float64), check.get('bond_id'), None)
+        abnormal, z_score = alert.is_abnormal_move(float(check['latest']), threshold=threshold)
+        results.append({'bond_id': check.get('bond_id'), 'abnormal': bool(abnormal), 'z_score': float(z_score)})
+    return {'threshold': threshold, 'results': results}
+
+
+def graph_propagate(payload, key=None):
+    """
+    Bonds reached by a 'sector' event, or multi-hop stress scores from 'sources' with
+    'decay' (EventCorrelationEngine.propagate_stress).
+    """
+    engine = _engine(payload, key)
+    if payload.get('sources') is not None:
+        stress = engine.propagate_stress(payload['sources'], decay=float(payload.get('decay', 0.5)))
+        return {'stress': to_json_ready(stress)}
+    if payload.get('sector') is None:
+        raise ValueError("Provide 'sector' or 'sources'")
+    return {'affected': to_json_ready(engine.propagate_event(payload['sector']))}
+
+
+def graph_systemic(payload, key=None):
+    engine = _engine(payload, key)
+    summary = engine.systemic_exposure(kind=payload.get('kind', 'sector'), decay=float(payload.get('decay', 0.5)),
+                                       threshold=float(payload.get('threshold', 0.01)))
+    return to_json_ready(summary)
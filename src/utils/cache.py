@@ -0,0 +1,215 @@
+import hashlib
+import json
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import time
+import uuid
+from collections import OrderedDict
+
+import numpy as np
+
+DEFAULT_MAX_BYTES = 512 * 1024 * 1024
+
+_MISSING = object()
+
+
+def content_hash(*parts):
+    """
+    Hex digest identifying `parts`: bytes and strings by content, DataFrames and Series by
+    their values, index and columns, arrays by dtype, shape and data, anything else by its
+    JSON (or repr) form.
+    """
+    # pandas is only consulted if something already imported it, keeping this module cheap.
+    pd = sys.modules.get('pandas')
+    digest = hashlib.blake2b(digest_size=20)
+    for part in parts:
+        if isinstance(part, (bytes, bytearray, memoryview)):
+            digest.update(b'b')
+            digest.update(bytes(part))
+        elif isinstance(part, str):
+            digest.update(b's')
+            digest.update(part.encode())
+        elif pd is not None and isinstance(part, (pd.DataFrame, pd.Series)):
+            digest.update(b'p')
+            digest.update(pd.util.hash_pandas_object(part, index=True).to_numpy().tobytes())
+            columns = part.columns if isinstance(part, pd.DataFrame) else [part.name]
+            digest.update(repr(list(columns)).encode())
+        elif isinstance(part, np.ndarray):
+            digest.update(b'a')
+            digest.update(f"{part.dtype}{part.shape}".encode())
+            digest.update(np.ascontiguousarray(part).tobytes())
+        else:
+            digest.update(b'j')
+            try:
+                digest.update(json.dumps(part, sort_keys=True, default=repr).encode())
+            except TypeError:
+                digest.update(repr(part).encode())
+        digest.update(b'\0')
+    return digest.hexdigest()
+
+
+def estimate_size(value, _depth=0):
+    """
+    Approximate memory footprint of a cached value in bytes.
+    """
+    pd = sys.modules.get('pandas')
+    if pd is not None and isinstance(value, pd.DataFrame):
+        return int(value.memory_usage(deep=True).sum())
+    if pd is not None and isinstance(value, (pd.Series, pd.Index)):
+        return int(value.memory_usage(deep=True))
+    if isinstance(value, np.ndarray):
+        return int(value.nbytes)
+    if isinstance(value, (bytes, bytearray, str)):
+        return sys.getsizeof(value)
+    if _depth < 3:
+        if isinstance(value, dict):
+            return sys.getsizeof(value) + sum(estimate_size(k, _depth + 1) + estimate_size(v, _depth + 1)
+                                              for k, v in value.items())
+        if isinstance(value, (list, tuple, set)):
+            return sys.getsizeof(value) + sum(estimate_size(v, _depth + 1) for v in value)
+        if hasattr(value, '__dict__'):
+            return sys.getsizeof(value) + estimate_size(vars(value), _depth + 1)
+    return sys.getsizeof(value)
+
+
+class ResultCache:
+    """
+    Thread-safe LRU cache of computed results bounded by `max_bytes` (sizes from
+    estimate_size unless given). Keys are tuples such as (kind, content_hash, *params).
+    Entries may carry a time-to-live. get_or_compute runs a missing computation once per
+    key even when several threads ask for it at the same time.
+    """
+
+    def __init__(self, max_bytes=DEFAULT_MAX_BYTES, clock=time.monotonic):
+        self.max_bytes = max_bytes
+        self.clock = clock
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._pending = {}
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, key):
+        return self.get(key, _count=False) is not _MISSING
+
+    def get(self, key, default=None, _count=True):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[2] is not None and self.clock() >= entry[2]:
+                self._drop(key)
+                entry = None
+            if entry is None:
+                if _count:
+                    self.misses += 1
+                return default if _count else _MISSING
+            self._entries.move_to_end(key)
+            if _count:
+                self.hits += 1
+            return entry[0]
+
+    def _drop(self, key):
+        value, size, _ = self._entries.pop(key)
+        self.bytes -= size
+
+    def put(self, key, value, size=None, ttl=None):
+        """
+        Store a value; values larger than the whole cache are not kept. Returns the value.
+        """
+        size = estimate_size(value) if size is None else int(size)
+        expires = None if ttl is None else self.clock() + ttl
+        with self._lock:
+            if key in self._entries:
+                self._drop(key)
+            if size > self.max_bytes:
+                return value
+            self._entries[key] = (value, size, expires)
+            self.bytes += size
+            while self.bytes > self.max_bytes:
+                oldest = next(iter(self._entries))
+                self._drop(oldest)
+                self.evictions += 1
+        return value
+
+    def get_or_compute(self, key, compute, size=None, ttl=None):
+        """
+        Cached value for `key`, calling `compute()` on a miss. Concurrent callers of a key
+        being computed wait for that computation instead of repeating it.
+        """
+        value = self.get(key, _MISSING)
+        if value is not _MISSING:
+            return value
+        with self._lock:
+            event = self._pending.get(key)
+            owner = event is None
+            if owner:
+                event = self._pending[key] = threading.Event()
+        if not owner:
+            event.wait()
+            value = self.get(key, _MISSING, _count=False)
+            if value is not _MISSING:
+                return value
+            return self.get_or_compute(key, compute, size, ttl)
+        try:
+            return self.put(key, compute(), size, ttl)
+        finally:
+            with self._lock:
+                self._pending.pop(key, None)
+            event.set()
+
+    def invalidate(self, predicate=None):
+        """
+        Drop every entry, or those whose key satisfies `predicate`.
+        """
+        with self._lock:
+            for key in [k for k in self._entries if predicate is None or predicate(k)]:
+                self._drop(key)
+
+    def stats(self):
+        with self._lock:
+            total = self.hits + self.misses
+            return {'entries': len(self._entries), 'bytes': self.bytes, 'max_bytes': self.max_bytes,
+                    'hits': self.hits, 'misses': self.misses, 'evictions': self.evictions,
+                    'hit_rate': self.hits / total if total else 0.0}
+
+
+class SessionWorkspace:
+    """
+    Private scratch directory for one dashboard session, so uploads from concurrent users
+    never share a file. Uploads are stored under their content hash with their original
+    extension; the directory is removed by `cleanup()` or when the object is collected.
+    """
+
+    def __init__(self, session_id=None, root=None):
+        self.session_id = session_id or uuid.uuid4().hex
+        root = root or os.path.join(tempfile.gettempdir(), 'creditpulse-sessions')
+        os.makedirs(root, exist_ok=True)
+        self.path = tempfile.mkdtemp(prefix=f"{self.session_id}-", dir=root)
+
+    def save_upload(self, data, name=''):
+        """
+        Write uploaded bytes once per content; returns (path, content hash).
+        """
+        data = bytes(data)
+        key = content_hash(data)
+        ext = os.path.splitext(str(name))[1].lower()
+        path = os.path.join(self.path, f"{key}{ext}")
+        if not os.path.exists(path):
+            tmp = path + '.tmp'
+            with open(tmp, 'wb') as f:
+                f.write(data)
+            os.replace(tmp, path)
+        return path, key
+
+    def cleanup(self):
+        shutil.rmtree(self.path, ignore_errors=True)
+
+    def __del__(self):
+        self.cleanup()
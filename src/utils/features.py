@@ -0,0 +1,263 @@
+import importlib
+import importlib.util
+import json
+import subprocess
+import sys
+import time
+from types import SimpleNamespace
+
+# Dashboard subsystems: label, then exported name -> "module:attribute". Availability is
+# decided by locating the top-level packages of those modules, without importing them.
+DASHBOARD_FEATURES = {
+    'pyvis': ('PyVis', {'Network': 'pyvis.network:Network'}),
+    'bond_analytics': ('Bond Analytics', {
+        'calculate_duration': 'bond_analytics:calculate_duration',
+        'calculate_convexity': 'bond_analytics:calculate_convexity',
+    }),
+    'rag_ai': ('RAG AI', {'retrieve_insights': 'rag_ai:retrieve_insights'}),
+    'n8n_automation': ('N8N Automation', {'fetch_bond_data': 'n8n_automation:fetch_bond_data'}),
+    'knowledge_graph': ('Knowledge Graph', {
+        'build_relationships': 'knowledge_graph:build_relationships',
+        'visualize_knowledge_graph': 'knowledge_graph:visualize_knowledge_graph',
+        'KnowledgeGraphStore': 'knowledge_graph.store:KnowledgeGraphStore',
+        'lod_graph': 'knowledge_graph.layout:lod_graph',
+        'render_html': 'knowledge_graph.layout:render_html',
+        'LayoutCache': 'knowledge_graph.layout:LayoutCache',
+    }),
+    'event_correlation': ('Event Correlation', {
+        'EventCorrelationEngine': 'knowledge_graph.event_correlation:EventCorrelationEngine',
+    }),
+    'portfolio': ('Portfolio', {'Portfolio': 'bond_analytics.portfolio:Portfolio'}),
+    'alerts': ('Smart Alerts', {'SmartAlert': 'bond_analytics.alerts:SmartAlert'}),
+    'liquidity': ('Liquidity', {'calculate_liquidity_metrics': 'bond_analytics.liquidity:calculate_liquidity_metrics'}),
+    'macro_api': ('Macro API', {
+        'MacroAPI': 'bond_analytics.macro_api:MacroAPI',
+        'DEFAULT_TTL': 'bond_analytics.macro_api:DEFAULT_TTL',
+    }),
+    'scenarios': ('Scenarios', {
+        'apply_scenario': 'bond_analytics.scenarios:apply_scenario',
+        'list_scenarios': 'bond_analytics.scenarios:list_scenarios',
+        'run_scenarios': 'bond_analytics.scenarios:run_scenarios',
+        'scenario_summary': 'bond_analytics.scenarios:scenario_summary',
+    }),
+}
+
+# Third-party packages each subsystem imports at module level, beyond its own package.
+FEATURE_REQUIREMENTS = {
+    'knowledge_graph': ('networkx',),
+    'event_correlation': ('networkx',),
+    'alerts': ('requests',),
+    'macro_api': ('requests',),
+}
+
+
+def module_available(name):
+    """
+    Whether a top-level module can be imported, checked with find_spec (nothing is executed).
+    """
+    try:
+        return importlib.util.find_spec(name.split('.')[0]) is not None
+    except (ImportError, ValueError):
+        return False
+
+
+class _LazyAttr:
+    """
+    Stand-in for a feature export that imports the feature on first call or attribute access.
+    """
+
+    def __init__(self, registry, feature, attr):
+        self._registry = registry
+        self._feature = feature
+        self._attr = attr
+
+    def _target(self):
+        return getattr(self._registry.load(self._feature), self._attr)
+
+    def __call__(self, *args, **kwargs):
+        return self._target()(*args, **kwargs)
+
+    def __getattr__(self, name):
+        return getattr(self._target(), name)
+
+    def __repr__(self):
+        return f"<lazy {self._feature}.{self._attr}>"
+
+
+class _LazyFlag:
+    """
+    Stand-in for an `*_AVAILABLE` flag: its truth value imports the features on first test
+    and is False if any of them fails to import, so a panel gated on it is hidden as before.
+    """
+
+    def __init__(self, registry, names):
+        self._registry = registry
+        self._names = names
+
+    def __bool__(self):
+        return self._registry.ready(*self._names)
+
+    def __repr__(self):
+        return f"<flag {', '.join(self._names)}>"
+
+
+class FeatureRegistry:
+    """
+    Optional subsystems checked with find_spec at startup and imported only when first used.
+    `available(name)` says whether a feature is installed without paying for the import;
+    `load(name)` imports the exports once and times it; `lazy(name, attr)` returns a
+    callable proxy that does so on first use; `flag(*names)` is a drop-in for the old
+    `*_AVAILABLE` flags that is true only once the features have actually imported. A
+    feature whose import fails is marked unavailable and its error kept for the report.
+    """
+
+    def __init__(self, features=None, requirements=None):
+        self.started = time.perf_counter()
+        self.features = {}
+        self._loaded = {}
+        self._errors = {}
+        self._load_seconds = {}
+        self._spec_cache = {}
+        requirements = FEATURE_REQUIREMENTS if requirements is None else requirements
+        for name, (label, exports) in (DASHBOARD_FEATURES if features is None else features).items():
+            self.register(name, exports, label=label, requires=requirements.get(name, ()))
+
+    def register(self, name, exports, label=None, requires=()):
+        """
+        Register a feature exporting {name: "module:attribute"}; `requires` lists further
+        top-level modules that must be installed.
+        """
+        modules = [target.split(':')[0] for target in exports.values()]
+        self.features[name] = {
+            'label': label or name,
+            'exports': dict(exports),
+            'requires': tuple(dict.fromkeys([m.split('.')[0] for m in modules] + list(requires))),
+        }
+
+    def _find(self, module):
+        if module not in self._spec_cache:
+            self._spec_cache[module] = module_available(module)
+        return self._spec_cache[module]
+
+    def missing_modules(self, name):
+        return [m for m in self.features[name]['requires'] if not self._find(m)]
+
+    def available(self, *names):
+        """
+        Whether all the named features can be loaded, as far as is known without importing.
+        """
+        for name in names:
+            if name not in self.features:
+                raise ValueError(f"Unknown feature: {name}")
+        return all(name not in self._errors and not self.missing_modules(name) for name in names)
+
+    def load(self, name):
+        """
+        Import a feature's exports (once) and return them as a namespace. Raises ImportError
+        if the feature is unavailable.
+        """
+        if name in self._loaded:
+            return self._loaded[name]
+        if not self.available(name):
+            raise ImportError(self.errors().get(name, f"{name} is not available"))
+        start = time.perf_counter()
+        try:
+            exports = {}
+            for attr, target in self.features[name]['exports'].items():
+                module, _, member = target.partition(':')
+                exports[attr] = getattr(importlib.import_module(module), member)
+        except ImportError as e:
+            self._errors[name] = str(e)
+            raise
+        finally:
+            self._load_seconds[name] = time.perf_counter() - start
+        self._loaded[name] = SimpleNamespace(**exports)
+        return self._loaded[name]
+
+    def ready(self, *names):
+        """
+        Import the named features (once) and return whether all of them imported.
+        """
+        try:
+            for name in names:
+                self.load(name)
+        except ImportError:
+            return False
+        return True
+
+    def flag(self, *names):
+        for name in names:
+            if name not in self.features:
+                raise ValueError(f"Unknown feature: {name}")
+        return _LazyFlag(self, names)
+
+    def lazy(self, name, attr):
+        if attr not in self.features[name]['exports']:
+            raise ValueError(f"Feature {name} does not export {attr}")
+        return _LazyAttr(self, name, attr)
+
+    def errors(self):
+        """
+        Feature name -> reason it is unavailable: a failed import or missing modules.
+        """
+        errors = dict(self._errors)
+        for name in self.features:
+            missing = self.missing_modules(name)
+            if name not in errors and missing:
+                errors[name] = f"No module named {', '.join(repr(m) for m in missing)}"
+        return errors
+
+    def import_errors(self):
+        """
+        "Label: reason" lines for the dashboard's import warning.
+        """
+        return [f"{self.features[name]['label']}: {reason}" for name, reason in self.errors().items()]
+
+    def report(self):
+        """
+        Startup report: seconds since the registry was created, modules imported so far, and
+        per feature whether it is available, loaded, and how long its import took.
+        """
+        errors = self.errors()
+        return {
+            'seconds_since_start': round(time.perf_counter() - self.started, 4),
+            'modules_imported': len(sys.modules),
+            'features': {
+                name: {
+                    'available': name not in errors,
+                    'loaded': name in self._loaded,
+                    'load_seconds': round(self._load_seconds[name], 4) if name in self._load_seconds else None,
+                    'error': errors.get(name),
+                }
+                for name in self.features
+            },
+        }
+
+
+def measure_startup(module, path=(), budget=None, python=None):
+    """
+    Import `module` in a fresh interpreter and report its cold-start time and how many
+    modules it pulled in, plus the report of its `features` registry if it has one.
+    With a `budget` in seconds, the result's 'within_budget' says whether it was met.
+    """
+    script = (
+        "import json, sys, time\n"
+        "start = time.perf_counter()\n"
+        f"sys.path[:0] = {list(path)!r}\n"
+        "import importlib\n"
+        f"module = importlib.import_module({module!r})\n"
+        "seconds = time.perf_counter() - start\n"
+        "registry = getattr(module, 'features', None)\n"
+        "report = registry.report() if hasattr(registry, 'report') else None\n"
+        "print(json.dumps({'seconds': seconds, 'modules_imported': len(sys.modules), 'features': report}))\n"
+    )
+    result = subprocess.run([python or sys.executable, '-c', script], capture_output=True, text=True)
+    if result.returncode != 0:
+        lines = result.stderr.strip().splitlines()
+        raise ValueError(f"Importing {module} failed: {lines[-1] if lines else result.returncode}")
+    out = json.loads(result.stdout.strip().splitlines()[-1])
+    out['module'] = module
+    if budget is not None:
+        out['budget'] = budget
+        out['within_budget'] = out['seconds'] <= budget
+    return out
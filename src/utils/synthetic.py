@@ -0,0 +1,385 @@
+import argparse
+import os
+import sys
+import zlib
+
+import numpy as np
+import pandas as pd
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    PYARROW_AVAILABLE = True
+except ImportError:
+    PYARROW_AVAILABLE = False
+
+# Sector: (share of issuers, spread multiplier).
+SECTORS = {
+    'Finance': (0.22, 1.10), 'Industrials': (0.12, 1.00), 'Consumer': (0.11, 1.05),
+    'Technology': (0.10, 0.90), 'Utilities': (0.09, 0.85), 'Energy': (0.09, 1.25),
+    'Healthcare': (0.08, 0.90), 'Telecom': (0.06, 1.15), 'Materials': (0.05, 1.10),
+    'Automotive': (0.04, 1.20), 'Real Estate': (0.04, 1.30),
+}
+# Rating notches with their share of issuers (investment grade heavy, thin high-yield tail).
+RATINGS = ('AAA', 'AA+', 'AA', 'AA-', 'A+', 'A', 'A-', 'BBB+', 'BBB', 'BBB-',
+           'BB+', 'BB', 'BB-', 'B+', 'B', 'B-', 'CCC')
+RATING_WEIGHTS = (0.02, 0.02, 0.03, 0.04, 0.06, 0.08, 0.09, 0.11, 0.12, 0.11,
+                  0.06, 0.05, 0.05, 0.05, 0.04, 0.04, 0.03)
+# Original tenors (years) of new issues and how often each is issued.
+LADDER = (2, 3, 5, 7, 10, 15, 20, 30)
+LADDER_WEIGHTS = (0.10, 0.14, 0.24, 0.17, 0.20, 0.04, 0.05, 0.06)
+
+_NAME_ROOTS = ('Acme', 'Apex', 'Summit', 'Harbor', 'Northwind', 'Granite', 'Meridian', 'Atlas', 'Cobalt',
+               'Evergreen', 'Pioneer', 'Sterling', 'Vertex', 'Horizon', 'Keystone', 'Lighthouse', 'Orion',
+               'Redwood', 'Silverline', 'Trident', 'Unity', 'Beacon', 'Crescent', 'Falcon', 'Juniper')
+_NAME_SUFFIXES = ('Corp', 'Inc', 'Holdings', 'Group', 'plc', 'AG', 'SA', 'Ltd')
+
+# Bonds are generated in fixed blocks with their own random streams, so the data for a
+# seed does not depend on the chunk size it is written in.
+BLOCK_BONDS = 65_536
+HISTORY_BLOCK_BONDS = 256
+TRADE_BLOCK_BONDS = 4_096
+DAYS_PER_YEAR = 252
+DATASET_KINDS = ('portfolio', 'history', 'trades')
+
+
+def _price(coupon, yld, years, frequency=2):
+    # Clean price per 100 face of a bullet bond (coupon and yield in decimals).
+    periods = np.maximum(np.ceil(years * frequency), 1)
+    c, y = coupon / frequency, yld / frequency
+    discount = (1 + y) ** -periods
+    return 100 * (c * (1 - discount) / y + discount)
+
+
+def _risk(coupon, yld, years, frequency=2, bump=1e-4):
+    """
+    Clean price, modified duration and convexity of bullet bonds by central differences.
+    """
+    price = _price(coupon, yld, years, frequency)
+    up, down = _price(coupon, yld + bump, years, frequency), _price(coupon, yld - bump, years, frequency)
+    duration = (down - up) / (2 * bump * price)
+    convexity = (up + down - 2 * price) / (bump ** 2 * price)
+    return price, duration, convexity
+
+
+def _rechunk(frames, rows):
+    # Regroup a stream of frames into frames of `rows` rows (the last may be shorter).
+    pending, size = [], 0
+    for frame in frames:
+        while len(frame):
+            take = frame.iloc[:rows - size]
+            frame = frame.iloc[len(take):]
+            pending.append(take)
+            size += len(take)
+            if size == rows:
+                yield pd.concat(pending, ignore_index=True)
+                pending, size = [], 0
+    if pending:
+        yield pd.concat(pending, ignore_index=True)
+
+
+class SyntheticMarket:
+    """
+    Seeded synthetic credit market: an issuer universe with Zipf-like issuer sizes
+    (`concentration` is the exponent), sector and rating per issuer, a maturity ladder of
+    bonds per issuer, `history_years` of daily yield/spread history driven by shared rate,
+    credit and sector factors plus idiosyncratic noise (ending at each bond's current
+    level on `as_of`), and trade tapes over the last `trade_days` business days.
+    Everything is generated block by block from (seed, stream, block) random streams, so
+    books of any size are produced in bounded memory and reproducibly.
+    """
+
+    def __init__(self, n_bonds, seed=0, as_of='2024-12-31', n_issuers=None, concentration=0.8,
+                 history_years=3, trade_days=20):
+        if n_bonds < 1:
+            raise ValueError("n_bonds must be at least 1")
+        self.n_bonds = int(n_bonds)
+        self.seed = int(seed)
+        self.as_of = pd.Timestamp(as_of).normalize()
+        self.n_issuers = int(n_issuers or max(1, self.n_bonds // 8))
+        self.history_years = history_years
+        self.trade_days = trade_days
+
+        rng = self._rng('issuers')
+        ranks = np.arange(1, self.n_issuers + 1, dtype=np.float64)
+        weights = rng.permutation(ranks ** -concentration)
+        self._issuer_cdf = np.cumsum(weights) / weights.sum()
+        sector_share = np.array([w for w, _ in SECTORS.values()])
+        self.sectors = np.array(list(SECTORS), dtype=object)
+        self._sector_multiplier = np.array([m for _, m in SECTORS.values()])
+        self.issuer_sector = rng.choice(len(SECTORS), self.n_issuers, p=sector_share / sector_share.sum())
+        rating_weights = np.asarray(RATING_WEIGHTS) / np.sum(RATING_WEIGHTS)
+        self.issuer_rating = rng.choice(len(RATINGS), self.n_issuers, p=rating_weights)
+        self.issuer_premium = rng.lognormal(0.0, 0.25, self.n_issuers)
+
+    def _rng(self, stream, *block):
+        return np.random.default_rng([self.seed, zlib.crc32(stream.encode()), *block])
+
+    def issuer_name(self, codes):
+        roots, suffixes = len(_NAME_ROOTS), len(_NAME_SUFFIXES)
+        return [f"{_NAME_ROOTS[c % roots]} {c // roots} {_NAME_SUFFIXES[c % suffixes]}" if c >= roots
+                else f"{_NAME_ROOTS[c]} {_NAME_SUFFIXES[c % suffixes]}" for c in codes]
+
+    def _curve(self, years):
+        # Upward-sloping government curve in percent.
+        return 3.0 + 1.4 * (1 - np.exp(-years / 6.0))
+
+    def _block(self, block):
+        start = block * BLOCK_BONDS
+        n = min(BLOCK_BONDS, self.n_bonds - start)
+        rng = self._rng('portfolio', block)
+        issuer = np.minimum(np.searchsorted(self._issuer_cdf, rng.random(n)), self.n_issuers - 1)
+        sector, notch = self.issuer_sector[issuer], self.issuer_rating[issuer]
+
+        tenor = np.asarray(LADDER, dtype=np.float64)[rng.choice(len(LADDER), n, p=np.asarray(LADDER_WEIGHTS) / sum(LADDER_WEIGHTS))]
+        age = rng.uniform(0.0, 0.97, n) * tenor
+        remaining = tenor - age
+        issue_date = self.as_of - pd.to_timedelta(np.round(age * 365.25), unit='D')
+        maturity_date = issue_date + pd.to_timedelta(np.round(tenor * 365.25), unit='D')
+
+        spread = (35.0 * np.exp(0.2 * notch) * self._sector_multiplier[sector] * self.issuer_premium[issuer]
+                  * rng.lognormal(0.0, 0.1, n) * (1 + 0.02 * remaining))
+        yld = self._curve(remaining) + spread / 100
+        coupon = np.maximum(np.round((yld + rng.normal(0.0, 0.6, n)) * 8) / 8, 0.125)
+        price, duration, convexity = _risk(coupon / 100, yld / 100, remaining)
+        face = np.round(rng.lognormal(np.log(2e6), 0.8, n), -3)
+        market_value = face * price / 100
+        # 1-day 99% VaR of a 7bp rate move plus a rating-scaled spread move, and normal ES.
+        daily_vol = np.hypot(0.0007, 0.0004 * (1 + 0.15 * notch))
+        var = 2.326 * market_value * duration * daily_vol
+        liquidity = np.sqrt(face / 2e6) * np.exp(-0.08 * notch)
+        return pd.DataFrame({
+            'bond': [f"CP{i:08d}" for i in range(start, start + n)],
+            'sector': self.sectors[sector],
+            'duration': duration,
+            'convexity': convexity,
+            'var': var,
+            'expectedshortfall': var * 2.665 / 2.326,
+            'issuer': self.issuer_name(issuer),
+            'rating': np.asarray(RATINGS, dtype=object)[notch],
+            'yield': yld,
+            'spread': spread,
+            'maturity_date': maturity_date.normalize(),
+            'face_value': face,
+            'market_value': market_value,
+            'coupon_rate': coupon,
+            'issue_date': issue_date.normalize(),
+            'bid_ask_spread': np.round(0.05 + 0.4 / (1 + 5 * liquidity) + 0.01 * notch, 3),
+            'trading_volume': np.round(face * rng.gamma(1.5, 0.02, n) * liquidity, -3),
+        })
+
+    def portfolio_chunks(self, chunk_rows=BLOCK_BONDS):
+        """
+        Generator of book DataFrames of `chunk_rows` bonds with Portfolio's columns
+        (REQUIRED_COLUMNS plus issuer, rating, yield, spread in bps, dates, face and market
+        value, coupon, bid/ask and volume).
+        """
+        blocks = (self._block(b) for b in range(-(-self.n_bonds // BLOCK_BONDS)))
+        return _rechunk(blocks, chunk_rows)
+
+    def portfolio(self):
+        return pd.concat(self.portfolio_chunks(), ignore_index=True)
+
+    def history_dates(self):
+        return pd.bdate_range(end=self.as_of, periods=max(2, int(round(self.history_years * DAYS_PER_YEAR))))
+
+    def _factors(self, n_days):
+        # Rate level (percent, mean-reverting) and log-spread credit factors, common and per sector.
+        rng = self._rng('factors')
+        rate = np.zeros(n_days)
+        shocks = rng.normal(0.0, 0.06, n_days)
+        for t in range(1, n_days):
+            rate[t] = 0.998 * rate[t - 1] + shocks[t]
+        common = np.cumsum(rng.normal(0.0, 0.010, n_days))
+        sector = np.cumsum(rng.normal(0.0, 0.006, (n_days, len(SECTORS))), axis=0) + common[:, None]
+        return rate - rate[-1], sector - sector[-1]
+
+    def history_chunks(self, chunk_rows=1_000_000):
+        """
+        Generator of long DataFrames (date, bond, yield, spread) with one row per bond and
+        business day, in bond then date order, `chunk_rows` rows at a time. Bonds move with
+        the shared factors scaled by a rating beta, plus AR(1) idiosyncratic noise.
+        """
+        dates = self.history_dates()
+        n_days = len(dates)
+        rate, sector_factor = self._factors(n_days)
+        sector_index = {s: i for i, s in enumerate(self.sectors)}
+
+        def frames():
+            for b in range(-(-self.n_bonds // BLOCK_BONDS)):
+                book = self._block(b)
+                for sub in range(0, len(book), HISTORY_BLOCK_BONDS):
+                    part = book.iloc[sub:sub + HISTORY_BLOCK_BONDS]
+                    n = len(part)
+                    rng = self._rng('history', b, sub)
+                    notch = pd.Index(RATINGS).get_indexer(part['rating'])
+                    beta = 0.6 + 0.08 * notch
+                    codes = part['sector'].map(sector_index).to_numpy()
+                    noise = np.empty((n, n_days))
+                    noise[:, 0] = rng.normal(0.0, 0.05, n)
+                    shocks = rng.normal(0.0, 0.012, (n, n_days))
+                    for t in range(1, n_days):
+                        noise[:, t] = 0.97 * noise[:, t - 1] + shocks[:, t]
+                    log_move = beta[:, None] * sector_factor[:, codes].T + noise - noise[:, -1:]
+                    spread = part['spread'].to_numpy()[:, None] * np.exp(log_move)
+                    yld = (part['yield'].to_numpy()[:, None] + rate[None, :]
+                           + (spread - part['spread'].to_numpy()[:, None]) / 100)
+                    yield pd.DataFrame({
+                        'date': np.tile(dates.to_numpy(), n),
+                        'bond': np.repeat(part['bond'].to_numpy(), n_days),
+                        'yield': yld.ravel(),
+                        'spread': spread.ravel(),
+                    })
+        return _rechunk(frames(), chunk_rows)
+
+    def trade_chunks(self, chunk_rows=1_000_000):
+        """
+        Generator of trade tapes (bond, time, price, quantity, side) over the last
+        `trade_days` business days, grouped by bond and in time order within each bond, as
+        LiquidityEngine.add_trades expects. Larger, higher-rated issues trade more often.
+        """
+        days = pd.bdate_range(end=self.as_of, periods=self.trade_days).to_numpy()
+
+        def frames():
+            for b in range(-(-self.n_bonds // BLOCK_BONDS)):
+                book = self._block(b)
+                for sub in range(0, len(book), TRADE_BLOCK_BONDS):
+                    part = book.iloc[sub:sub + TRADE_BLOCK_BONDS]
+                    rng = self._rng('trades', b, sub)
+                    notch = pd.Index(RATINGS).get_indexer(part['rating'])
+                    intensity = 0.05 + 1.5 * np.sqrt(part['face_value'].to_numpy() / 2e6) * np.exp(-0.1 * notch)
+                    counts = rng.poisson(intensity * len(days))
+                    bond = np.repeat(np.arange(len(part)), counts)
+                    total = len(bond)
+                    seconds = rng.integers(9 * 3600, 17 * 3600, total)
+                    time = days[rng.integers(0, len(days), total)] + seconds.astype('timedelta64[s]')
+                    order = np.lexsort((time, bond))
+                    bond, time = bond[order], time[order]
+                    years = ((part['maturity_date'] - self.as_of).dt.days / 365.25).to_numpy()
+                    clean = _price(part['coupon_rate'].to_numpy() / 100, part['yield'].to_numpy() / 100, years)
+                    side = rng.choice(np.array([1.0, -1.0]), total)
+                    half_spread = part['bid_ask_spread'].to_numpy()[bond] / 2
+                    price = clean[bond] + side * half_spread + rng.normal(0.0, 0.15, total)
+                    quantity = np.minimum(np.round(rng.lognormal(np.log(2.5e5), 1.0, total), -3),
+                                          part['face_value'].to_numpy()[bond])
+                    yield pd.DataFrame({
+                        'bond': part['bond'].to_numpy()[bond],
+                        'time': time,
+                        'price': np.round(price, 4),
+                        'quantity': np.maximum(quantity, 1000.0),
+                        'side': np.where(side > 0, 'buy', 'sell'),
+                    })
+        return _rechunk(frames(), chunk_rows)
+
+    def chunks(self, kind, chunk_rows=None):
+        if kind not in DATASET_KINDS:
+            raise ValueError(f"Unsupported dataset: {kind}. Use one of {', '.join(DATASET_KINDS)}")
+        method = {'portfolio': self.portfolio_chunks, 'history': self.history_chunks, 'trades': self.trade_chunks}[kind]
+        return method(chunk_rows) if chunk_rows else method()
+
+
+def write_chunks(chunks, path, fmt=None):
+    """
+    Stream DataFrame chunks to one Parquet (row group per chunk) or CSV file through a
+    temporary file; `fmt` defaults from the extension. Returns the number of rows written.
+    """
+    fmt = fmt or ('parquet' if os.path.splitext(str(path))[1].lower() in ('.parquet', '.pq') else 'csv')
+    if fmt not in ('parquet', 'csv'):
+        raise ValueError(f"Unsupported output format: {fmt}. Use parquet or csv")
+    if fmt == 'parquet' and not PYARROW_AVAILABLE:
+        raise ValueError("Parquet output requires pyarrow")
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    tmp = f"{path}.tmp"
+    rows = 0
+    writer = None
+    try:
+        for chunk in chunks:
+            if fmt == 'parquet':
+                table = pa.Table.from_pandas(chunk, preserve_index=False)
+                if writer is None:
+                    writer = pq.ParquetWriter(tmp, table.schema)
+                writer.write_table(table.cast(writer.schema))
+            else:
+                chunk.to_csv(tmp, mode='a' if rows else 'w', header=not rows, index=False)
+            rows += len(chunk)
+        if writer is not None:
+            writer.close()
+        if not rows:
+            raise ValueError("No rows to write")
+        os.replace(tmp, path)
+    except BaseException:
+        if writer is not None:
+            writer.close()
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        raise
+    return rows
+
+
+def generate_portfolio(n_bonds, seed=0, **kwargs):
+    """
+    A synthetic book of `n_bonds` as one DataFrame (see SyntheticMarket for the options).
+    """
+    return SyntheticMarket(n_bonds, seed=seed, **kwargs).portfolio()
+
+
+def write_dataset(path, n_bonds, kind='portfolio', fmt=None, seed=0, chunk_rows=None, **kwargs):
+    """
+    Stream a synthetic portfolio, history or trade tape for `n_bonds` to `path` in chunks.
+    Returns the number of rows written.
+    """
+    market = SyntheticMarket(n_bonds, seed=seed, **kwargs)
+    return write_chunks(market.chunks(kind, chunk_rows), path, fmt)
+
+
+def synthetic_bond(bond_id, history_days=30):
+    """
+    One synthetic bond as a bond_data dict (as fetch_bond_data returns), seeded by its id so
+    the same ticker always gets the same data: annual cash flows to maturity (capped at 30)
+    and the last `history_days` daily spreads.
+    """
+    market = SyntheticMarket(1, seed=zlib.crc32(str(bond_id).encode()), n_issuers=1,
+                             history_years=max(history_days, 2) / DAYS_PER_YEAR)
+    row = market.portfolio().iloc[0]
+    history = next(market.history_chunks())['spread'].to_numpy()[-history_days:]
+    years = max(1, min(30, int(round((row['maturity_date'] - market.as_of).days / 365.25))))
+    coupon = float(row['coupon_rate'])
+    return {
+        "bond_id": bond_id,
+        "issuer": row['issuer'],
+        "sector": row['sector'],
+        "rating": row['rating'],
+        "yield": round(float(row['yield']), 3),
+        "spread": round(float(row['spread']), 1),
+        "cash_flows": [coupon] * (years - 1) + [100 + coupon],
+        "spread_history": [round(float(s), 2) for s in history],
+        "latest_spread": round(float(history[-1]), 2),
+    }
+
+
+def main(argv=None):
+    """
+    Command-line entry point: write a synthetic dataset.
+    """
+    parser = argparse.ArgumentParser(description="Write a synthetic CreditPulse dataset.")
+    parser.add_argument('kind', choices=DATASET_KINDS)
+    parser.add_argument('path', help="output file (.parquet or .csv)")
+    parser.add_argument('-n', '--bonds', type=int, required=True, help="number of bonds")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--as-of', default='2024-12-31')
+    parser.add_argument('--years', type=float, default=3, help="history length in years")
+    parser.add_argument('--trade-days', type=int, default=20)
+    parser.add_argument('--chunk-rows', type=int, default=None, help="rows per written chunk")
+    args = parser.parse_args(argv)
+    try:
+        rows = write_dataset(args.path, args.bonds, kind=args.kind, seed=args.seed, chunk_rows=args.chunk_rows,
+                             as_of=args.as_of, history_years=args.years, trade_days=args.trade_days)
+    except ValueError as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 2
+    print(f"Wrote {rows:,} {args.kind} rows to {args.path}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,93 +1,92 @@
 import streamlit as st
-import pandas as pd
 import numpy as np
 import os
 import sys
-import networkx as nx
 import streamlit.components.v1 as components
 
 # Add the src directory to the Python path
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'src'))
 
-# Import modules with error handling
-import_errors = []
-
-try:
-    from pyvis.network import Network
-    PYVIS_AVAILABLE = True
-except ImportError as e:
-    PYVIS_AVAILABLE = False
-    import_errors.append(f"PyVis: {str(e)}")
-
-try:
-    from bond_analytics import calculate_duration, calculate_convexity
-    BOND_ANALYTICS_AVAILABLE = True
-except ImportError as e:
-    BOND_ANALYTICS_AVAILABLE = False
-    import_errors.append(f"Bond Analytics: {str(e)}")
-
-try:
-    from rag_ai import retrieve_insights
-    RAG_AI_AVAILABLE = True
-except ImportError as e:
-    RAG_AI_AVAILABLE = False
-    import_errors.append(f"RAG AI: {str(e)}")
-
-try:
-    from n8n_automation import fetch_bond_data
-    N8N_AVAILABLE = True
-except ImportError as e:
-    N8N_AVAILABLE = False
-    import_errors.append(f"N8N Automation: {str(e)}")
-
-try:
-    from knowledge_graph import build_relationships, visualize_knowledge_graph
-    KNOWLEDGE_GRAPH_AVAILABLE = True
-except ImportError as e:
-    KNOWLEDGE_GRAPH_AVAILABLE = False
-    import_errors.append(f"Knowledge Graph: {str(e)}")
-
-try:
-    from bond_analytics.portfolio import Portfolio
-    PORTFOLIO_AVAILABLE = True
-except ImportError as e:
-    PORTFOLIO_AVAILABLE = False
-    import_errors.append(f"Portfolio: {str(e)}")
-
-try:
-    from bond_analytics.alerts import SmartAlert
-    ALERTS_AVAILABLE = True
-except ImportError as e:
-    ALERTS_AVAILABLE = False
-    import_errors.append(f"Smart Alerts: {str(e)}")
-
-try:
-    from knowledge_graph.event_correlation import EventCorrelationEngine
-    EVENT_CORRELATION_AVAILABLE = True
-except ImportError as e:
-    EVENT_CORRELATION_AVAILABLE = False
-    import_errors.append(f"Event Correlation: {str(e)}")
-
-try:
-    from bond_analytics.liquidity import calculate_liquidity_metrics
-    LIQUIDITY_AVAILABLE = True
-except ImportError as e:
-    LIQUIDITY_AVAILABLE = False
-    import_errors.append(f"Liquidity: {str(e)}")
-
-try:
-    from bond_analytics.macro_api import MacroAPI
-    MACRO_API_AVAILABLE = True
-except ImportError as e:
-    MACRO_API_AVAILABLE = False
-    import_errors.append(f"Macro API: {str(e)}")
-
-try:
-    from bond_analytics.scenarios import apply_scenario, PREBUILT_SCENARIOS
-    SCENARIOS_AVAILABLE = True
-except ImportError as e:
-    SCENARIOS_AVAILABLE = False
-    import_errors.append(f"Scenarios: {str(e)}")
+from utils.cache import ResultCache, SessionWorkspace, content_hash
+from utils.features import FeatureRegistry
+
+@st.cache_resource
+def get_features():
+    """
+    Feature registry shared across reruns, so each subsystem is imported (and timed) once.
+    """
+    return FeatureRegistry()
+
+# Subsystems are located with find_spec here and imported when their panel first renders;
+# a flag is false when its subsystem is missing or fails to import, which hides the panel.
+features = get_features()
+
+PYVIS_AVAILABLE = features.flag('pyvis')
+BOND_ANALYTICS_AVAILABLE = features.flag('bond_analytics')
+RAG_AI_AVAILABLE = features.flag('rag_ai')
+N8N_AVAILABLE = features.flag('n8n_automation')
+KNOWLEDGE_GRAPH_AVAILABLE = features.flag('knowledge_graph')
+PORTFOLIO_AVAILABLE = features.flag('portfolio')
+ALERTS_AVAILABLE = features.flag('alerts')
+EVENT_CORRELATION_AVAILABLE = features.flag('event_correlation')
+LIQUIDITY_AVAILABLE = features.flag('liquidity')
+MACRO_API_AVAILABLE = features.flag('macro_api')
+SCENARIOS_AVAILABLE = features.flag('scenarios')
+
+calculate_duration = features.lazy('bond_analytics', 'calculate_duration')
+calculate_convexity = features.lazy('bond_analytics', 'calculate_convexity')
+retrieve_insights = features.lazy('rag_ai', 'retrieve_insights')
+fetch_bond_data = features.lazy('n8n_automation', 'fetch_bond_data')
+build_relationships = features.lazy('knowledge_graph', 'build_relationships')
+visualize_knowledge_graph = features.lazy('knowledge_graph', 'visualize_knowledge_graph')
+KnowledgeGraphStore = features.lazy('knowledge_graph', 'KnowledgeGraphStore')
+lod_graph = features.lazy('knowledge_graph', 'lod_graph')
+render_html = features.lazy('knowledge_graph', 'render_html')
+LayoutCache = features.lazy('knowledge_graph', 'LayoutCache')
+Portfolio = features.lazy('portfolio', 'Portfolio')
+SmartAlert = features.lazy('alerts', 'SmartAlert')
+EventCorrelationEngine = features.lazy('event_correlation', 'EventCorrelationEngine')
+calculate_liquidity_metrics = features.lazy('liquidity', 'calculate_liquidity_metrics')
+MacroAPI = features.lazy('macro_api', 'MacroAPI')
+apply_scenario = features.lazy('scenarios', 'apply_scenario')
+list_scenarios = features.lazy('scenarios', 'list_scenarios')
+run_scenarios = features.lazy('scenarios', 'run_scenarios')
+scenario_summary = features.lazy('scenarios', 'scenario_summary')
+
+import_errors = features.import_errors()
+
+@st.cache_resource
+def get_result_cache():
+    """
+    Results shared by all sessions of this server process, keyed by upload content hash
+    and parameters, so reruns and other users with the same file reuse them.
+    """
+    return ResultCache()
+
+def get_workspace():
+    """
+    Scratch directory private to this browser session, removed when the session ends.
+    """
+    if 'workspace' not in st.session_state:
+        st.session_state['workspace'] = SessionWorkspace()
+    return st.session_state['workspace']
+
+def get_layout_cache():
+    """
+    Graph layouts and rendered HTML for this browser session only, so incremental layout
+    starts from this session's last graph and no session is served another's HTML.
+    """
+    if 'layout_cache' not in st.session_state:
+        st.session_state['layout_cache'] = LayoutCache()
+    return st.session_state['layout_cache']
+
+@st.cache_resource
+def get_graph_store():
+    """
+    One knowledge graph store per server process, persisted under the CreditPulse cache.
+    """
+    from bond_analytics.loader import cache_dir
+    return KnowledgeGraphStore(os.path.join(cache_dir(), 'knowledge_graph'))
 
 def main():
     st.set_page_config(
@@ -168,8 +167,8 @@ def main():
                 if KNOWLEDGE_GRAPH_AVAILABLE:
                     st.subheader("Knowledge Graph Relationships")
                     st.markdown("Visualizes how the bond's issuer, sector, and rating are interconnected. Useful for contagion analysis.")
-                    relationships = build_relationships(bond_data)
-                    visualize_knowledge_graph(relationships)
+                    relationships = build_relationships(bond_data, store=get_graph_store())
+                    visualize_knowledge_graph(relationships, cache=get_layout_cache())
                 else:
                     st.warning("Knowledge graph module not available")
 
@@ -205,21 +204,34 @@ def main():
 
     uploaded_file = st.file_uploader("Upload your bond portfolio (CSV or Excel)", type=["csv", "xlsx"])
 
+    engine = None
     if uploaded_file and PORTFOLIO_AVAILABLE:
         try:
-            with open("temp_uploaded_file", "wb") as f:
-                f.write(uploaded_file.getbuffer())
-            portfolio = Portfolio("temp_uploaded_file")
+            # Everything derived from the upload is cached under its content hash, so widget
+            # interactions rerun the script without re-parsing or recomputing.
+            cache = get_result_cache()
+            path, upload_key = get_workspace().save_upload(uploaded_file.getbuffer(), uploaded_file.name)
+            portfolio = cache.get_or_compute(('portfolio', upload_key), lambda: Portfolio(path))
+            # One engine per upload, shared by the event simulation and the graph view below.
+            if EVENT_CORRELATION_AVAILABLE:
+                engine = cache.get_or_compute(('engine', upload_key), lambda: EventCorrelationEngine(portfolio.df))
+            if KNOWLEDGE_GRAPH_AVAILABLE:
+                cache.get_or_compute(('graph_store', upload_key),
+                                     lambda: get_graph_store().upsert_frame(portfolio.df) or True, size=0)
             st.subheader("Aggregate Metrics")
-            st.write(portfolio.aggregate_metrics())
+            st.write(cache.get_or_compute(('aggregate_metrics', upload_key), portfolio.aggregate_metrics))
+            st.subheader("Simulated VaR / Expected Shortfall (1-day, diversified)")
+            st.write(cache.get_or_compute(('simulated_var', upload_key, 20_000),
+                                          lambda: portfolio.simulated_var(n_paths=20_000, n_workers=1)))
             st.subheader("Sector Exposure")
-            st.write(portfolio.sector_exposure())
+            st.write(cache.get_or_compute(('sector_exposure', upload_key), portfolio.sector_exposure))
             st.subheader("Concentration Risk")
-            st.write(portfolio.concentration_risk())
+            st.write(cache.get_or_compute(('concentration_risk', upload_key), portfolio.concentration_risk))
             
             if LIQUIDITY_AVAILABLE:
                 st.subheader("Liquidity Risk Indicators")
-                liquidity_metrics = calculate_liquidity_metrics(portfolio.df)
+                liquidity_metrics = cache.get_or_compute(('liquidity', upload_key),
+                                                         lambda: calculate_liquidity_metrics(portfolio.df))
                 st.dataframe(liquidity_metrics)
 
             # Event Correlation Engine
@@ -228,23 +240,28 @@ def main():
                 st.subheader("Event Correlation Engine")
                 sector_event = st.selectbox("Select sector event to simulate", df['sector'].unique())
                 if sector_event:
-                    engine = EventCorrelationEngine(df)
-                    affected_bonds = engine.propagate_event(sector_event)
+                    affected_bonds = cache.get_or_compute(('propagate_event', upload_key, sector_event),
+                                                          lambda: engine.propagate_event(sector_event))
                     st.write(f"Bonds potentially affected by a shock in {sector_event} sector:")
                     st.write(affected_bonds)
 
-                    # Draw networkx graph
+                    # Sector view, with the shocked sector expanded into its issuers
                     if PYVIS_AVAILABLE:
-                        draw_networkx_graph(engine.graph)
+                        draw_networkx_graph(cache.get_or_compute(('event_graph', upload_key, sector_event),
+                                                                 lambda: lod_graph(df, expanded=[sector_event])))
 
             # Scenario Analysis
             if SCENARIOS_AVAILABLE:
                 st.subheader("Scenario Library")
-                scenario = st.selectbox("Select Scenario", list(PREBUILT_SCENARIOS.keys()))
+                scenario = st.selectbox("Select Scenario", list(list_scenarios().keys()))
                 if uploaded_file and scenario:
-                    stressed_df = apply_scenario(portfolio.df, scenario)
+                    stressed_df = cache.get_or_compute(('scenario', upload_key, scenario),
+                                                       lambda: apply_scenario(portfolio.df, scenario))
                     st.write("Scenario Impact:")
                     st.dataframe(stressed_df)
+                    st.write("P&L across all scenarios (duration/convexity approximation):")
+                    st.dataframe(cache.get_or_compute(('scenario_summary', upload_key),
+                                                      lambda: scenario_summary(run_scenarios(portfolio.df))))
         except Exception as e:
             st.error(f"Portfolio upload failed: {e}")
     elif uploaded_file and not PORTFOLIO_AVAILABLE:
@@ -255,9 +272,12 @@ def main():
     fred_api_key = st.text_input("FRED API Key", type="password")
     fred_series = st.text_input("FRED Series ID (e.g., DGS10 for 10Y Treasury):", "DGS10")
     if fred_api_key and fred_series and MACRO_API_AVAILABLE:
-        macro = MacroAPI()
         try:
-            fred_df = macro.fetch_fred(fred_series, fred_api_key)
+            # MacroAPI keeps its own on-disk cache; this only saves re-reading it on every rerun.
+            # Keyed per API key, so a bad key surfaces its own error instead of cached data.
+            fred_df = get_result_cache().get_or_compute(('fred', fred_series, content_hash(fred_api_key)),
+                                                        lambda: MacroAPI().fetch_fred(fred_series, fred_api_key),
+                                                        ttl=features.load('macro_api').DEFAULT_TTL)
             st.line_chart(fred_df.set_index('date')['value'])
         except Exception as e:
             st.error(f"Error fetching FRED data: {e}")
@@ -265,31 +285,33 @@ def main():
         st.error("Macro API module not available")
 
     # Interactive Knowledge Graph
-    if uploaded_file and EVENT_CORRELATION_AVAILABLE and PYVIS_AVAILABLE:
+    if engine is not None and PYVIS_AVAILABLE:
         st.subheader("Interactive Knowledge Graph")
-        engine = EventCorrelationEngine(portfolio.df)
-        net = Network(height="500px", width="100%", notebook=False)
-        net.from_nx(engine.graph)
-        # Color-code contagion paths
-        for path in engine.contagion_paths('SomeSector', risk_level='high'):
-            net.add_edge(path['from'], path['to'], color=path['color'])
-        net.show("graph.html")
-        with open("graph.html", "r") as f:
-            html = f.read()
-        components.html(html, height=550)
+        # Sectors are collapsed into super-nodes; expanding one shows its issuers, expanding
+        # an issuer shows its bonds.
+        expanded = st.multiselect("Expand sectors / issuers", list(engine.sectors) + list(engine.issuers))
+        G = get_result_cache().get_or_compute(('lod_graph', upload_key, tuple(sorted(expanded))),
+                                              lambda: lod_graph(engine.frame, expanded=expanded))
+        draw_networkx_graph(G, edge_colors=contagion_colors(G, expanded))
+
+    # Which subsystems this process has imported so far, and what each import cost.
+    with st.sidebar.expander("Startup report"):
+        st.json(features.report())
 
 def perform_stress_testing(bond_data, stress_test):
     # Placeholder for stress testing logic
     return {"Stress Test Scenario": stress_test, "Impact": "To be calculated"}
 
-def draw_networkx_graph(G):
+def contagion_colors(G, expanded, risk_level='high'):
+    # Color-code contagion paths out of the expanded nodes
+    color = 'red' if risk_level == 'high' else 'green'
+    nodes = {n for n, attrs in G.nodes(data=True) if attrs.get('label') in set(expanded)}
+    return {(u, v): color for u, v in G.edges() if u in nodes or v in nodes}
+
+def draw_networkx_graph(G, edge_colors=None):
     if PYVIS_AVAILABLE:
-        net = Network(notebook=False, height="500px", width="100%")
-        net.from_nx(G)
-        net.show("graph.html")
-        with open("graph.html", "r") as f:
-            html = f.read()
-        components.html(html, height=550)
+        # Rendered in memory with cached positions; nothing is written to the working directory.
+        components.html(render_html(G, cache=get_layout_cache(), edge_colors=edge_colors), height=550)
     else:
         st.warning("PyVis not available for network visualization")
 
@@ -0,0 +1,164 @@
+#!/usr/bin/env python3
+"""
+Tests for the n8n webhook dispatcher against a local stub HTTP server
+Run with: python -m pytest test_dispatcher.py
+"""
+
+import asyncio
+import json
+import os
+import sys
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+ROOT_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(os.path.join(ROOT_DIR, 'src'))
+
+from n8n_automation.dispatcher import WebhookDispatcher, idempotency_key
+
+
+class StubWebhook:
+    """
+    Local webhook that records every request and answers with the queued status codes
+    (200 once they run out).
+    """
+
+    def __init__(self, statuses=()):
+        self.statuses = list(statuses)
+        self.requests = []
+        self.lock = threading.Lock()
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                body = json.loads(self.rfile.read(int(self.headers['Content-Length'])))
+                with stub.lock:
+                    stub.requests.append({'body': body, 'key': self.headers.get('Idempotency-Key')})
+                    status = stub.statuses.pop(0) if stub.statuses else 200
+                self.send_response(status)
+                self.send_header('Content-Length', '0')
+                self.end_headers()
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}/webhook"
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def alerts(self):
+        return [alert for r in self.requests for alert in r['body']['alerts']]
+
+
+def run(coro):
+    return asyncio.run(coro)
+
+
+def test_delivers_batches_in_one_shape():
+    async def send(url):
+        async with WebhookDispatcher(url, concurrency=2, batch_size=10, batch_wait=0.05, backoff=0.01) as d:
+            for i in range(25):
+                await d.submit({'bond_id': f"B{i}", 'message': 'spread jump', 'event_id': i})
+            await d.drain()
+            return d.stats()
+
+    with StubWebhook() as stub:
+        stats = run(send(stub.url))
+    assert stats['delivered'] == 25
+    assert sorted(a['bond_id'] for a in stub.alerts()) == sorted(f"B{i}" for i in range(25))
+    for r in stub.requests:
+        assert set(r['body']) == {'batch_id', 'alerts'}
+        assert r['key'] == r['body']['batch_id']
+
+
+def test_single_alert_uses_batch_shape():
+    async def send(url):
+        async with WebhookDispatcher(url, batch_wait=0.0) as d:
+            await d.submit({'bond_id': 'B1', 'message': 'spread jump'})
+
+    with StubWebhook() as stub:
+        run(send(stub.url))
+    assert len(stub.requests) == 1
+    assert [a['bond_id'] for a in stub.requests[0]['body']['alerts']] == ['B1']
+
+
+def test_duplicates_are_dropped_but_later_events_are_not():
+    async def send(url):
+        async with WebhookDispatcher(url, batch_wait=0.0) as d:
+            first = await d.submit({'bond_id': 'B1', 'message': 'breach', 'event_id': 'B1-2024-01-02'})
+            repeat = await d.submit({'bond_id': 'B1', 'message': 'breach', 'event_id': 'B1-2024-01-02'})
+            next_day = await d.submit({'bond_id': 'B1', 'message': 'breach', 'event_id': 'B1-2024-01-03'})
+            stamped = [await d.submit({'bond_id': 'B2', 'message': 'breach'}) for _ in range(2)]
+            await d.drain()
+            return first, repeat, next_day, stamped, d.stats()
+
+    with StubWebhook() as stub:
+        first, repeat, next_day, stamped, stats = run(send(stub.url))
+    assert (first, repeat, next_day) == (True, False, True)
+    # Without an event id each submission is stamped with its own time, so both go out.
+    assert stamped == [True, True]
+    assert stats['duplicates'] == 1
+    assert len(stub.alerts()) == 4
+
+
+def test_idempotency_key_includes_timestamp():
+    alert = {'bond_id': 'B1', 'message': 'breach', 'timestamp': '2024-01-02T10:00:00+00:00'}
+    later = dict(alert, timestamp='2024-01-03T10:00:00+00:00')
+    assert idempotency_key(alert) == idempotency_key(dict(alert))
+    assert idempotency_key(alert) != idempotency_key(later)
+    assert idempotency_key(dict(alert, event_id=7)) == idempotency_key(dict(later, event_id=7))
+
+
+def test_retries_transient_errors():
+    async def send(url):
+        async with WebhookDispatcher(url, batch_wait=0.0, backoff=0.01) as d:
+            await d.submit({'bond_id': 'B1', 'message': 'breach', 'event_id': 1})
+            await d.drain()
+            return d.stats()
+
+    with StubWebhook(statuses=[503, 429]) as stub:
+        stats = run(send(stub.url))
+    assert stats['delivered'] == 1
+    assert stats['retries'] == 2
+    assert len(stub.requests) == 3
+    assert len({r['key'] for r in stub.requests}) == 1
+
+
+def test_dead_letters_after_retries_and_permanent_errors(tmp_path):
+    path = str(tmp_path / 'dead.jsonl')
+
+    async def send(url):
+        async with WebhookDispatcher(url, batch_wait=0.0, max_retries=2, backoff=0.01,
+                                     dead_letter_path=path) as d:
+            await d.submit({'bond_id': 'B1', 'message': 'breach', 'event_id': 1})
+            await d.drain()
+            await d.submit({'bond_id': 'B2', 'message': 'breach', 'event_id': 2})
+            await d.drain()
+            # An undelivered alert can be submitted again.
+            again = await d.submit({'bond_id': 'B1', 'message': 'breach', 'event_id': 1})
+            await d.drain()
+            return again, d.stats()
+
+    with StubWebhook(statuses=[500, 500, 500, 400]) as stub:
+        again, stats = run(send(stub.url))
+    with open(path) as f:
+        dead = [json.loads(line) for line in f]
+    assert [d['alert']['bond_id'] for d in dead] == ['B1', 'B2']
+    assert [d['attempts'] for d in dead] == [3, 1]
+    assert [d['error'] for d in dead] == ['HTTP 500', 'HTTP 400']
+    assert again is True
+    assert stats['dead_lettered'] == 2
+    assert stats['delivered'] == 1
+
+
+if __name__ == "__main__":
+    import pytest
+    sys.exit(pytest.main([__file__, '-q']))
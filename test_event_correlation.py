@@ -0,0 +1,35 @@
+#!/usr/bin/env python3
+"""
+Tests for the bond / sector / issuer graph in EventCorrelationEngine
+Run with: python -m pytest test_event_correlation.py
+"""
+
+import os
+import sys
+
+ROOT_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(os.path.join(ROOT_DIR, 'src'))
+
+from bond_analytics.portfolio import Portfolio
+from knowledge_graph.event_correlation import EventCorrelationEngine
+
+
+def test_rows_without_a_bond_id_are_not_linked(tmp_path):
+    path = tmp_path / 'portfolio.csv'
+    path.write_text("bond,sector,issuer,duration,convexity,var,expectedshortfall\n"
+                    "A,Tech,X,1,2,3,4\n"
+                    ",Energy,W,1,2,3,4\n"
+                    "C,Fin,Y,1,2,3,4\n")
+    engine = EventCorrelationEngine(Portfolio(str(path)).df)
+    assert list(engine.bonds) == ['A', 'C']
+    assert engine.propagate_event('Energy') == []
+    assert engine.sector_bonds('Energy') == []
+    assert engine.issuer_bonds('W') == []
+    assert sorted(engine.get_connected('C')) == ['Fin', 'Y']
+    assert engine.bond_attributes('C')['sector'] == 'Fin'
+    assert list(engine.propagate_stress('Energy').index) == ['A', 'C']
+
+
+if __name__ == "__main__":
+    import pytest
+    sys.exit(pytest.main([__file__, '-q']))
@@ -6,7 +6,8 @@ This script tests the FRED API functionality without needing the full dashboard
 
 import sys
 import os
-sys.path.append('/Users/dipantabhattacharyya/Desktop/CreditPulse/src')
+ROOT_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(os.path.join(ROOT_DIR, 'src'))
 
 from bond_analytics.macro_api import MacroAPI
 import pandas as pd
@@ -60,7 +61,7 @@ def test_portfolio_loading():
     
     print("\n=== Testing Portfolio Loading ===\n")
     
-    portfolio_path = "/Users/dipantabhattacharyya/Desktop/CreditPulse/detailed_bond_portfolio.csv"
+    portfolio_path = os.path.join(ROOT_DIR, "detailed_bond_portfolio.csv")
     
     try:
         # Load the portfolio CSV